@@ -127,10 +127,10 @@ namespace Energinet.DataHub.Aggregation.Coordinator.Application.Coordinator
         {
             try
             {
-                var parameters = _triggerBaseArguments.GetTriggerWholesaleArguments(processType, jobId, snapshotId);
-
                 var job = await CreateJobAndJobResultsAsync(jobId, snapshotId, JobTypeEnum.Wholesale, owner, processType, isSimulation, null, processVariant).ConfigureAwait(false);
 
+                var parameters = _triggerBaseArguments.GetTriggerWholesaleArguments(job);
+
                 await _calculationEngine.CreateAndRunCalculationJobAsync(job, parameters, _coordinatorSettings.WholesalePythonFile, cancellationToken).ConfigureAwait(false);
             }
             catch (Exception e)
@@ -153,6 +153,10 @@ namespace Energinet.DataHub.Aggregation.Coordinator.Application.Coordinator
             var job = new Job(jobId, snapshotId, jobType, JobStateEnum.Pending, owner, resolution, processType, isSimulation, processVariant);
             await _metadataDataAccess.CreateJobAsync(job).ConfigureAwait(false);
 
+            // The created job is read back with its snapshot, as the period of the snapshot is passed on to the job
+            var createdJob = await _metadataDataAccess.GetJobAsync(job.Id).ConfigureAwait(false);
+            job.Snapshot = createdJob.Snapshot;
+
             var results = await _metadataDataAccess.GetResultsByTypeAsync(job.Type).ConfigureAwait(false);
 
             foreach (var result in results)
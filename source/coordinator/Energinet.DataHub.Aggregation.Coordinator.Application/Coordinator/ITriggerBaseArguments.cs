@@ -15,7 +15,6 @@
 using System;
 using System.Collections.Generic;
 using Energinet.DataHub.Aggregation.Coordinator.Domain.DTOs.Metadata;
-using Energinet.DataHub.Aggregation.Coordinator.Domain.DTOs.Metadata.Enums;
 using NodaTime;
 
 namespace Energinet.DataHub.Aggregation.Coordinator.Application.Coordinator
@@ -46,10 +45,8 @@ namespace Energinet.DataHub.Aggregation.Coordinator.Application.Coordinator
         /// <summary>
         /// Returns arguments used for wholesale databricks job trigger function
         /// </summary>
-        /// <param name="processType"></param>
-        /// <param name="jobId"></param>
-        /// <param name="snapshotId"></param>
+        /// <param name="job"></param>
         /// <returns>List of strings</returns>
-        List<string> GetTriggerWholesaleArguments(JobProcessTypeEnum processType, Guid jobId, Guid snapshotId);
+        List<string> GetTriggerWholesaleArguments(Job job);
     }
 }
@@ -20,7 +20,6 @@ using System.Text.Json;
 using Energinet.DataHub.Aggregation.Coordinator.Application.Utilities;
 using Energinet.DataHub.Aggregation.Coordinator.Domain.DTOs;
 using Energinet.DataHub.Aggregation.Coordinator.Domain.DTOs.Metadata;
-using Energinet.DataHub.Aggregation.Coordinator.Domain.DTOs.Metadata.Enums;
 using NodaTime;
 
 namespace Energinet.DataHub.Aggregation.Coordinator.Application.Coordinator
@@ -79,7 +78,7 @@ namespace Energinet.DataHub.Aggregation.Coordinator.Application.Coordinator
                 throw new ArgumentNullException(nameof(job));
             }
 
-            var args = GetTriggerBaseArguments(job.Id, job.SnapshotId);
+            var args = GetTriggerBaseArguments(job);
 
             var dictionary = JsonSerializer.Serialize(CreateMetaDataDictionary(job));
 
@@ -94,13 +93,18 @@ namespace Energinet.DataHub.Aggregation.Coordinator.Application.Coordinator
             return args;
         }
 
-        public List<string> GetTriggerWholesaleArguments(JobProcessTypeEnum processType, Guid jobId, Guid snapshotId)
+        public List<string> GetTriggerWholesaleArguments(Job job)
         {
-            var args = GetTriggerBaseArguments(jobId, snapshotId);
+            if (job == null)
+            {
+                throw new ArgumentNullException(nameof(job));
+            }
+
+            var args = GetTriggerBaseArguments(job);
 
             var aggregationArgs = new List<string>
             {
-                $"--process-type={processType}",
+                $"--process-type={job.ProcessType}",
             };
 
             args.AddRange(aggregationArgs);
@@ -120,8 +124,13 @@ namespace Energinet.DataHub.Aggregation.Coordinator.Application.Coordinator
             return dict;
         }
 
-        private List<string> GetTriggerBaseArguments(Guid jobId, Guid snapshotId)
+        private List<string> GetTriggerBaseArguments(Job job)
         {
+            if (job.Snapshot == null)
+            {
+                throw new ArgumentException("The snapshot of the job must be loaded to get the period of the job", nameof(job));
+            }
+
             return new List<string>
             {
                 $"--data-storage-account-name={_coordinatorSettings.DataStorageAccountName}",
@@ -130,8 +139,10 @@ namespace Energinet.DataHub.Aggregation.Coordinator.Application.Coordinator
                 $"--result-url={_coordinatorSettings.ResultUrl}",
                 $"--snapshot-notify-url={_coordinatorSettings.SnapshotNotifyUrl}",
                 $"--snapshots-base-path={_coordinatorSettings.SnapshotsBasePath}",
-                $"--job-id={jobId}",
-                $"--snapshot-id={snapshotId}",
+                $"--job-id={job.Id}",
+                $"--snapshot-id={job.SnapshotId}",
+                $"--beginning-date-time={job.Snapshot.FromDate.ToIso8601GeneralString()}",
+                $"--end-date-time={job.Snapshot.ToDate.ToIso8601GeneralString()}",
             };
         }
     }
@@ -22,6 +22,7 @@ using Energinet.DataHub.Aggregation.Coordinator.Application.Coordinator.Interfac
 using Energinet.DataHub.Aggregation.Coordinator.Domain.DTOs.Metadata;
 using Energinet.DataHub.Aggregation.Coordinator.Domain.DTOs.Metadata.Enums;
 using Microsoft.Extensions.Logging;
+using NodaTime;
 using NSubstitute;
 using Xunit;
 using Xunit.Categories;
@@ -46,6 +47,7 @@ namespace Energinet.DataHub.Aggregation.Coordinator.Tests
             _coordinatorSettings = Substitute.For<CoordinatorSettings>();
             _logger = Substitute.For<ILogger<CoordinatorService>>();
             _metadataDataAccess = Substitute.For<IMetadataDataAccess>();
+            _metadataDataAccess.GetJobAsync(Arg.Any<Guid>()).Returns(_ => Task.FromResult(new Job()));
             _triggerBaseArguments = Substitute.For<ITriggerBaseArguments>();
             _calculationEngine = Substitute.For<ICalculationEngine>();
             _sut = new CoordinatorService(_coordinatorSettings, _logger, _metadataDataAccess, _triggerBaseArguments, _calculationEngine);
@@ -98,6 +100,38 @@ namespace Energinet.DataHub.Aggregation.Coordinator.Tests
             _triggerBaseArguments.Received(1).GetTriggerAggregationArguments(Arg.Is<Job>(x => x.Id == jobId));
         }
 
+        [Fact]
+        public async Task TestStartAggregationJobAsync_GetTriggerAggregationArguments_WithSnapshotOfJob()
+        {
+            //Arrange
+            var snapshotId = Guid.NewGuid();
+            var snapshot = new Snapshot(snapshotId, Instant.FromUtc(2020, 1, 1, 0, 0), Instant.FromUtc(2020, 2, 1, 0, 0));
+            var jobId = Guid.NewGuid();
+            _metadataDataAccess.GetJobAsync(jobId).Returns(Task.FromResult(new Job { Snapshot = snapshot }));
+
+            //Act
+            await _sut.StartAggregationJobAsync(jobId, snapshotId, JobProcessTypeEnum.Aggregation, false, "owner", ResolutionEnum.Hour, CancellationToken.None).ConfigureAwait(false);
+
+            //Assert
+            _triggerBaseArguments.Received(1).GetTriggerAggregationArguments(Arg.Is<Job>(x => x.Snapshot == snapshot));
+        }
+
+        [Fact]
+        public async Task TestStartWholesaleJobAsync_GetTriggerWholesaleArguments_WithSnapshotOfJob()
+        {
+            //Arrange
+            var snapshotId = Guid.NewGuid();
+            var snapshot = new Snapshot(snapshotId, Instant.FromUtc(2020, 1, 1, 0, 0), Instant.FromUtc(2020, 2, 1, 0, 0));
+            var jobId = Guid.NewGuid();
+            _metadataDataAccess.GetJobAsync(jobId).Returns(Task.FromResult(new Job { Snapshot = snapshot }));
+
+            //Act
+            await _sut.StartWholesaleJobAsync(jobId, snapshotId, JobProcessTypeEnum.WholesaleFixing, false, "owner", JobProcessVariantEnum.FirstRun, CancellationToken.None).ConfigureAwait(false);
+
+            //Assert
+            _triggerBaseArguments.Received(1).GetTriggerWholesaleArguments(Arg.Is<Job>(x => x.Snapshot == snapshot));
+        }
+
         [Fact]
         public async Task TestStartAggregationJobAsync_CreateAndRunCalculationJobAsync()
         {
@@ -123,12 +123,15 @@ namespace Energinet.DataHub.Aggregation.Coordinator.Tests.Application.Coordinato
                 "test_user",
                 ResolutionEnum.Hour,
                 JobProcessTypeEnum.Aggregation,
-                false);
+                false)
+            {
+                Snapshot = CreateSnapshot(snapshotId),
+            };
 
             var args = _sut.GetTriggerAggregationArguments(job);
 
             Assert.Contains($"--process-type={job.ProcessType}", args);
-            AssertBaseArguments(args, jobId, snapshotId);
+            AssertBaseArguments(args, job);
         }
 
         [Fact]
@@ -136,16 +139,52 @@ namespace Energinet.DataHub.Aggregation.Coordinator.Tests.Application.Coordinato
         {
             var jobId = Guid.NewGuid();
             var snapshotId = Guid.NewGuid();
-            var processType = JobProcessTypeEnum.WholesaleFixing;
 
-            var args = _sut.GetTriggerWholesaleArguments(processType, jobId, snapshotId);
+            var job = new Job(
+                jobId,
+                snapshotId,
+                JobTypeEnum.Wholesale,
+                JobStateEnum.Started,
+                "test_user",
+                null,
+                JobProcessTypeEnum.WholesaleFixing,
+                false)
+            {
+                Snapshot = CreateSnapshot(snapshotId),
+            };
+
+            var args = _sut.GetTriggerWholesaleArguments(job);
+
+            Assert.Contains($"--process-type={job.ProcessType}", args);
+            AssertBaseArguments(args, job);
+        }
+
+        [Fact]
+        public void Test_GetTriggerAggregationArguments_ThrowsWhenSnapshotIsNotLoaded()
+        {
+            var job = new Job(
+                Guid.NewGuid(),
+                Guid.NewGuid(),
+                JobTypeEnum.Aggregation,
+                JobStateEnum.Started,
+                "test_user",
+                ResolutionEnum.Hour,
+                JobProcessTypeEnum.Aggregation,
+                false);
+
+            Assert.Throws<ArgumentException>(() => _sut.GetTriggerAggregationArguments(job));
+        }
 
-            Assert.Contains($"--process-type={processType}", args);
-            AssertBaseArguments(args, jobId, snapshotId);
+        private static Snapshot CreateSnapshot(Guid snapshotId)
+        {
+            return new Snapshot(snapshotId, Instant.FromUtc(2020, 1, 1, 0, 0), Instant.FromUtc(2020, 2, 1, 0, 0));
         }
 
-        private void AssertBaseArguments(List<string> args, Guid jobId, Guid snapshotId)
+        private void AssertBaseArguments(List<string> args, Job job)
         {
+            var jobId = job.Id;
+            var snapshotId = job.SnapshotId;
+
             Assert.Contains($"--data-storage-account-name={_coordinatorSettings.DataStorageAccountName}", args);
             Assert.Contains($"--data-storage-account-key={_coordinatorSettings.DataStorageAccountKey}", args);
             Assert.Contains($"--data-storage-container-name={_coordinatorSettings.DataStorageContainerName}", args);
@@ -154,6 +193,8 @@ namespace Energinet.DataHub.Aggregation.Coordinator.Tests.Application.Coordinato
             Assert.Contains($"--snapshots-base-path={_coordinatorSettings.SnapshotsBasePath}", args);
             Assert.Contains($"--job-id={jobId}", args);
             Assert.Contains($"--snapshot-id={snapshotId}", args);
+            Assert.Contains($"--beginning-date-time={job.Snapshot.FromDate.ToIso8601GeneralString()}", args);
+            Assert.Contains($"--end-date-time={job.Snapshot.ToDate.ToIso8601GeneralString()}", args);
         }
     }
 }
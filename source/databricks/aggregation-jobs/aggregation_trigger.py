@@ -24,13 +24,19 @@ from geh_stream.shared.data_classes import Metadata
 # from geh_stream.shared.data_exporter import export_to_csv
 from geh_stream.aggregation_utils.trigger_base_arguments import trigger_base_arguments
 from geh_stream.shared.data_loader import initialize_spark
+from geh_stream.shared.period import parse_period
 from geh_stream.aggregation_utils.aggregators import \
     get_time_series_dataframe, \
     aggregate_net_exchange_per_ga, \
     aggregate_net_exchange_per_neighbour_ga, \
+    aggregate_exchange_per_in_and_out_ga, \
     aggregate_hourly_consumption, \
     aggregate_flex_consumption, \
     aggregate_hourly_production, \
+    aggregate_consumption_and_production_per_ga_and_brp_and_es, \
+    aggregate_hourly_production_rollup, \
+    aggregate_hourly_settled_consumption_rollup, \
+    aggregate_flex_settled_consumption_rollup, \
     aggregate_hourly_production_ga_es, \
     aggregate_hourly_settled_consumption_ga_es, \
     aggregate_flex_settled_consumption_ga_es, \
@@ -51,7 +57,11 @@ from geh_stream.aggregation_utils.aggregators import \
     combine_added_grid_loss_with_master_data, \
     aggregate_quality
 
+from geh_stream.aggregation_utils.step_dependencies import step_dependencies, unpublished_results
+from geh_stream.aggregation_utils.step_scheduler import StepScheduler, prune_unpublished_steps
+from geh_stream.aggregation_utils.result_cache import ResultCache
 from geh_stream.shared.services import InputOutputProcessor
+from geh_stream.snapshot import load_hourly_time_series
 from geh_stream.codelists import BasisDataKeyName, ResultKeyName
 
 from geh_stream.aggregation_utils.trigger_base_arguments import trigger_base_arguments
@@ -61,6 +71,9 @@ p = trigger_base_arguments()
 p.add('--resolution', type=str, required=True, help="Time window resolution eg. 60 minutes, 15 minutes etc.")
 p.add('--process-type', type=str, required=True, help='D03 (Aggregation) or D04 (Balance fixing) ')
 p.add('--meta-data-dictionary', type=json.loads, required=True, help="Meta data dictionary")
+p.add('--max-parallel-steps', type=int, required=False, default=4, help="Maximum number of aggregation steps run at the same time")
+p.add('--publish-as-ready', action='store_true', required=False, default=False,
+      help="Write each result and notify the coordinator as soon as its step is done, instead of when all steps are done")
 args, unknown_args = p.parse_known_args()
 
 spark = initialize_spark(args)
@@ -68,21 +81,21 @@ spark = initialize_spark(args)
 io_processor = InputOutputProcessor(args)
 
 # Add raw dataframes to basis data dictionary and return joined dataframe
-filtered = get_time_series_dataframe(io_processor.load_basis_data(spark, BasisDataKeyName.time_series),
+# Master data is joined in buckets within the period of the snapshot
+period = parse_period(args.beginning_date_time, args.end_date_time)
+
+# The time series are read summed per metering point and hour, as all aggregations are hourly
+filtered = get_time_series_dataframe(load_hourly_time_series(spark, io_processor),
                                      io_processor.load_basis_data(spark, BasisDataKeyName.metering_points),
                                      io_processor.load_basis_data(spark, BasisDataKeyName.market_roles),
-                                     io_processor.load_basis_data(spark, BasisDataKeyName.es_brp_relations))
-
-results = {}
-# Aggregate quality for aggregated timeseries grouped by grid area, market evaluation point type and time window
-results[ResultKeyName.aggregation_base_dataframe] = aggregate_quality(filtered)
-
-# Get additional data for grid loss and system correction
-results[ResultKeyName.grid_loss_sys_cor_master_data] = io_processor.load_basis_data(spark, BasisDataKeyName.grid_loss_sys_corr)
+                                     io_processor.load_basis_data(spark, BasisDataKeyName.es_brp_relations),
+                                     period)
 
 # Create a keyvalue dictionary for use in postprocessing. Each result are stored as a keyval with value being dataframe
 
 functions = {
+    2: aggregate_consumption_and_production_per_ga_and_brp_and_es,
+    3: aggregate_exchange_per_in_and_out_ga,
     10: aggregate_net_exchange_per_neighbour_ga,
     20: aggregate_net_exchange_per_ga,
     30: aggregate_hourly_consumption,
@@ -91,10 +104,13 @@ functions = {
     60: calculate_grid_loss,
     70: calculate_added_system_correction,
     80: calculate_added_grid_loss,
-    90: combine_added_system_correction_with_master_data,  # TODO to be added to results later
-    100: combine_added_grid_loss_with_master_data,  # TODO to be added to results later
+    90: combine_added_system_correction_with_master_data,
+    100: combine_added_grid_loss_with_master_data,
     110: adjust_flex_consumption,
     120: adjust_production,
+    121: aggregate_hourly_production_rollup,
+    122: aggregate_hourly_settled_consumption_rollup,
+    123: aggregate_flex_settled_consumption_rollup,
     130: aggregate_hourly_production_ga_es,
     140: aggregate_hourly_settled_consumption_ga_es,
     150: aggregate_flex_settled_consumption_ga_es,
@@ -108,19 +124,47 @@ functions = {
     230: calculate_residual_ga
 }
 
+steps = {int(key): Metadata(**value) for key, value in args.meta_data_dictionary.items()}
+# Only run the steps whose results are published, and add the intermediate results they are computed from
+steps, skipped_steps = prune_unpublished_steps(steps, unpublished_results, functions, step_dependencies)
+if skipped_steps:
+    print(f"Skipping steps {skipped_steps}, as their results are not published")
 
-for key, value in args.meta_data_dictionary.items():
-    key = int(key)
-    results[key] = functions[key](results, Metadata(**value))
+# Results read by other steps are persisted and released again when the last step reading them is done
+cache = ResultCache(step_dependencies, steps)
 
+results = {}
+# Aggregate quality for aggregated timeseries grouped by grid area, market evaluation point type and time window
+results[ResultKeyName.aggregation_base_dataframe] = cache.persist(ResultKeyName.aggregation_base_dataframe, aggregate_quality(filtered))
 
-# Enable to dump results to local csv files
-# export_to_csv(results)
-
-del results[ResultKeyName.aggregation_base_dataframe]
-del results[ResultKeyName.grid_loss_sys_cor_master_data]
-del results[90]
-del results[100]
-
-# Store aggregation results
-io_processor.do_post_processing(args.process_type, args.job_id, args.result_url, results)
+# Get additional data for grid loss and system correction
+results[ResultKeyName.grid_loss_sys_cor_master_data] = cache.persist(
+    ResultKeyName.grid_loss_sys_cor_master_data,
+    io_processor.load_basis_data(spark, BasisDataKeyName.grid_loss_sys_corr))
+
+# Run the steps as a dependency graph so that independent steps run at the same time
+if args.publish_as_ready:
+    # Each result is published as soon as its step is done, while the other steps are still running
+    with io_processor.result_publisher(args.result_url, cache.release) as publisher:
+        def publish(key, result):
+            # Intermediate results are not published
+            if steps[key] is not None:
+                publisher.publish(key, result)
+
+        StepScheduler(functions, step_dependencies, args.max_parallel_steps, cache, publish).run(results, steps)
+else:
+    StepScheduler(functions, step_dependencies, args.max_parallel_steps, cache).run(results, steps)
+
+    # Enable to dump results to local csv files
+    # export_to_csv(results)
+
+    del results[ResultKeyName.aggregation_base_dataframe]
+    del results[ResultKeyName.grid_loss_sys_cor_master_data]
+    # Intermediate results are not published
+    for key in [key for key, metadata in steps.items() if metadata is None]:
+        del results[key]
+
+    # Store aggregation results
+    io_processor.do_post_processing(args.process_type, args.job_id, args.result_url, results, cache.release)
+
+cache.unpersist_all()
@@ -34,6 +34,8 @@ from geh_stream.snapshot import create_snapshot
 @click.option('--end-date-time', type=str, required=True,
               help='The timezone aware date-time representing the end of the time period of aggregation (ex: 2020-01-03T00:00:00Z %Y-%m-%dT%H:%M:%S%z)')
 @click.option('--snapshot-id', type=str, required=True)
+@click.option('--previous-snapshot-id', type=str, required=False, default=None,
+              help='Id of a previous snapshot. If it is of the same period and grid areas, only time series points written since that snapshot are loaded and written')
 # Infrastructure settings
 @click.option('--snapshot-notify-url', type=str, required=True, help="The target url to post result json")
 @click.option('--snapshots-base-path', type=str, required=True)
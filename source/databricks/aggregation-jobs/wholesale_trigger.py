@@ -20,11 +20,18 @@ sys.path.append(r'/opt/conda/lib/python3.8/site-packages')
 
 import json
 import configargparse
+from pyspark import StorageLevel
 from geh_stream.aggregation_utils.trigger_base_arguments import trigger_base_arguments
 from geh_stream.shared.data_loader import initialize_spark
+from geh_stream.shared.period import parse_period
 from geh_stream.codelists.resolution_duration import ResolutionDuration
-from geh_stream.wholesale_utils.wholesale_initializer import get_tariff_charges, get_fee_charges, get_subscription_charges
+from geh_stream.wholesale_utils.wholesale_initializer import \
+    get_charges_with_properties, \
+    select_tariff_charges, \
+    select_fee_charges, \
+    select_subscription_charges
 from geh_stream.shared.services import InputOutputProcessor
+from geh_stream.snapshot import load_hourly_time_series, load_daily_time_series
 from geh_stream.wholesale_utils.calculators import calculate_daily_subscription_price, calculate_tariff_price_per_ga_co_es, calculate_fee_charge_price
 from geh_stream.codelists import BasisDataKeyName, ResultKeyName
 from geh_stream.shared.data_exporter import export_to_csv
@@ -42,21 +49,31 @@ spark = initialize_spark(args)
 
 io_processor = InputOutputProcessor(args)
 
-time_series = io_processor.load_basis_data(spark, BasisDataKeyName.time_series)
+# The time series are read summed per metering point and hour or day instead of as points.
+# The daily sums are rolled up from the hourly sums when the snapshot is created, so the points are only windowed once.
+hourly_time_series = load_hourly_time_series(spark, io_processor)
+daily_time_series = load_daily_time_series(spark, io_processor)
 charges = io_processor.load_basis_data(spark, BasisDataKeyName.charges)
 charge_links = io_processor.load_basis_data(spark, BasisDataKeyName.charge_links)
 charge_prices = io_processor.load_basis_data(spark, BasisDataKeyName.charge_prices)
 metering_points = io_processor.load_basis_data(spark, BasisDataKeyName.metering_points)
 market_roles = io_processor.load_basis_data(spark, BasisDataKeyName.market_roles)
 
+# Master data is joined in buckets within the period of the snapshot
+period = parse_period(args.beginning_date_time, args.end_date_time)
+
 # Initialize wholesale specific data frames
-daily_tariff_charges = get_tariff_charges(time_series, charges, charge_links, charge_prices, metering_points, market_roles, ResolutionDuration.day)
+# The properties are joined on the charges of all charge types at once, and the result is read once per charge type and resolution
+charges_with_properties = get_charges_with_properties(charges, charge_prices, charge_links, metering_points, market_roles, period) \
+    .persist(StorageLevel.MEMORY_AND_DISK)
+
+daily_tariff_charges = select_tariff_charges(charges_with_properties, daily_time_series, ResolutionDuration.day)
 
-hourly_tariff_charges = get_tariff_charges(time_series, charges, charge_links, charge_prices, metering_points, market_roles, ResolutionDuration.hour)
+hourly_tariff_charges = select_tariff_charges(charges_with_properties, hourly_time_series, ResolutionDuration.hour)
 
-fee_charges = get_fee_charges(charges, charge_prices, charge_links, metering_points, market_roles)
+fee_charges = select_fee_charges(charges_with_properties)
 
-subscription_charges = get_subscription_charges(charges, charge_prices, charge_links, metering_points, market_roles)
+subscription_charges = select_subscription_charges(charges_with_properties)
 
 # Create a keyvalue dictionary for use in postprocessing. Each result are stored as a keyval with value being dataframe
 results = {}
@@ -82,3 +99,5 @@ results[ResultKeyName.fee_prices] = calculate_fee_charge_price(
 
 # Store wholesale results
 io_processor.do_post_processing(args.process_type, args.job_id, args.result_url, results)
+
+charges_with_properties.unpersist()
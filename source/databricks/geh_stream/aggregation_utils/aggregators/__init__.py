@@ -14,10 +14,15 @@
 from .aggregation_initializer import get_time_series_dataframe
 from .aggregators import aggregate_net_exchange_per_ga, \
     aggregate_net_exchange_per_neighbour_ga, \
+    aggregate_exchange_per_in_and_out_ga, \
     aggregate_hourly_consumption, \
     aggregate_flex_consumption, \
     aggregate_hourly_production, \
+    aggregate_consumption_and_production_per_ga_and_brp_and_es, \
     aggregate_per_ga_and_brp_and_es, \
+    aggregate_hourly_production_rollup, \
+    aggregate_hourly_settled_consumption_rollup, \
+    aggregate_flex_settled_consumption_rollup, \
     aggregate_hourly_production_ga_es, \
     aggregate_hourly_settled_consumption_ga_es, \
     aggregate_flex_settled_consumption_ga_es, \
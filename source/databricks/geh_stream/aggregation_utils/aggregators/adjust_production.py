@@ -16,6 +16,7 @@ from geh_stream.shared.data_classes import Metadata
 from geh_stream.aggregation_utils.aggregation_result_formatter import create_dataframe_from_aggregation_result_schema
 from pyspark.sql import DataFrame
 from pyspark.sql.functions import col, when, lit
+from geh_stream.aggregation_utils.aggregators.grid_loss_responsibility import join_responsible_metering_points
 
 
 sys_cor_energy_supplier = "SysCor_EnergySupplier"
@@ -57,14 +58,7 @@ def adjust_production(results: dict, metadata: Metadata) -> DataFrame:
 
     # join information from system correction dataframe on to joined result dataframe with information about which energy supplier,
     # that is responsible for system correction in the given time window from the joined result dataframe.
-    df = df.join(
-        sc_df,
-        when(col(Colname.to_date).isNotNull(), col(Colname.time_window_start) <= col(Colname.to_date)).otherwise(True)
-        & (col(Colname.time_window_start) >= col(Colname.from_date))
-        & (col(Colname.to_date).isNull() | (col(Colname.time_window_end) <= col(Colname.to_date)))
-        & (col(Colname.grid_area) == col(sys_cor_grid_area))
-        & (col(Colname.is_system_correction)),
-        "left")
+    df = join_responsible_metering_points(df, sc_df, sys_cor_grid_area, Colname.is_system_correction, "left")
 
     # update function that selects the sum of two columns if condition is met, or selects data from a single column if condition is not met.
     update_func = (when(col(Colname.energy_supplier_id) == col(sys_cor_energy_supplier),
@@ -11,47 +11,27 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from geh_stream.codelists import Colname
+from geh_stream.shared.period import Period
+from geh_stream.shared.range_join import range_join
 
 
-def get_time_series_dataframe(time_series_df, metering_point_df, market_roles_df, es_brp_relations_df):
-    metering_point_join_conditions = \
-        [
-            time_series_df.metering_point_id == metering_point_df.metering_point_id,
-            time_series_df.time >= metering_point_df.from_date,
-            time_series_df.time < metering_point_df.to_date
-        ]
-
-    time_series_with_metering_point = time_series_df \
-        .join(metering_point_df, metering_point_join_conditions, "inner") \
+def get_time_series_dataframe(time_series_df, metering_point_df, market_roles_df, es_brp_relations_df, period: Period = None):
+    # The master data is joined in buckets within the period when it is given, see range_join
+    time_series_with_metering_point = range_join(time_series_df, metering_point_df, [Colname.metering_point_id], "inner", period) \
         .drop(metering_point_df.metering_point_id) \
         .drop(metering_point_df.from_date) \
         .drop(metering_point_df.to_date)
 
-    market_roles_join_conditions = \
-        [
-            time_series_with_metering_point.metering_point_id == market_roles_df.metering_point_id,
-            time_series_with_metering_point.time >= market_roles_df.from_date,
-            time_series_with_metering_point.time < market_roles_df.to_date
-        ]
-
-    time_series_with_metering_point_and_market_roles = time_series_with_metering_point \
-        .join(market_roles_df, market_roles_join_conditions, "left") \
+    time_series_with_metering_point_and_market_roles = range_join(time_series_with_metering_point, market_roles_df, [Colname.metering_point_id], "left", period) \
         .drop(market_roles_df.metering_point_id) \
         .drop(market_roles_df.from_date) \
         .drop(market_roles_df.to_date)
 
-    es_brp_relations_join_conditions = \
-        [
-            time_series_with_metering_point_and_market_roles.energy_supplier_id == es_brp_relations_df.energy_supplier_id,
-            time_series_with_metering_point_and_market_roles.grid_area == es_brp_relations_df.grid_area,
-            time_series_with_metering_point_and_market_roles.metering_point_type == es_brp_relations_df.metering_point_type,
-            time_series_with_metering_point_and_market_roles.time >= es_brp_relations_df.from_date,
-            time_series_with_metering_point_and_market_roles.time < es_brp_relations_df.to_date,
-            time_series_with_metering_point_and_market_roles.metering_point_type == es_brp_relations_df.metering_point_type
-        ]
-
-    time_series_with_metering_point_and_market_roles_and_brp = time_series_with_metering_point_and_market_roles \
-        .join(es_brp_relations_df, es_brp_relations_join_conditions, "left") \
+    # There are few energy supplier and balance responsible relations, so they are broadcast instead
+    es_brp_relations_keys = [Colname.energy_supplier_id, Colname.grid_area, Colname.metering_point_type]
+    time_series_with_metering_point_and_market_roles_and_brp = range_join(
+        time_series_with_metering_point_and_market_roles, es_brp_relations_df, es_brp_relations_keys, "left", broadcast_periods=True) \
         .drop(es_brp_relations_df.energy_supplier_id) \
         .drop(es_brp_relations_df.grid_area) \
         .drop(es_brp_relations_df.from_date) \
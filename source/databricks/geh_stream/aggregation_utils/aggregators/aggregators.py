@@ -12,7 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from pyspark.sql import DataFrame, SparkSession
-from pyspark.sql.functions import col, window, lit
+from pyspark.sql.functions import col, window, lit, when, least, greatest, sum, count, explode, array
+from pyspark.sql.window import Window
 from geh_stream.codelists import MarketEvaluationPointType, SettlementMethod, ConnectionState, Colname, ResultKeyName, ResolutionDuration
 from geh_stream.shared.data_classes import Metadata
 from geh_stream.aggregation_utils.aggregation_result_formatter import create_dataframe_from_aggregation_result_schema
@@ -20,49 +21,40 @@ from geh_stream.aggregation_utils.aggregation_result_formatter import create_dat
 
 in_sum = "in_sum"
 out_sum = "out_sum"
-exchange_in_in_grid_area = "ExIn_InMeteringGridArea_Domain_mRID"
-exchange_in_out_grid_area = "ExIn_OutMeteringGridArea_Domain_mRID"
-exchange_out_in_grid_area = "ExOut_InMeteringGridArea_Domain_mRID"
-exchange_out_out_grid_area = "ExOut_OutMeteringGridArea_Domain_mRID"
+grouping_set = "grouping_set"
+per_ga_and_es = 0
+per_ga_and_brp = 1
+per_ga = 2
+
+
+# Function to aggregate hourly exchange per in and out grid area in a single pass (shared by step 1 and 2)
+def aggregate_exchange_per_in_and_out_ga(results: dict, metadata: Metadata) -> DataFrame:
+    return __sum_exchange_per_in_and_out_ga(results[ResultKeyName.aggregation_base_dataframe])
 
 
 # Function to aggregate hourly net exchange per neighbouring grid areas (step 1)
 def aggregate_net_exchange_per_neighbour_ga(results: dict, metadata: Metadata) -> DataFrame:
-    df = results[ResultKeyName.aggregation_base_dataframe].filter(col(Colname.metering_point_type) == MarketEvaluationPointType.exchange.value) \
-        .filter((col(Colname.connection_state) == ConnectionState.connected.value) | (col(Colname.connection_state) == ConnectionState.disconnected.value)) \
-
-    exchange_in = df \
-        .groupBy(
-            Colname.in_grid_area,
-            Colname.out_grid_area,
-            window(col(Colname.time), "1 hour"),
-            Colname.aggregated_quality) \
-        .sum(Colname.quantity) \
-        .withColumnRenamed(f"sum({Colname.quantity})", in_sum) \
-        .withColumnRenamed("window", Colname.time_window) \
-        .withColumnRenamed(Colname.in_grid_area, exchange_in_in_grid_area) \
-        .withColumnRenamed(Colname.out_grid_area, exchange_in_out_grid_area)
-    exchange_out = df \
-        .groupBy(
-            Colname.in_grid_area,
-            Colname.out_grid_area,
-            window(col(Colname.time), "1 hour")) \
-        .sum(Colname.quantity) \
-        .withColumnRenamed(f"sum({Colname.quantity})", out_sum) \
-        .withColumnRenamed("window", Colname.time_window) \
-        .withColumnRenamed(Colname.in_grid_area, exchange_out_in_grid_area) \
-        .withColumnRenamed(Colname.out_grid_area, exchange_out_out_grid_area)
-
-    exchange = exchange_in.join(
-        exchange_out, [Colname.time_window], "inner") \
-        .filter(exchange_in.ExIn_InMeteringGridArea_Domain_mRID == exchange_out.ExOut_OutMeteringGridArea_Domain_mRID) \
-        .filter(exchange_in.ExIn_OutMeteringGridArea_Domain_mRID == exchange_out.ExOut_InMeteringGridArea_Domain_mRID) \
-        .select(exchange_in["*"], exchange_out[out_sum]) \
+    exchange_in = __get_exchange_per_in_and_out_ga(results) \
+        .filter(col(Colname.in_grid_area).isNotNull() & col(Colname.out_grid_area).isNotNull())
+
+    # The exchange in both directions between two neighbours is in the same partition, so the exchange out of the grid area,
+    # i.e. the exchange in the opposite direction, is found without joining every exchange of the hour with each other
+    first_grid_area = least(col(Colname.in_grid_area), col(Colname.out_grid_area))
+    second_grid_area = greatest(col(Colname.in_grid_area), col(Colname.out_grid_area))
+    neighbours = Window.partitionBy(first_grid_area, second_grid_area, col(Colname.time_window))
+    is_from_first = col(Colname.in_grid_area) == first_grid_area
+    is_from_second = col(Colname.in_grid_area) == second_grid_area
+    opposite_sum = when(is_from_first, sum(when(is_from_second, col(in_sum))).over(neighbours)) \
+        .otherwise(sum(when(is_from_first, col(in_sum))).over(neighbours))
+    has_opposite = when(is_from_first, count(when(is_from_second, 1)).over(neighbours)) \
+        .otherwise(count(when(is_from_first, 1)).over(neighbours)) > 0
+
+    exchange = exchange_in \
+        .withColumn(out_sum, opposite_sum) \
+        .filter(has_opposite) \
         .withColumn(
             Colname.sum_quantity,
             col(in_sum) - col(out_sum)) \
-        .withColumnRenamed(exchange_in_in_grid_area, Colname.in_grid_area) \
-        .withColumnRenamed(exchange_in_out_grid_area, Colname.out_grid_area) \
         .withColumnRenamed(Colname.aggregated_quality, Colname.quality) \
         .select(
             Colname.in_grid_area,
@@ -78,25 +70,17 @@ def aggregate_net_exchange_per_neighbour_ga(results: dict, metadata: Metadata) -
 
 # Function to aggregate hourly net exchange per grid area (step 2)
 def aggregate_net_exchange_per_ga(results: dict, metadata: Metadata) -> DataFrame:
-    df = results[ResultKeyName.aggregation_base_dataframe]
+    # The exchange per grid area is rolled up from the exchange per in and out grid area, instead of aggregating the time series again
+    # Both sides of the join are aggregated from the same dataframe, so the grouping columns are aliased to tell them apart
+    df = __get_exchange_per_in_and_out_ga(results)
     exchangeIn = df \
-        .filter(col(Colname.metering_point_type) == MarketEvaluationPointType.exchange.value) \
-        .filter((col(Colname.connection_state) == ConnectionState.connected.value) | (col(Colname.connection_state) == ConnectionState.disconnected.value))
-    exchangeIn = exchangeIn \
-        .groupBy(Colname.in_grid_area, window(col(Colname.time), "1 hour"), Colname.aggregated_quality) \
-        .sum(Colname.quantity) \
-        .withColumnRenamed(f"sum({Colname.quantity})", in_sum) \
-        .withColumnRenamed("window", Colname.time_window) \
-        .withColumnRenamed(Colname.in_grid_area, Colname.grid_area)
+        .groupBy(col(Colname.in_grid_area).alias(Colname.grid_area), col(Colname.time_window).alias(Colname.time_window), Colname.aggregated_quality) \
+        .sum(in_sum) \
+        .withColumnRenamed(f"sum({in_sum})", in_sum)
     exchangeOut = df \
-        .filter(col(Colname.metering_point_type) == MarketEvaluationPointType.exchange.value) \
-        .filter((col(Colname.connection_state) == ConnectionState.connected.value) | (col(Colname.connection_state) == ConnectionState.disconnected.value))
-    exchangeOut = exchangeOut \
-        .groupBy(Colname.out_grid_area, window(col(Colname.time), "1 hour")) \
-        .sum(Colname.quantity) \
-        .withColumnRenamed(f"sum({Colname.quantity})", out_sum) \
-        .withColumnRenamed("window", Colname.time_window) \
-        .withColumnRenamed(Colname.out_grid_area, Colname.grid_area)
+        .groupBy(col(Colname.out_grid_area).alias(Colname.grid_area), col(Colname.time_window).alias(Colname.time_window)) \
+        .sum(in_sum) \
+        .withColumnRenamed(f"sum({in_sum})", out_sum)
     joined = exchangeIn \
         .join(exchangeOut,
               (exchangeIn[Colname.grid_area] == exchangeOut[Colname.grid_area]) & (exchangeIn[Colname.time_window] == exchangeOut[Colname.time_window]),
@@ -115,36 +99,91 @@ def aggregate_net_exchange_per_ga(results: dict, metadata: Metadata) -> DataFram
     return create_dataframe_from_aggregation_result_schema(metadata, resultDf)
 
 
+def __get_exchange_per_in_and_out_ga(results: dict) -> DataFrame:
+    # Reuse the single pass aggregation shared by step 1 and 2 when it is part of the results
+    if ResultKeyName.exchange_per_in_and_out_ga in results:
+        return results[ResultKeyName.exchange_per_in_and_out_ga]
+    return __sum_exchange_per_in_and_out_ga(results[ResultKeyName.aggregation_base_dataframe])
+
+
+def __sum_exchange_per_in_and_out_ga(df: DataFrame) -> DataFrame:
+    return df \
+        .filter(col(Colname.metering_point_type) == MarketEvaluationPointType.exchange.value) \
+        .filter((col(Colname.connection_state) == ConnectionState.connected.value) | (col(Colname.connection_state) == ConnectionState.disconnected.value)) \
+        .groupBy(
+            Colname.in_grid_area,
+            Colname.out_grid_area,
+            window(col(Colname.time), "1 hour"),
+            Colname.aggregated_quality) \
+        .sum(Colname.quantity) \
+        .withColumnRenamed(f"sum({Colname.quantity})", in_sum) \
+        .withColumnRenamed("window", Colname.time_window)
+
+
+# Function to aggregate consumption and production per grid area, balance responsible party, energy supplier,
+# metering point type and settlement method in a single pass (shared by step 3, 4 and 5)
+def aggregate_consumption_and_production_per_ga_and_brp_and_es(results: dict, metadata: Metadata) -> DataFrame:
+    return __sum_per_ga_and_brp_and_es_and_type_and_method(results[ResultKeyName.aggregation_base_dataframe])
+
+
 # Function to aggregate hourly consumption per grid area, balance responsible party and energy supplier (step 3)
 def aggregate_hourly_consumption(results: dict, metadata: Metadata) -> DataFrame:
-    df = results[ResultKeyName.aggregation_base_dataframe]
-    return aggregate_per_ga_and_brp_and_es(df, MarketEvaluationPointType.consumption, SettlementMethod.non_profiled, metadata)
+    df = __get_consumption_and_production_per_ga_and_brp_and_es(results)
+    return __select_per_ga_and_brp_and_es(df, MarketEvaluationPointType.consumption, SettlementMethod.non_profiled, metadata)
 
 
 # Function to aggregate flex consumption per grid area, balance responsible party and energy supplier (step 4)
 def aggregate_flex_consumption(results: dict, metadata: Metadata) -> DataFrame:
-    df = results[ResultKeyName.aggregation_base_dataframe]
-    return aggregate_per_ga_and_brp_and_es(df, MarketEvaluationPointType.consumption, SettlementMethod.flex_settled, metadata)
+    df = __get_consumption_and_production_per_ga_and_brp_and_es(results)
+    return __select_per_ga_and_brp_and_es(df, MarketEvaluationPointType.consumption, SettlementMethod.flex_settled, metadata)
 
 
 # Function to aggregate hourly production per grid area, balance responsible party and energy supplier (step 5)
 def aggregate_hourly_production(results: dict, metadata: Metadata) -> DataFrame:
-    df = results[ResultKeyName.aggregation_base_dataframe]
-    return aggregate_per_ga_and_brp_and_es(df, MarketEvaluationPointType.production, None, metadata)
+    df = __get_consumption_and_production_per_ga_and_brp_and_es(results)
+    return __select_per_ga_and_brp_and_es(df, MarketEvaluationPointType.production, None, metadata)
 
 
 # Function to aggregate sum per grid area, balance responsible party and energy supplier (step 3, 4 and 5)
 def aggregate_per_ga_and_brp_and_es(df: DataFrame, market_evaluation_point_type: MarketEvaluationPointType, settlement_method: SettlementMethod, metadata: Metadata):
+    result = __sum_per_ga_and_brp_and_es_and_type_and_method(df)
+    return __select_per_ga_and_brp_and_es(result, market_evaluation_point_type, settlement_method, metadata)
+
+
+def __get_consumption_and_production_per_ga_and_brp_and_es(results: dict) -> DataFrame:
+    # Reuse the single pass aggregation shared by step 3, 4 and 5 when it is part of the results
+    if ResultKeyName.consumption_and_production_per_ga_brp_es in results:
+        return results[ResultKeyName.consumption_and_production_per_ga_brp_es]
+    return __sum_per_ga_and_brp_and_es_and_type_and_method(results[ResultKeyName.aggregation_base_dataframe])
+
+
+def __sum_per_ga_and_brp_and_es_and_type_and_method(df: DataFrame) -> DataFrame:
+    # Production is aggregated regardless of settlement method
+    settlement_method = when(col(Colname.metering_point_type) == MarketEvaluationPointType.production.value, lit(None)) \
+        .otherwise(col(Colname.settlement_method))
+    return df \
+        .filter(col(Colname.metering_point_type).isin(MarketEvaluationPointType.consumption.value, MarketEvaluationPointType.production.value)) \
+        .filter((col(Colname.connection_state) == ConnectionState.connected.value) | (col(Colname.connection_state) == ConnectionState.disconnected.value)) \
+        .withColumn(Colname.settlement_method, settlement_method) \
+        .groupBy(
+            Colname.grid_area,
+            Colname.balance_responsible_id,
+            Colname.energy_supplier_id,
+            window(col(Colname.time), "1 hour"),
+            Colname.aggregated_quality,
+            Colname.metering_point_type,
+            Colname.settlement_method) \
+        .sum(Colname.quantity) \
+        .withColumnRenamed(f"sum({Colname.quantity})", Colname.sum_quantity) \
+        .withColumnRenamed("window", Colname.time_window) \
+        .withColumnRenamed(Colname.aggregated_quality, Colname.quality)
+
+
+def __select_per_ga_and_brp_and_es(df: DataFrame, market_evaluation_point_type: MarketEvaluationPointType, settlement_method: SettlementMethod, metadata: Metadata) -> DataFrame:
     result = df.filter(col(Colname.metering_point_type) == market_evaluation_point_type.value)
     if settlement_method is not None:
         result = result.filter(col(Colname.settlement_method) == settlement_method.value)
-    result = result.filter((col(Colname.connection_state) == ConnectionState.connected.value) | (col(Colname.connection_state) == ConnectionState.disconnected.value))
     result = result \
-        .groupBy(Colname.grid_area, Colname.balance_responsible_id, Colname.energy_supplier_id, window(col(Colname.time), "1 hour"), Colname.aggregated_quality) \
-        .sum(Colname.quantity) \
-        .withColumnRenamed(f"sum({Colname.quantity})", Colname.sum_quantity) \
-        .withColumnRenamed("window", Colname.time_window) \
-        .withColumnRenamed(Colname.aggregated_quality, Colname.quality) \
         .select(
             Colname.grid_area,
             Colname.balance_responsible_id,
@@ -158,24 +197,41 @@ def aggregate_per_ga_and_brp_and_es(df: DataFrame, market_evaluation_point_type:
     return create_dataframe_from_aggregation_result_schema(metadata, result)
 
 
+# Function to aggregate hourly production per grid area and energy supplier, per grid area and balance responsible party
+# and per grid area in a single pass (shared by step 12, 15 and 18)
+def aggregate_hourly_production_rollup(results: dict, metadata: Metadata) -> DataFrame:
+    return __rollup_per_ga_and_es_and_brp(results[ResultKeyName.hourly_production_with_system_correction_and_grid_loss])
+
+
+# Function to aggregate hourly settled consumption in the same way (shared by step 13, 16 and 19)
+def aggregate_hourly_settled_consumption_rollup(results: dict, metadata: Metadata) -> DataFrame:
+    return __rollup_per_ga_and_es_and_brp(results[ResultKeyName.hourly_consumption])
+
+
+# Function to aggregate flex settled consumption in the same way (shared by step 14, 17 and 20)
+def aggregate_flex_settled_consumption_rollup(results: dict, metadata: Metadata) -> DataFrame:
+    return __rollup_per_ga_and_es_and_brp(results[ResultKeyName.flex_consumption_with_grid_loss])
+
+
 def aggregate_hourly_production_ga_es(results: dict, metadata: Metadata) -> DataFrame:
-    return __aggregate_per_ga_and_es(results[ResultKeyName.hourly_production_with_system_correction_and_grid_loss], MarketEvaluationPointType.production, metadata)
+    df = __get_rollup(results, ResultKeyName.hourly_production_rollup, ResultKeyName.hourly_production_with_system_correction_and_grid_loss)
+    return __aggregate_per_ga_and_es(df, MarketEvaluationPointType.production, metadata)
 
 
 def aggregate_hourly_settled_consumption_ga_es(results: dict, metadata: Metadata) -> DataFrame:
-    return __aggregate_per_ga_and_es(results[ResultKeyName.hourly_consumption], MarketEvaluationPointType.consumption, metadata)
+    df = __get_rollup(results, ResultKeyName.hourly_settled_consumption_rollup, ResultKeyName.hourly_consumption)
+    return __aggregate_per_ga_and_es(df, MarketEvaluationPointType.consumption, metadata)
 
 
 def aggregate_flex_settled_consumption_ga_es(results: dict, metadata: Metadata) -> DataFrame:
-    return __aggregate_per_ga_and_es(results[ResultKeyName.flex_consumption_with_grid_loss], MarketEvaluationPointType.consumption, metadata)
+    df = __get_rollup(results, ResultKeyName.flex_settled_consumption_rollup, ResultKeyName.flex_consumption_with_grid_loss)
+    return __aggregate_per_ga_and_es(df, MarketEvaluationPointType.consumption, metadata)
 
 
 # Function to aggregate sum per grid area and energy supplier (step 12, 13 and 14)
 def __aggregate_per_ga_and_es(df: DataFrame, market_evaluation_point_type: MarketEvaluationPointType, metadata: Metadata) -> DataFrame:
     result = df \
-        .groupBy(Colname.grid_area, Colname.energy_supplier_id, Colname.time_window, Colname.quality) \
-        .sum(Colname.sum_quantity) \
-        .withColumnRenamed(f'sum({Colname.sum_quantity})', Colname.sum_quantity) \
+        .filter(col(grouping_set) == per_ga_and_es) \
         .select(
             Colname.grid_area,
             Colname.energy_supplier_id,
@@ -188,23 +244,24 @@ def __aggregate_per_ga_and_es(df: DataFrame, market_evaluation_point_type: Marke
 
 
 def aggregate_hourly_production_ga_brp(results: dict, metadata: Metadata) -> DataFrame:
-    return __aggregate_per_ga_and_brp(results[ResultKeyName.hourly_production_with_system_correction_and_grid_loss], MarketEvaluationPointType.production, metadata)
+    df = __get_rollup(results, ResultKeyName.hourly_production_rollup, ResultKeyName.hourly_production_with_system_correction_and_grid_loss)
+    return __aggregate_per_ga_and_brp(df, MarketEvaluationPointType.production, metadata)
 
 
 def aggregate_hourly_settled_consumption_ga_brp(results: dict, metadata: Metadata) -> DataFrame:
-    return __aggregate_per_ga_and_brp(results[ResultKeyName.hourly_consumption], MarketEvaluationPointType.consumption, metadata)
+    df = __get_rollup(results, ResultKeyName.hourly_settled_consumption_rollup, ResultKeyName.hourly_consumption)
+    return __aggregate_per_ga_and_brp(df, MarketEvaluationPointType.consumption, metadata)
 
 
 def aggregate_flex_settled_consumption_ga_brp(results: dict, metadata: Metadata) -> DataFrame:
-    return __aggregate_per_ga_and_brp(results[ResultKeyName.flex_consumption_with_grid_loss], MarketEvaluationPointType.consumption, metadata)
+    df = __get_rollup(results, ResultKeyName.flex_settled_consumption_rollup, ResultKeyName.flex_consumption_with_grid_loss)
+    return __aggregate_per_ga_and_brp(df, MarketEvaluationPointType.consumption, metadata)
 
 
 # Function to aggregate sum per grid area and balance responsible party (step 15, 16 and 17)
 def __aggregate_per_ga_and_brp(df: DataFrame, market_evaluation_point_type: MarketEvaluationPointType, metadata: Metadata) -> DataFrame:
     result = df \
-        .groupBy(Colname.grid_area, Colname.balance_responsible_id, Colname.time_window, Colname.quality) \
-        .sum(Colname.sum_quantity) \
-        .withColumnRenamed(f'sum({Colname.sum_quantity})', Colname.sum_quantity) \
+        .filter(col(grouping_set) == per_ga_and_brp) \
         .select(
             Colname.grid_area,
             Colname.balance_responsible_id,
@@ -217,23 +274,24 @@ def __aggregate_per_ga_and_brp(df: DataFrame, market_evaluation_point_type: Mark
 
 
 def aggregate_hourly_production_ga(results: dict, metadata: Metadata) -> DataFrame:
-    return __aggregate_per_ga(results[ResultKeyName.hourly_production_with_system_correction_and_grid_loss], MarketEvaluationPointType.production, metadata)
+    df = __get_rollup(results, ResultKeyName.hourly_production_rollup, ResultKeyName.hourly_production_with_system_correction_and_grid_loss)
+    return __aggregate_per_ga(df, MarketEvaluationPointType.production, metadata)
 
 
 def aggregate_hourly_settled_consumption_ga(results: dict, metadata: Metadata) -> DataFrame:
-    return __aggregate_per_ga(results[ResultKeyName.hourly_consumption], MarketEvaluationPointType.consumption, metadata)
+    df = __get_rollup(results, ResultKeyName.hourly_settled_consumption_rollup, ResultKeyName.hourly_consumption)
+    return __aggregate_per_ga(df, MarketEvaluationPointType.consumption, metadata)
 
 
 def aggregate_flex_settled_consumption_ga(results: dict, metadata: Metadata) -> DataFrame:
-    return __aggregate_per_ga(results[ResultKeyName.flex_consumption_with_grid_loss], MarketEvaluationPointType.consumption, metadata)
+    df = __get_rollup(results, ResultKeyName.flex_settled_consumption_rollup, ResultKeyName.flex_consumption_with_grid_loss)
+    return __aggregate_per_ga(df, MarketEvaluationPointType.consumption, metadata)
 
 
 # Function to aggregate sum per grid area (step 18, 19 and 20)
 def __aggregate_per_ga(df: DataFrame, market_evaluation_point_type: MarketEvaluationPointType, metadata: Metadata) -> DataFrame:
     result = df \
-        .groupBy(Colname.grid_area, Colname.time_window, Colname.quality) \
-        .sum(Colname.sum_quantity) \
-        .withColumnRenamed(f'sum({Colname.sum_quantity})', Colname.sum_quantity) \
+        .filter(col(grouping_set) == per_ga) \
         .select(
             Colname.grid_area,
             Colname.time_window,
@@ -242,3 +300,30 @@ def __aggregate_per_ga(df: DataFrame, market_evaluation_point_type: MarketEvalua
             lit(ResolutionDuration.hour).alias(Colname.resolution),  # TODO take resolution from metadata
             lit(market_evaluation_point_type.value).alias(Colname.metering_point_type))
     return create_dataframe_from_aggregation_result_schema(metadata, result)
+
+
+def __get_rollup(results: dict, rollup_key: int, key: int) -> DataFrame:
+    # Reuse the single pass rollup shared by the ga/es, ga/brp and ga steps when it is part of the results
+    if rollup_key in results:
+        return results[rollup_key]
+    return __rollup_per_ga_and_es_and_brp(results[key])
+
+
+def __rollup_per_ga_and_es_and_brp(df: DataFrame) -> DataFrame:
+    # Aggregates the grouping sets (ga, es), (ga, brp) and (ga) in a single aggregation, like GROUPING SETS does:
+    # Each row is repeated once per grouping set, with the columns that are not part of the grouping set set to null.
+    # The grouping set column tells the sums of the grouping sets apart, also when the energy supplier or balance responsible is null.
+    df = df \
+        .withColumn(grouping_set, explode(array(lit(per_ga_and_es), lit(per_ga_and_brp), lit(per_ga)))) \
+        .withColumn(Colname.energy_supplier_id, when(col(grouping_set) == per_ga_and_es, col(Colname.energy_supplier_id))) \
+        .withColumn(Colname.balance_responsible_id, when(col(grouping_set) == per_ga_and_brp, col(Colname.balance_responsible_id)))
+    return df \
+        .groupBy(
+            grouping_set,
+            Colname.grid_area,
+            Colname.energy_supplier_id,
+            Colname.balance_responsible_id,
+            Colname.time_window,
+            Colname.quality) \
+        .sum(Colname.sum_quantity) \
+        .withColumnRenamed(f'sum({Colname.sum_quantity})', Colname.sum_quantity)
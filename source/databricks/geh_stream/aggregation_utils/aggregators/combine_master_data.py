@@ -13,7 +13,7 @@
 # # limitations under the License.
 from geh_stream.codelists import Colname, ResultKeyName
 from pyspark.sql import DataFrame
-from pyspark.sql.functions import col, when
+from geh_stream.aggregation_utils.aggregators.grid_loss_responsibility import join_responsible_metering_points
 from geh_stream.shared.data_classes import Metadata
 
 
@@ -35,36 +35,21 @@ def combine_added_grid_loss_with_master_data(results: dict, metadata: Metadata)
 def combine_master_data(timeseries_df: DataFrame, grid_loss_sys_cor_master_data_df: DataFrame, quantity_column_name, mp_check):
     df = timeseries_df.withColumnRenamed(quantity_column_name, Colname.quantity)
     mddf = grid_loss_sys_cor_master_data_df.withColumnRenamed(Colname.grid_area, metering_grid_area_domain_mrid_drop)
-    return df.join(
-        mddf,
-        when(
-            col(Colname.to_date).isNotNull(),
-            col(Colname.time_window_start) <= col(Colname.to_date),
-        ).otherwise(True)
-        & (col(Colname.time_window_start) >= col(Colname.from_date))
-        & (
-            col(Colname.to_date).isNull()
-            | (col(Colname.time_window_end) <= col(Colname.to_date))
+    return join_responsible_metering_points(df, mddf, metering_grid_area_domain_mrid_drop, mp_check, "inner") \
+        .select(
+            df[Colname.grid_area],
+            df[Colname.quantity],
+            df[Colname.time_window],
+            mddf[Colname.metering_point_id],
+            mddf[Colname.from_date],
+            mddf[Colname.to_date],
+            df[Colname.resolution],
+            df[Colname.energy_supplier_id],
+            df[Colname.balance_responsible_id],
+            df[Colname.in_grid_area],
+            df[Colname.out_grid_area],
+            df[Colname.metering_point_type],
+            df[Colname.settlement_method],
+            mddf[Colname.is_grid_loss],
+            mddf[Colname.is_system_correction]
         )
-        & (
-            col(Colname.grid_area)
-            == col(metering_grid_area_domain_mrid_drop)
-        )
-        & (col(mp_check)), "inner"
-    ).select(
-        df[Colname.grid_area],
-        df[Colname.quantity],
-        df[Colname.time_window],
-        mddf[Colname.metering_point_id],
-        mddf[Colname.from_date],
-        mddf[Colname.to_date],
-        df[Colname.resolution],
-        df[Colname.energy_supplier_id],
-        df[Colname.balance_responsible_id],
-        df[Colname.in_grid_area],
-        df[Colname.out_grid_area],
-        df[Colname.metering_point_type],
-        df[Colname.settlement_method],
-        mddf[Colname.is_grid_loss],
-        mddf[Colname.is_system_correction]
-    )
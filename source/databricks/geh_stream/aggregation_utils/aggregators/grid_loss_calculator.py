@@ -14,19 +14,23 @@
 
 from geh_stream.codelists import Colname, ResultKeyName, ResolutionDuration, MarketEvaluationPointType, Quality
 from pyspark.sql import DataFrame
-from pyspark.sql.functions import col, when, lit
-from .aggregate_quality import aggregate_total_consumption_quality
+from pyspark.sql.functions import col, when, lit, count, sum
 from geh_stream.shared.data_classes import Metadata
 from geh_stream.aggregation_utils.aggregation_result_formatter import create_dataframe_from_aggregation_result_schema
 
 
-production_sum_quantity = "production_sum_quantity"
-exchange_sum_quantity = "exchange_sum_quantity"
-aggregated_production_quality = "aggregated_production_quality"
-aggregated_net_exchange_quality = "aggregated_net_exchange_quality"
+input_tag = "input_tag"
+net_exchange_tag = "net_exchange"
+hourly_tag = "hourly"
+flex_tag = "flex"
+production_tag = "production"
+net_exchange_result = "net_exchange_result"
 hourly_result = "hourly_result"
 flex_result = "flex_result"
 prod_result = "prod_result"
+net_exchange_count = "net_exchange_count"
+production_count = "production_count"
+estimated_quality_count = "estimated_quality_count"
 
 
 # Function used to calculate grid loss (step 6)
@@ -47,27 +51,21 @@ def calculate_residual_ga(results: dict, metadata: Metadata) -> DataFrame:
 
 
 def __calculate_grid_loss_or_residual_ga(agg_net_exchange: DataFrame, agg_hourly_consumption: DataFrame, agg_flex_consumption: DataFrame, agg_production: DataFrame, metadata: Metadata) -> DataFrame:
-    agg_net_exchange_result = agg_net_exchange.selectExpr(Colname.grid_area, f"{Colname.sum_quantity} as net_exchange_result", Colname.time_window)
-    agg_hourly_consumption_result = agg_hourly_consumption \
-        .selectExpr(Colname.grid_area, f"{Colname.sum_quantity} as {hourly_result}", Colname.time_window) \
+    # All inputs are summed in one aggregation per grid area and hour instead of aggregating and joining each input separately.
+    # A sum is null when the grid area has no rows of that input within the hour, as it was with the left joins.
+    result = __union_tagged([
+        (agg_net_exchange, net_exchange_tag),
+        (agg_hourly_consumption, hourly_tag),
+        (agg_flex_consumption, flex_tag),
+        (agg_production, production_tag)]) \
         .groupBy(Colname.grid_area, Colname.time_window) \
-        .sum(hourly_result) \
-        .withColumnRenamed(f"sum({hourly_result})", hourly_result)
-    agg_flex_consumption_result = agg_flex_consumption \
-        .selectExpr(Colname.grid_area, f"{Colname.sum_quantity} as {flex_result}", Colname.time_window) \
-        .groupBy(Colname.grid_area, Colname.time_window) \
-        .sum(flex_result) \
-        .withColumnRenamed(f"sum({flex_result})", flex_result)
-    agg_production_result = agg_production \
-        .selectExpr(Colname.grid_area, f"{Colname.sum_quantity} as {prod_result}", Colname.time_window) \
-        .groupBy(Colname.grid_area, Colname.time_window) \
-        .sum(prod_result) \
-        .withColumnRenamed(f"sum({prod_result})", prod_result)
-
-    result = agg_net_exchange_result \
-        .join(agg_production_result, [Colname.grid_area, Colname.time_window], "left") \
-        .join(agg_flex_consumption_result.join(agg_hourly_consumption_result, [Colname.grid_area, Colname.time_window], "left"), [Colname.grid_area, Colname.time_window], "left") \
-        .orderBy(Colname.grid_area, Colname.time_window)
+        .agg(
+            count(when(col(input_tag) == net_exchange_tag, 1)).alias(net_exchange_count),
+            __sum_of(net_exchange_tag).alias(net_exchange_result),
+            __sum_of(hourly_tag).alias(hourly_result),
+            __sum_of(flex_tag).alias(flex_result),
+            __sum_of(production_tag).alias(prod_result)) \
+        .filter(col(net_exchange_count) > 0)
 
     result = result\
         .withColumn(Colname.sum_quantity, result.net_exchange_result + result.prod_result - (result.hourly_result + result.flex_result))
@@ -116,25 +114,36 @@ def calculate_added_grid_loss(results: dict, metadata: Metadata):
 def calculate_total_consumption(results: dict, metadata: Metadata) -> DataFrame:
     agg_net_exchange = results[ResultKeyName.net_exchange_per_ga]
     agg_production = results[ResultKeyName.hourly_production_ga]
-    result_production = agg_production.selectExpr(Colname.grid_area, Colname.time_window, Colname.sum_quantity, Colname.quality) \
-        .groupBy(Colname.grid_area, Colname.time_window, Colname.quality).sum(Colname.sum_quantity) \
-        .withColumnRenamed(f"sum({Colname.sum_quantity})", production_sum_quantity) \
-        .withColumnRenamed(Colname.quality, aggregated_production_quality)
-
-    result_net_exchange = agg_net_exchange.selectExpr(Colname.grid_area, Colname.time_window, Colname.sum_quantity, Colname.quality) \
-        .groupBy(Colname.grid_area, Colname.time_window, Colname.quality).sum(Colname.sum_quantity) \
-        .withColumnRenamed(f"sum({Colname.sum_quantity})", exchange_sum_quantity) \
-        .withColumnRenamed(Colname.quality, aggregated_net_exchange_quality)
-
-    result = result_production.join(result_net_exchange, [Colname.grid_area, Colname.time_window], "inner") \
-        .withColumn(Colname.sum_quantity, col(production_sum_quantity) + col(exchange_sum_quantity))
+    # Only grid areas with both production and net exchange within the hour have a total consumption
+    result = __union_tagged([(agg_net_exchange, net_exchange_tag), (agg_production, production_tag)]) \
+        .groupBy(Colname.grid_area, Colname.time_window) \
+        .agg(
+            count(when(col(input_tag) == net_exchange_tag, 1)).alias(net_exchange_count),
+            count(when(col(input_tag) == production_tag, 1)).alias(production_count),
+            sum(Colname.sum_quantity).alias(Colname.sum_quantity),
+            # Count entries where quality is estimated (Quality=56) or quantity missing (Quality=QM)
+            count(when(col(Colname.quality).isin(Quality.estimated.value, Quality.quantity_missing.value), 1)).alias(estimated_quality_count)) \
+        .filter((col(net_exchange_count) > 0) & (col(production_count) > 0))
 
-    result = aggregate_total_consumption_quality(result).orderBy(Colname.grid_area, Colname.time_window).select(
+    result = result.select(
             Colname.grid_area,
             Colname.time_window,
-            Colname.quality,
+            # Set quality to as read (Quality=E01) if no entries where quality is estimated or quantity missing
+            when(col(estimated_quality_count) > 0, Quality.estimated.value).otherwise(Quality.as_read.value).alias(Colname.quality),
             Colname.sum_quantity,
             lit(ResolutionDuration.hour).alias(Colname.resolution),  # TODO take resolution from metadata
             lit(MarketEvaluationPointType.consumption.value).alias(Colname.metering_point_type))
 
     return create_dataframe_from_aggregation_result_schema(metadata, result)
+
+
+def __union_tagged(inputs: list) -> DataFrame:
+    tagged = [df.select(Colname.grid_area, Colname.time_window, Colname.sum_quantity, Colname.quality, lit(tag).alias(input_tag)) for df, tag in inputs]
+    result = tagged[0]
+    for df in tagged[1:]:
+        result = result.union(df)
+    return result
+
+
+def __sum_of(tag: str):
+    return sum(when(col(input_tag) == tag, col(Colname.sum_quantity)))
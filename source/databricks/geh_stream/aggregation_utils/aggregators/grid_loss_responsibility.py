@@ -0,0 +1,34 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from geh_stream.codelists import Colname
+from pyspark.sql import DataFrame
+from pyspark.sql.functions import col
+
+
+def join_responsible_metering_points(df: DataFrame, grid_loss_sys_cor_df: DataFrame, grid_area_column: str, is_responsible_column: str, how: str) -> DataFrame:
+    """
+    Joins the results with the grid loss or system correction metering points of their grid area,
+    that are registered for the whole time window of the result. A metering point without to_date is registered until further notice.
+
+    The join is an equi-join on grid area, so Spark does not compare every result with every metering point.
+    """
+    responsible_df = grid_loss_sys_cor_df.filter(col(is_responsible_column))
+    return df.join(
+        responsible_df,
+        [
+            df[Colname.grid_area] == responsible_df[grid_area_column],
+            df[Colname.time_window_start] >= responsible_df[Colname.from_date],
+            responsible_df[Colname.to_date].isNull() | (df[Colname.time_window_end] <= responsible_df[Colname.to_date])
+        ],
+        how)
@@ -0,0 +1,94 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from threading import Lock
+from typing import Dict, Iterable, List
+from pyspark import StorageLevel
+from pyspark.sql import DataFrame
+from geh_stream.codelists import ResultKeyName
+
+
+# Storage level of each result that is read by other steps. Results not listed are never persisted.
+default_storage_levels = {
+    ResultKeyName.aggregation_base_dataframe: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.grid_loss_sys_cor_master_data: StorageLevel.MEMORY_ONLY,
+    ResultKeyName.consumption_and_production_per_ga_brp_es: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.exchange_per_in_and_out_ga: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.net_exchange_per_ga: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.hourly_consumption: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.flex_consumption: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.hourly_production: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.grid_loss: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.added_system_correction: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.added_grid_loss: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.flex_consumption_with_grid_loss: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.hourly_production_with_system_correction_and_grid_loss: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.hourly_production_rollup: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.hourly_settled_consumption_rollup: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.flex_settled_consumption_rollup: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.hourly_production_ga: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.hourly_settled_consumption_ga: StorageLevel.MEMORY_AND_DISK,
+    ResultKeyName.flex_settled_consumption_ga: StorageLevel.MEMORY_AND_DISK,
+}
+
+
+class ResultCache:
+    """
+    Persists results that are read by at least one step of the job and unpersists them
+    as soon as the last step reading them has been released.
+    A result read by a single step is persisted too, as it is read again when it is written.
+
+    A step is released when its result has been written, or when it is dropped without being written.
+    A result that is never written itself is released once all of its consumers have been released.
+    """
+
+    def __init__(self, dependencies: Dict[int, List[int]], steps: Iterable[int], storage_levels: Dict[int, StorageLevel] = default_storage_levels):
+        self.dependencies = dependencies
+        self.storage_levels = storage_levels
+        self.__lock = Lock()
+        self.__persisted = {}
+        self.__released = set()
+        self.__consumers = {}
+        for step in steps:
+            for dependency in dependencies.get(step, []):
+                self.__consumers[dependency] = self.__consumers.get(dependency, 0) + 1
+
+    def persist(self, key: int, df: DataFrame) -> DataFrame:
+        with self.__lock:
+            if key in self.storage_levels and self.__consumers.get(key, 0) > 0:
+                df = df.persist(self.storage_levels[key])
+                self.__persisted[key] = df
+        return df
+
+    def release(self, key: int):
+        with self.__lock:
+            self.__release(key)
+
+    def unpersist_all(self):
+        with self.__lock:
+            for df in self.__persisted.values():
+                df.unpersist()
+            self.__persisted.clear()
+
+    def __release(self, key: int):
+        if key in self.__released:
+            return
+        self.__released.add(key)
+        for dependency in self.dependencies.get(key, []):
+            if dependency not in self.__consumers:
+                continue
+            self.__consumers[dependency] -= 1
+            if self.__consumers[dependency] == 0:
+                if dependency in self.__persisted:
+                    self.__persisted.pop(dependency).unpersist()
+                self.__release(dependency)
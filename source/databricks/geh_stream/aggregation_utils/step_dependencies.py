@@ -0,0 +1,69 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from geh_stream.codelists import ResultKeyName
+
+
+# The results each aggregation step reads. Every step produces the result with its own key.
+# Keep aligned with the results dictionary lookups in the aggregators.
+# Steps with a key that is not a multiple of 10 are intermediate results, which are added to a job when a step in the job depends on them.
+step_dependencies = {
+    ResultKeyName.exchange_per_in_and_out_ga: [ResultKeyName.aggregation_base_dataframe],
+    ResultKeyName.net_exchange_per_neighbour: [ResultKeyName.exchange_per_in_and_out_ga],
+    ResultKeyName.net_exchange_per_ga: [ResultKeyName.exchange_per_in_and_out_ga],
+    ResultKeyName.consumption_and_production_per_ga_brp_es: [ResultKeyName.aggregation_base_dataframe],
+    ResultKeyName.hourly_consumption: [ResultKeyName.consumption_and_production_per_ga_brp_es],
+    ResultKeyName.flex_consumption: [ResultKeyName.consumption_and_production_per_ga_brp_es],
+    ResultKeyName.hourly_production: [ResultKeyName.consumption_and_production_per_ga_brp_es],
+    ResultKeyName.grid_loss: [
+        ResultKeyName.net_exchange_per_ga,
+        ResultKeyName.hourly_consumption,
+        ResultKeyName.flex_consumption,
+        ResultKeyName.hourly_production],
+    ResultKeyName.added_system_correction: [ResultKeyName.grid_loss],
+    ResultKeyName.added_grid_loss: [ResultKeyName.grid_loss],
+    ResultKeyName.combined_system_correction: [ResultKeyName.added_system_correction, ResultKeyName.grid_loss_sys_cor_master_data],
+    ResultKeyName.combined_grid_loss: [ResultKeyName.added_grid_loss, ResultKeyName.grid_loss_sys_cor_master_data],
+    ResultKeyName.flex_consumption_with_grid_loss: [
+        ResultKeyName.flex_consumption,
+        ResultKeyName.added_grid_loss,
+        ResultKeyName.grid_loss_sys_cor_master_data],
+    ResultKeyName.hourly_production_with_system_correction_and_grid_loss: [
+        ResultKeyName.hourly_production,
+        ResultKeyName.added_system_correction,
+        ResultKeyName.grid_loss_sys_cor_master_data],
+    ResultKeyName.hourly_production_rollup: [ResultKeyName.hourly_production_with_system_correction_and_grid_loss],
+    ResultKeyName.hourly_settled_consumption_rollup: [ResultKeyName.hourly_consumption],
+    ResultKeyName.flex_settled_consumption_rollup: [ResultKeyName.flex_consumption_with_grid_loss],
+    ResultKeyName.hourly_production_ga_es: [ResultKeyName.hourly_production_rollup],
+    ResultKeyName.hourly_settled_consumption_ga_es: [ResultKeyName.hourly_settled_consumption_rollup],
+    ResultKeyName.flex_settled_consumption_ga_es: [ResultKeyName.flex_settled_consumption_rollup],
+    ResultKeyName.hourly_production_ga_brp: [ResultKeyName.hourly_production_rollup],
+    ResultKeyName.hourly_settled_consumption_ga_brp: [ResultKeyName.hourly_settled_consumption_rollup],
+    ResultKeyName.flex_settled_consumption_ga_brp: [ResultKeyName.flex_settled_consumption_rollup],
+    ResultKeyName.hourly_production_ga: [ResultKeyName.hourly_production_rollup],
+    ResultKeyName.hourly_settled_consumption_ga: [ResultKeyName.hourly_settled_consumption_rollup],
+    ResultKeyName.flex_settled_consumption_ga: [ResultKeyName.flex_settled_consumption_rollup],
+    ResultKeyName.total_consumption: [ResultKeyName.net_exchange_per_ga, ResultKeyName.hourly_production_ga],
+    ResultKeyName.residual_ga: [
+        ResultKeyName.net_exchange_per_ga,
+        ResultKeyName.hourly_settled_consumption_ga,
+        ResultKeyName.flex_settled_consumption_ga,
+        ResultKeyName.hourly_production_ga],
+}
+
+# Results that are not published yet. Their steps are skipped unless a published step depends on them.
+unpublished_results = [
+    ResultKeyName.combined_system_correction,  # TODO to be added to results later
+    ResultKeyName.combined_grid_loss,  # TODO to be added to results later
+]
@@ -0,0 +1,126 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, List, Tuple
+
+
+def is_intermediate_result(key: int) -> bool:
+    # Intermediate results have a key that is not a multiple of 10, and are never published themselves
+    return key % 10 != 0
+
+
+def add_required_steps(steps: dict, functions: Dict[int, Callable], dependencies: Dict[int, List[int]], job_steps: dict = None) -> dict:
+    """
+    Add the registered steps that the given steps depend on, directly or indirectly, but which are not part of the steps.
+    Dependencies that are part of the job steps are added with their metadata, and intermediate results are added without metadata.
+    Raises a ValueError if a step depends on a published result that is not part of the job.
+    """
+    job_steps = job_steps or {}
+    steps = dict(steps)
+    unvisited = list(steps)
+    while unvisited:
+        key = unvisited.pop()
+        for dependency in dependencies.get(key, []):
+            if dependency not in functions or dependency in steps:
+                continue
+            if dependency in job_steps:
+                steps[dependency] = job_steps[dependency]
+            elif is_intermediate_result(dependency):
+                steps[dependency] = None
+            else:
+                raise ValueError(f"Step {key} depends on step {dependency}, which is published but not part of the job")
+            unvisited.append(dependency)
+    return steps
+
+
+def prune_unpublished_steps(steps: dict, unpublished: Iterable[int], functions: Dict[int, Callable], dependencies: Dict[int, List[int]]) -> Tuple[dict, List[int]]:
+    """
+    Returns the steps that must run to publish the results of the given steps, and the keys of the given steps that are skipped.
+
+    The results of the unpublished steps are not published, so they only run when a published step depends on them.
+    Dependencies are added as described in add_required_steps.
+    """
+    unpublished = set(unpublished)
+    published = {key: metadata for key, metadata in steps.items() if key not in unpublished}
+    required = add_required_steps(published, functions, dependencies, steps)
+    skipped = sorted(key for key in steps if key not in required)
+    return required, skipped
+
+
+class StepScheduler:
+    """
+    Runs aggregation steps as a dependency graph instead of in a fixed order.
+
+    A step is started as soon as all the results it depends on are available, so
+    independent branches (e.g. the ga/es, ga/brp and ga rollups) run at the same time.
+    When a result cache is given, every result is handed to it before it is made available to other steps.
+    When on_step_completed is given, it is called with the key and result of each step as soon as the step is done,
+    e.g. to publish the result while other steps are still running.
+    """
+
+    def __init__(self, functions: Dict[int, Callable], dependencies: Dict[int, List[int]], max_workers: int = 4, cache=None,
+                 on_step_completed: Callable[[int, object], None] = None):
+        self.functions = functions
+        self.dependencies = dependencies
+        self.max_workers = max_workers
+        self.cache = cache
+        self.on_step_completed = on_step_completed
+
+    def run(self, results: dict, steps: dict) -> dict:
+        """
+        Run the given steps and add their results to the results dictionary.
+
+        steps: dictionary with step key as key and the metadata passed to the step function as value.
+        """
+        self.__validate(results, steps)
+
+        pending = dict(steps)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for key in [key for key in pending if self.__is_ready(key, results)]:
+                    metadata = pending.pop(key)
+                    # Each step gets its own view of the results, as results are added while steps are running
+                    running[executor.submit(self.functions[key], dict(results), metadata)] = key
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    result = future.result()
+                    results[key] = result if self.cache is None else self.cache.persist(key, result)
+                    if self.on_step_completed is not None:
+                        self.on_step_completed(key, results[key])
+
+        return results
+
+    def __is_ready(self, key: int, results: dict) -> bool:
+        return all(dependency in results for dependency in self.dependencies.get(key, []))
+
+    def __validate(self, results: dict, steps: dict):
+        for key in steps:
+            if key not in self.functions:
+                raise ValueError(f"No function registered for step {key}")
+            for dependency in self.dependencies.get(key, []):
+                if dependency not in results and dependency not in steps:
+                    raise ValueError(f"Step {key} depends on result {dependency} which is neither available nor part of the job")
+
+        # Resolve the graph without running anything to detect cycles up front
+        available = set(results)
+        unresolved = set(steps)
+        while unresolved:
+            ready = {key for key in unresolved if all(dependency in available for dependency in self.dependencies.get(key, []))}
+            if not ready:
+                raise ValueError(f"Circular dependencies between steps {sorted(unresolved)}")
+            available |= ready
+            unresolved -= ready
@@ -26,4 +26,6 @@ def trigger_base_arguments():
     p.add('--job-id', type=str, required=False, default="", help="Postback id that will be added to header. The id is unique")
     p.add('--snapshot-id', type=str, required=True, help="Id to mark snapshots The id is unique")
     p.add('--snapshot-path', type=str, required=True, default="snapshots")
+    p.add('--beginning-date-time', type=str, required=True, help="Start of the period of the snapshot, used to join master data in buckets within the period")
+    p.add('--end-date-time', type=str, required=True, help="End of the period of the snapshot, used to join master data in buckets within the period")
     return p
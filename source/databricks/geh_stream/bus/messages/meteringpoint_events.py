@@ -26,6 +26,19 @@ import dateutil.parser
 @dataclass_json
 @dataclass
 class MeteringPointCreated(Message):
+    metering_point_created_schema = StructType([
+        StructField(Colname.metering_point_id, StringType(), False),
+        StructField(Colname.metering_point_type, StringType(), False),
+        StructField(Colname.grid_area, StringType(), False),
+        StructField(Colname.settlement_method, StringType()),
+        StructField(Colname.metering_method, StringType(), False),
+        StructField(Colname.resolution, StringType(), False),
+        StructField(Colname.product, StringType()),
+        StructField(Colname.connection_state, StringType(), False),
+        StructField(Colname.unit, StringType(), False),
+        StructField(Colname.effective_date, TimestampType(), False),
+    ])
+
     # Event properties:
 
     metering_point_id: StringType()
@@ -15,6 +15,8 @@
 
 class BasisDataKeyName():
     time_series = "time_series"
+    hourly_time_series = "hourly_time_series"
+    daily_time_series = "daily_time_series"
     metering_points = "metering_points"
     market_roles = "market_roles"
     es_brp_relations = "es_brp_relations"
@@ -22,3 +24,4 @@ class BasisDataKeyName():
     charge_links = "charge_links"
     charge_prices = "charge_prices"
     grid_loss_sys_corr = "grid_loss_sys_corr"
+    snapshot_info = "snapshot_info"
@@ -16,6 +16,8 @@
 class ResultKeyName():
     aggregation_base_dataframe = 0
     grid_loss_sys_cor_master_data = 1
+    consumption_and_production_per_ga_brp_es = 2
+    exchange_per_in_and_out_ga = 3
     net_exchange_per_neighbour = 10
     net_exchange_per_ga = 20
     hourly_consumption = 30
@@ -28,6 +30,9 @@ class ResultKeyName():
     combined_grid_loss = 100
     flex_consumption_with_grid_loss = 110
     hourly_production_with_system_correction_and_grid_loss = 120
+    hourly_production_rollup = 121
+    hourly_settled_consumption_rollup = 122
+    flex_settled_consumption_rollup = 123
     hourly_production_ga_es = 130
     hourly_settled_consumption_ga_es = 140
     flex_settled_consumption_ga_es = 150
@@ -11,168 +11,80 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from pyspark.sql.dataframe import DataFrame, Column
-from pyspark.sql.functions import col, when, row_number, lead
+from pyspark.sql.dataframe import DataFrame
+from pyspark.sql.functions import col, lead, lit, last, coalesce
 from geh_stream.codelists import Colname
 from pyspark.sql.window import Window
 from typing import List
 
 
-def period_mutations(target_dataframe: DataFrame, event_df: DataFrame, cols_to_change: List[str]):
+period_start = "period_start"
+event_order = "event_order"
 
-    event_df = __rename_event_columns_to_update(event_df, cols_to_change)
 
-    # Join event dataframe with target dataframe
-    joined = target_dataframe \
-        .join(event_df, [Colname.metering_point_id], "inner")
+def period_mutations(periods: DataFrame, events: DataFrame, cols_to_change: List[str]) -> DataFrame:
+    """
+    Applies any number of events to the periods of any number of metering points in a single set-based pass.
 
-    # Periods that should not be updated
-    df_periods_to_keep = __get_periods_to_keep(joined)
+    Each event sets the columns it has a value for on all periods from its effective date and onwards.
+    Periods are split at the effective dates within them, and events are applied in order of effective date.
+    """
+    events = __rename_event_columns_to_update(
+        events.select(Colname.metering_point_id, Colname.effective_date, *cols_to_change),
+        cols_to_change)
 
-    # Periods that should be updated
-    df_periods_to_update = __get_periods_to_update(joined)
+    split_periods = __split_periods_at_effective_dates(periods, events)
 
-    # Count periods to update to be able to select update logic to apply
-    periods_to_update_count = df_periods_to_update.count()
+    # Add the events as rows ordered before periods starting at the same time, so every period
+    # can pick the latest value of each column set by an event at or before its start
+    event_rows = events \
+        .withColumnRenamed(Colname.effective_date, Colname.from_date) \
+        .withColumn(event_order, lit(0))
 
-    # Generic update function to find out if period to_date should be set to effective_date from event
-    update_func_to_date = (
-        when(
-            (col(Colname.from_date) < col(Colname.effective_date))
-            & (col(Colname.to_date) > col(Colname.effective_date)),
-            col(Colname.effective_date))
-        .otherwise(col(Colname.to_date)))
-
-    # Use this logic to update multiple periods with event data
-    if periods_to_update_count > 1:
-        df_periods_to_update = __update_multiple_periods(df_periods_to_update, update_func_to_date)
-
-    # Use this update logic if only one period should be updated and a new period should be added
-    else:
-        df_periods_to_update = __update_single_period(df_periods_to_update, update_func_to_date)
-
-    # If period exists that have to_date equal to effective_date,
-    # then it's held in new variable (this is added to the periods_to_keep to ensure that no data is updated)
-    split_period = __split_out_first_period(df_periods_to_update, target_dataframe.columns)
-
-    # Add split_periods to periods_to_keep
-    df_periods_to_keep = df_periods_to_keep \
-        .select(target_dataframe.columns) \
-        .union(split_period)
-
-    # Filter on periods that have to_date after effective_date
-    df_periods_to_update = __filter_out_split_period(split_period, df_periods_to_update)
-
-    # Update periods_to_update with event data
-    df_periods_to_update = __update_column_values(cols_to_change, df_periods_to_update)
-
-    # Union periods_to_keep and updated_periods
-    result = __create_result(df_periods_to_keep, df_periods_to_update, target_dataframe.columns)
-
-    return result
+    rows = split_periods \
+        .withColumn(event_order, lit(1)) \
+        .unionByName(event_rows, allowMissingColumns=True)
 
-
-def __update_multiple_periods(periods: DataFrame, update_func: Column) -> DataFrame:
-    # Window function to be used in row_number and lead functions
-    windowSpec = Window \
+    window_spec = Window \
         .partitionBy(Colname.metering_point_id) \
-        .orderBy(Colname.to_date)
-
-    # Set row_number on periods to update
-    periods = periods \
-        .withColumn("row_number", row_number().over(windowSpec))
-
-    # Set to_date based on update_func_to_date logic
-    periods = periods \
-        .withColumn(Colname.to_date, update_func)
-
-    # Add column next_from_date with next row's from_date
-    periods = periods \
-        .withColumn("next_from_date", lead(col(Colname.from_date), 1).over(windowSpec))
-
-    # Select first period in new variable, used to add new period to master dataframe
-    new_row = periods \
-        .filter(col("row_number") == 1)
-
-    # Set from_date and to_date on new_row
-    new_row = new_row \
-        .withColumn(Colname.from_date, col(Colname.to_date)) \
-        .withColumn(Colname.to_date, col("next_from_date"))
-
-    # Only add new_row if from_date and to_date are not equal
-    if(new_row.filter(col(Colname.from_date) != col(Colname.to_date)).count() == 1):
-        periods = periods \
-            .union(new_row)
-
-    # Drop column row_number as we don't need the column going forward
-    periods = periods \
-        .drop("row_number") \
-        .orderBy(col(Colname.from_date))
+        .orderBy(Colname.from_date, event_order) \
+        .rowsBetween(Window.unboundedPreceding, Window.currentRow)
 
-    return periods
-
-
-def __update_single_period(periods: DataFrame, update_func: Column) -> DataFrame:
-    # Set to_date based on update_func_to_date logic and add new column to hold old_to_date
-    periods = periods \
-        .withColumn("old_to_date", col(Colname.to_date)) \
-        .withColumn(Colname.to_date, update_func)
-    # new_row to be added, updated with to_date equal to old_to_date
-    new_row = periods \
-        .withColumn(Colname.from_date, col(Colname.effective_date)) \
-        .withColumn(Colname.to_date, col("old_to_date"))
-    # Add new_row to existing periods_to_update
-    periods = periods \
-        .union(new_row)
-
-    return periods
-
-
-def __split_out_first_period(periods_to_split: DataFrame, columns_to_select: List[Column]) -> DataFrame:
-    split_period = periods_to_split \
-        .filter(col(Colname.to_date) == col(Colname.effective_date)) \
-        .select(columns_to_select)
-
-    return split_period
-
-
-def __filter_out_split_period(split_period: DataFrame, updated_periods: DataFrame) -> DataFrame:
-    if not split_period.rdd.isEmpty():
-        updated_periods = updated_periods \
-            .filter(col(Colname.to_date) > split_period.first()[Colname.to_date])
-
-    return updated_periods
-
-
-def __update_column_values(cols_to_change: List[str], updated_periods: DataFrame) -> DataFrame:
     for col_to_change in cols_to_change:
-        updated_periods = updated_periods \
-            .withColumn(col_to_change, col(f"updated_{col_to_change}"))
-
-    return updated_periods
-
+        rows = rows \
+            .withColumn(col_to_change, coalesce(last(f"updated_{col_to_change}", ignorenulls=True).over(window_spec), col(col_to_change)))
 
-def __create_result(periods_to_keep: DataFrame, updated_periods: DataFrame, columns_to_select: List[Column]) -> DataFrame:
-    # Select only columns that corresponds to columns in target_dataframe
-    updated_periods = updated_periods \
-        .select(columns_to_select)
+    return rows \
+        .filter(col(event_order) == 1) \
+        .select(periods.columns)
 
-    # Union periods_to_keep with updated periods
-    result = periods_to_keep \
-        .select(columns_to_select) \
-        .union(updated_periods)
 
-    return result
+def __split_periods_at_effective_dates(periods: DataFrame, events: DataFrame) -> DataFrame:
+    effective_dates = events \
+        .select(col(Colname.metering_point_id).alias("event_metering_point_id"), Colname.effective_date) \
+        .distinct()
 
-
-def __get_periods_to_keep(df: DataFrame) -> DataFrame:
-    return df.filter(col(Colname.to_date) <= col(Colname.effective_date))
-
-
-def __get_periods_to_update(df: DataFrame) -> DataFrame:
-    return df \
-        .filter(col(Colname.to_date) > col(Colname.effective_date)) \
-        .orderBy(col(Colname.from_date))
+    # A new period starts at every effective date within a period
+    new_period_starts = periods \
+        .join(
+            effective_dates,
+            (col(Colname.metering_point_id) == col("event_metering_point_id"))
+            & (col(Colname.from_date) < col(Colname.effective_date))
+            & (col(Colname.to_date) > col(Colname.effective_date)),
+            "inner") \
+        .select(*periods.columns, col(Colname.effective_date).alias(period_start))
+
+    window_spec = Window \
+        .partitionBy(Colname.metering_point_id, Colname.from_date) \
+        .orderBy(period_start)
+
+    # Each part of a period ends where the next part starts, and the last part ends where the period ended
+    return periods \
+        .withColumn(period_start, col(Colname.from_date)) \
+        .union(new_period_starts) \
+        .withColumn(Colname.to_date, coalesce(lead(period_start, 1).over(window_spec), col(Colname.to_date))) \
+        .withColumn(Colname.from_date, col(period_start)) \
+        .drop(period_start)
 
 
 def __rename_event_columns_to_update(event_df: DataFrame, cols_to_change: List[str]) -> DataFrame:
@@ -0,0 +1,134 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from datetime import datetime
+from functools import reduce
+from delta.tables import DeltaTable
+from pyspark.sql.dataframe import DataFrame
+from pyspark.sql.functions import col, lit, from_json
+from pyspark.sql.session import SparkSession
+from pyspark.sql.types import StringType, TimestampType
+from geh_stream.bus import messages as m
+from geh_stream.codelists.colname import Colname
+from geh_stream.event_dispatch.dispatcher_base import period_mutations
+
+
+# Schema of the body of each integration event handled in batches
+event_body_schemas = {
+    m.MeteringPointCreated: m.MeteringPointCreated.metering_point_created_schema,
+    m.SettlementMethodUpdated: m.SettlementMethodUpdated.settlement_method_updated_schema,
+    m.MeteringPointConnected: m.MeteringPointConnected.metering_point_connected_schema,
+}
+
+# Columns identifying a metering point period in the master data
+merge_key = [Colname.metering_point_id, Colname.from_date]
+
+# Master data columns changed by each event that mutates metering point periods
+mutated_columns = {
+    m.SettlementMethodUpdated: [Colname.settlement_method],
+    m.MeteringPointConnected: [Colname.connection_state],
+}
+
+
+def dispatch_batch(events: DataFrame, master_data_path: str):
+    """
+    Applies a batch of integration events (integration_event_schema) to the metering point master data.
+
+    All events are applied in one set-based pass and committed with a single Delta MERGE,
+    so the batch can be used with foreachBatch on a stream of integration events.
+    """
+    spark = SparkSession.builder.getOrCreate()
+    events = events.persist()
+
+    try:
+        created_metering_points = get_created_metering_points(events)
+        mutation_events = get_mutation_events(events)
+        cols_to_change = [col_to_change for cols in mutated_columns.values() for col_to_change in cols]
+
+        master_data = DeltaTable.forPath(spark, master_data_path)
+
+        # Only periods of metering points with events in the batch are read and merged
+        metering_point_ids = mutation_events \
+            .select(Colname.metering_point_id) \
+            .union(created_metering_points.select(Colname.metering_point_id)) \
+            .distinct()
+
+        existing_periods = master_data \
+            .toDF() \
+            .join(metering_point_ids, Colname.metering_point_id, "leftsemi")
+
+        # Creation of a period that already exists, e.g. a redelivered event, does not change the period
+        created_periods = created_metering_points \
+            .join(existing_periods, merge_key, "leftanti")
+
+        periods = existing_periods \
+            .unionByName(created_periods)
+
+        # The MERGE fails if more than one row of the batch matches the same period, so each period is only merged once
+        updated_periods = period_mutations(periods, mutation_events, cols_to_change) \
+            .dropDuplicates(merge_key)
+
+        master_data.alias("master_data") \
+            .merge(
+                updated_periods.alias("updates"),
+                " AND ".join(f"master_data.{c} = updates.{c}" for c in merge_key)) \
+            .whenMatchedUpdateAll() \
+            .whenNotMatchedInsertAll() \
+            .execute()
+    finally:
+        events.unpersist()
+
+
+def get_created_metering_points(events: DataFrame) -> DataFrame:
+    # Same periods as created by the MeteringPointCreated message
+    return __get_event_bodies(events, m.MeteringPointCreated) \
+        .select(
+            Colname.metering_point_id,
+            Colname.metering_point_type,
+            Colname.settlement_method,
+            Colname.grid_area,
+            Colname.connection_state,
+            Colname.resolution,
+            lit(None).cast(StringType()).alias(Colname.in_grid_area),
+            lit(None).cast(StringType()).alias(Colname.out_grid_area),
+            Colname.metering_method,
+            lit(None).cast(StringType()).alias(Colname.parent_metering_point_id),
+            Colname.unit,
+            Colname.product,
+            col(Colname.effective_date).alias(Colname.from_date),
+            lit(datetime(9999, 1, 1, 0, 0)).cast(TimestampType()).alias(Colname.to_date))
+
+
+def get_mutation_events(events: DataFrame) -> DataFrame:
+    """
+    Returns the events mutating metering point periods with a column for each mutated column,
+    which is null for events that do not change the column.
+    """
+    all_cols_to_change = [col_to_change for cols in mutated_columns.values() for col_to_change in cols]
+
+    mutation_events = [
+        __get_event_bodies(events, message_type)
+        .select(
+            Colname.metering_point_id,
+            Colname.effective_date,
+            *[col(c) if c in cols_to_change else lit(None).cast(StringType()).alias(c) for c in all_cols_to_change])
+        for message_type, cols_to_change in mutated_columns.items()]
+
+    return reduce(DataFrame.union, mutation_events)
+
+
+def __get_event_bodies(events: DataFrame, message_type) -> DataFrame:
+    return events \
+        .filter(col(Colname.event_name) == message_type.__name__) \
+        .select(from_json(col("body"), event_body_schemas[message_type]).alias("body")) \
+        .select("body.*")
@@ -12,9 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from geh_stream.bus import MessageDispatcher, messages as m
+from pyspark.sql.dataframe import DataFrame
 from pyspark.sql.session import SparkSession
+from pyspark.sql.streaming import StreamingQuery
 from geh_stream.codelists.colname import Colname
 from geh_stream.event_dispatch.dispatcher_base import period_mutations
+from geh_stream.event_dispatch.meteringpoint_batch_dispatcher import dispatch_batch
 
 
 def meteringpoint_master_data_path() -> str:
@@ -86,3 +89,19 @@ meteringpoint_dispatcher = MessageDispatcher({
     m.SettlementMethodUpdated: on_settlement_method_updated,
     m.MeteringPointConnected: on_metering_point_connected,
 })
+
+
+def on_integration_events_batch(events: DataFrame, batch_id: int):
+    # All events of a micro-batch are applied to the master data at once instead of one message at a time
+    dispatch_batch(events, meteringpoint_master_data_path())
+
+
+def dispatch_integration_events(events: DataFrame, checkpoint_path: str) -> StreamingQuery:
+    """
+    Starts dispatching a stream of integration events (integration_event_schema) to the metering point master data in micro-batches.
+    """
+    return events \
+        .writeStream \
+        .foreachBatch(on_integration_events_batch) \
+        .option("checkpointLocation", checkpoint_path) \
+        .start()
@@ -22,3 +22,4 @@ from .data_loader import load_charge_links, \
     load_metering_points, \
     load_time_series_points, \
     initialize_spark
+from .range_join import range_join
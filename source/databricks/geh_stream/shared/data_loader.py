@@ -20,12 +20,24 @@ from pyspark.sql.session import SparkSession
 import pyspark.sql.functions as F
 from pyspark.sql.functions import col
 from pyspark.sql.window import Window
+from delta.tables import DeltaTable
 from geh_stream.shared.filters import filter_on_date, filter_on_period, filter_on_grid_areas, time_series_points_where_date_condition
 from typing import List
+from datetime import datetime, timezone
 from geh_stream.shared.services import StorageAccountService
 from geh_stream.shared.period import Period, parse_period
 
 
+# Number of rows fetched per round trip when reading from the SQL database
+sql_fetch_size = 10000
+
+# Number of parallel connections used to read charge prices
+charge_price_read_partitions = 16
+
+# Column of the change data feed of a Delta table holding the type of change of a row
+change_type_column = "_change_type"
+
+
 def initialize_spark(args):
     # Set spark config with storage account names/keys and the session timezone so that datetimes are displayed consistently (in UTC)
     spark_conf = (SparkConf(loadDefaults=True)
@@ -40,11 +52,12 @@ def initialize_spark(args):
         .getOrCreate()
 
 
-def __load_delta_data(spark: SparkSession, storage_base_path: str, delta_table_path: str, where_condition: str = None) -> DataFrame:
+def __load_delta_data(spark: SparkSession, storage_base_path: str, delta_table_path: str, where_condition: str = None, options: dict = None) -> DataFrame:
     path = StorageAccountService.get_storage_account_full_path(storage_base_path, delta_table_path)
     df = spark \
         .read \
         .format("delta") \
+        .options(**(options or {})) \
         .load(path)
 
     if where_condition is not None:
@@ -53,19 +66,74 @@ def __load_delta_data(spark: SparkSession, storage_base_path: str, delta_table_p
     return df
 
 
-def __load_from_sql_table(spark: SparkSession, args: Namespace, table_name: str) -> DataFrame:
-    return (spark
-            .read
-            .format("com.microsoft.sqlserver.jdbc.spark")
-            .option("url", f"jdbc:sqlserver://{args.shared_database_url};databaseName={args.shared_database_aggregations};")
-            .option("dbtable", table_name)
-            .option("user", args.shared_database_username)
-            .option("password", args.shared_database_password)
-            .load())
+def __load_from_sql_table(spark: SparkSession, args: Namespace, table_name: str, conditions: List[str] = None, partitioning: dict = None) -> DataFrame:
+    reader = (spark
+              .read
+              .format("com.microsoft.sqlserver.jdbc.spark")
+              .option("url", f"jdbc:sqlserver://{args.shared_database_url};databaseName={args.shared_database_aggregations};")
+              .option("dbtable", sql_table_query(table_name, conditions or []))
+              .option("fetchsize", sql_fetch_size)
+              .option("user", args.shared_database_username)
+              .option("password", args.shared_database_password))
+
+    for key, value in (partitioning or {}).items():
+        reader = reader.option(key, value)
+
+    return reader.load()
+
+
+def sql_table_query(table_name: str, conditions: List[str]) -> str:
+    """
+    Returns the table to read, as a subquery when there are conditions, so the rows are filtered by the database.
+    """
+    conditions = [condition for condition in conditions if condition]
+    if not conditions:
+        return table_name
+    return f"(SELECT * FROM {table_name} WHERE {' AND '.join(conditions)}) AS {table_name}"
+
+
+def sql_period_condition(period: Period) -> str:
+    return f"FromDate < '{__to_sql_datetime(period.to_date)}' AND ToDate > '{__to_sql_datetime(period.from_date)}'"
+
+
+def sql_date_condition(period: Period, column: str) -> str:
+    return f"{column} >= '{__to_sql_datetime(period.from_date)}' AND {column} < '{__to_sql_datetime(period.to_date)}'"
+
+
+def sql_grid_area_condition(grid_areas: List[str], column: str = "GridArea") -> str:
+    if grid_areas is None or not len(grid_areas):
+        return None
+    areas = ", ".join("'" + grid_area.replace("'", "''") + "'" for grid_area in grid_areas)
+    return f"{column} IN ({areas})"
+
+
+def sql_date_partitioning(period: Period, column: str, number_of_partitions: int) -> dict:
+    """
+    Returns the options to read the rows in parallel, split into ranges of the period on the given column.
+    """
+    return {
+        "partitionColumn": column,
+        "lowerBound": __to_utc(period.from_date).strftime("%Y-%m-%d %H:%M:%S"),
+        "upperBound": __to_utc(period.to_date).strftime("%Y-%m-%d %H:%M:%S"),
+        "numPartitions": number_of_partitions
+    }
+
+
+def __to_sql_datetime(date_time: datetime) -> str:
+    return __to_utc(date_time).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def __to_utc(date_time: datetime) -> datetime:
+    # The database and the Spark session both use UTC
+    if date_time.tzinfo is None:
+        return date_time
+    return date_time.astimezone(timezone.utc).replace(tzinfo=None)
 
 
 def load_metering_points(beginning_date_time, end_date_time, args: Namespace, spark: SparkSession, grid_areas: List[str]) -> DataFrame:
-    df = (__load_from_sql_table(spark, args, "MeteringPoint")
+    period = parse_period(beginning_date_time, end_date_time)
+    conditions = [sql_period_condition(period), sql_grid_area_condition(grid_areas)]
+    df = (__load_from_sql_table(spark, args, "MeteringPoint", conditions)
           .withColumnRenamed("MeteringPointId", Colname.metering_point_id)
           .withColumnRenamed("MeteringPointType", Colname.metering_point_type)
           .withColumnRenamed("SettlementMethod", Colname.settlement_method)
@@ -80,13 +148,15 @@ def load_metering_points(beginning_date_time, end_date_time, args: Namespace, sp
           .withColumnRenamed("Product", Colname.product)
           .withColumnRenamed("FromDate", Colname.from_date)
           .withColumnRenamed("ToDate", Colname.to_date))
-    df = filter_on_period(df, parse_period(beginning_date_time, end_date_time))
+    df = filter_on_period(df, period)
     df = filter_on_grid_areas(df, Colname.grid_area, grid_areas)
     return df
 
 
 def load_grid_loss_sys_corr(args: Namespace, spark: SparkSession, grid_areas: List[str]) -> DataFrame:
-    df = (__load_from_sql_table(spark, args, "GridLossSysCorr")
+    period = parse_period(args.beginning_date_time, args.end_date_time)
+    conditions = [sql_period_condition(period), sql_grid_area_condition(grid_areas)]
+    df = (__load_from_sql_table(spark, args, "GridLossSysCorr", conditions)
           .withColumnRenamed("MeteringPointId", Colname.metering_point_id)
           .withColumnRenamed("GridArea", Colname.grid_area)
           .withColumnRenamed("EnergySupplierId", Colname.energy_supplier_id)
@@ -94,7 +164,7 @@ def load_grid_loss_sys_corr(args: Namespace, spark: SparkSession, grid_areas: Li
           .withColumnRenamed("IsSystemCorrection", Colname.is_system_correction)
           .withColumnRenamed("FromDate", Colname.from_date)
           .withColumnRenamed("ToDate", Colname.to_date))
-    df = filter_on_period(df, parse_period(args.beginning_date_time, args.end_date_time))
+    df = filter_on_period(df, period)
     df = filter_on_grid_areas(df, Colname.grid_area, grid_areas)
     return df
 
@@ -110,7 +180,8 @@ def load_market_roles(args: Namespace, spark: SparkSession) -> DataFrame:
 
 
 def load_charges(args: Namespace, spark: SparkSession) -> DataFrame:
-    df = (__load_from_sql_table(spark, args, "Charge")
+    period = parse_period(args.beginning_date_time, args.end_date_time)
+    df = (__load_from_sql_table(spark, args, "Charge", [sql_period_condition(period)])
           .withColumnRenamed("ChargeKey", Colname.charge_key)
           .withColumnRenamed("ChargeId", Colname.charge_id)
           .withColumnRenamed("ChargeOwner", Colname.charge_owner)
@@ -120,24 +191,31 @@ def load_charges(args: Namespace, spark: SparkSession) -> DataFrame:
           .withColumnRenamed("Currency", Colname.currency)
           .withColumnRenamed("FromDate", Colname.from_date)
           .withColumnRenamed("ToDate", Colname.to_date))
-    return filter_on_period(df, parse_period(args.beginning_date_time, args.end_date_time))
+    return filter_on_period(df, period)
 
 
 def load_charge_links(args: Namespace, spark: SparkSession) -> DataFrame:
-    df = (__load_from_sql_table(spark, args, "ChargeLink")
+    period = parse_period(args.beginning_date_time, args.end_date_time)
+    df = (__load_from_sql_table(spark, args, "ChargeLink", [sql_period_condition(period)])
           .withColumnRenamed("ChargeKey", Colname.charge_key)
           .withColumnRenamed("MeteringPointId", Colname.metering_point_id)
           .withColumnRenamed("FromDate", Colname.from_date)
           .withColumnRenamed("ToDate", Colname.to_date))
-    return filter_on_period(df, parse_period(args.beginning_date_time, args.end_date_time))
+    return filter_on_period(df, period)
 
 
 def load_charge_prices(args: Namespace, spark: SparkSession) -> DataFrame:
-    df = (__load_from_sql_table(spark, args, "ChargePrice")
+    period = parse_period(args.beginning_date_time, args.end_date_time)
+    df = (__load_from_sql_table(
+            spark,
+            args,
+            "ChargePrice",
+            [sql_date_condition(period, "Time")],
+            sql_date_partitioning(period, "Time", charge_price_read_partitions))
           .withColumnRenamed("ChargeKey", Colname.charge_key)
           .withColumnRenamed("ChargePrice", Colname.charge_price)
           .withColumnRenamed("Time", Colname.time))
-    df = filter_on_date(df, parse_period(args.beginning_date_time, args.end_date_time))
+    df = filter_on_date(df, period)
     return df
 
 
@@ -152,14 +230,64 @@ def load_es_brp_relations(args: Namespace, spark: SparkSession, grid_areas: List
     return df
 
 
-def load_time_series_points(args: Namespace, spark: SparkSession, metering_point_df: DataFrame) -> DataFrame:
+def get_time_series_points_version(args: Namespace, spark: SparkSession) -> int:
+    path = StorageAccountService.get_storage_account_full_path(args.shared_storage_time_series_base_path, args.time_series_points_delta_table_name)
+    return DeltaTable.forPath(spark, path).history(1).select("version").first()[0]
+
+
+def is_change_data_feed_available(args: Namespace, spark: SparkSession, starting_version: int, ending_version: int) -> bool:
+    """
+    Returns whether the changes of the time series points table after the starting version up to the ending version can be read from its change data feed.
+    The feed must be enabled on the table, and the versions must still be in the history of the table.
+    """
+    if ending_version <= starting_version:
+        return True
+
+    path = StorageAccountService.get_storage_account_full_path(args.shared_storage_time_series_base_path, args.time_series_points_delta_table_name)
+    properties = {row.key: row.value for row in spark.sql(f"SHOW TBLPROPERTIES delta.`{path}`").collect()}
+    if properties.get("delta.enableChangeDataFeed", "false").lower() != "true":
+        return False
+
+    versions = {row.version for row in DeltaTable.forPath(spark, path).history().select("version").collect()}
+    return all(version in versions for version in range(starting_version + 1, ending_version + 1))
+
+
+def __load_time_series_points_in_period(args: Namespace, spark: SparkSession, options: dict = None) -> DataFrame:
     df = __load_delta_data(
         spark,
         args.shared_storage_time_series_base_path,
         args.time_series_points_delta_table_name,
-        time_series_points_where_date_condition(parse_period(args.beginning_date_time, args.end_date_time)))
+        time_series_points_where_date_condition(parse_period(args.beginning_date_time, args.end_date_time)),
+        options)
+
+    return filter_on_date(df, parse_period(args.beginning_date_time, args.end_date_time))
+
+
+def load_time_series_points(args: Namespace, spark: SparkSession, metering_point_df: DataFrame, version: int = None) -> DataFrame:
+    df = __load_time_series_points_in_period(args, spark, {"versionAsOf": version} if version is not None else None)
+
+    df = select_latest_point_data(df)
+
+    df = filter_time_series_by_metering_points(df, metering_point_df.select(col(Colname.metering_point_id)))
+
+    return df
 
-    df = filter_on_date(df, parse_period(args.beginning_date_time, args.end_date_time))
+
+def load_changed_time_series_points(args: Namespace, spark: SparkSession, metering_point_df: DataFrame, starting_version: int, ending_version: int, new_metering_point_df: DataFrame) -> DataFrame:
+    """
+    Loads the latest data of points written to the time series points table after the starting version up to the ending version,
+    and of all points of the new metering points as of the ending version.
+    The written points are read from the change data feed of the table, so points are included regardless of their registration time.
+    The change data feed is only read when the points are, so check is_change_data_feed_available before.
+    """
+    points = __load_time_series_points_in_period(args, spark, {"versionAsOf": ending_version})
+
+    if ending_version > starting_version:
+        changes = __load_time_series_points_in_period(args, spark, {"readChangeFeed": "true", "startingVersion": starting_version + 1, "endingVersion": ending_version})
+    else:
+        changes = points.withColumn(change_type_column, F.lit(None).cast("string")).limit(0)
+
+    df = select_changed_point_data(changes, points, new_metering_point_df.select(col(Colname.metering_point_id)))
 
     df = select_latest_point_data(df)
 
@@ -168,6 +296,15 @@ def load_time_series_points(args: Namespace, spark: SparkSession, metering_point
     return df
 
 
+def select_changed_point_data(changes_df: DataFrame, df: DataFrame, new_metering_point_df: DataFrame) -> DataFrame:
+    # Time series points are only ever added, so only inserted and updated points of the change data feed are changed points.
+    # Points of new metering points are included regardless of when they were written, as they are not part of any previous snapshot
+    return changes_df \
+        .filter(col(change_type_column).isin("insert", "update_postimage")) \
+        .select(df.columns) \
+        .union(filter_time_series_by_metering_points(df, new_metering_point_df))
+
+
 def select_latest_point_data(df: DataFrame) -> DataFrame:
     df = (df.withColumn(
               "row_number",
@@ -16,6 +16,8 @@ from geh_stream.shared.period import Period
 from pyspark.sql.dataframe import DataFrame
 from pyspark.sql.functions import col
 from typing import List
+from datetime import date, datetime, timedelta, timezone
+import calendar
 
 
 def filter_on_date(df: DataFrame, period: Period) -> DataFrame:
@@ -37,6 +39,52 @@ def filter_on_grid_areas(df: DataFrame, grid_area_col: str, grid_areas: List[str
 
 
 def time_series_points_where_date_condition(period: Period) -> str:
-    from_condition = f"Year >= {period.from_date.year} AND Month >= {period.from_date.month} AND Day >= {period.from_date.day}"
-    to_condition = f"Year <= {period.to_date.year} AND Month <= {period.to_date.month} AND Day <= {period.to_date.day}"
-    return f"{from_condition} AND {to_condition}"
+    """
+    Returns a condition on the Year, Month and Day partition columns matching exactly the days of the period.
+    The days are split into as few ranges of whole years, whole months and days within a month as possible,
+    so the condition can be used to prune partitions.
+    """
+    first_day, last_day = __get_days_in_period(period)
+    if first_day > last_day:
+        return "false"
+
+    conditions = []
+    day = first_day
+    while day <= last_day:
+        if day.month == 1 and day.day == 1 and date(day.year, 12, 31) <= last_day:
+            to_year = last_day.year if last_day.month == 12 and last_day.day == 31 else last_day.year - 1
+            conditions.append(__range_condition("Year", day.year, to_year))
+            day = date(to_year + 1, 1, 1)
+        elif day.day == 1 and __last_day_of_month(day) <= last_day:
+            to_month = 12 if last_day.year > day.year else last_day.month if __last_day_of_month(last_day) == last_day else last_day.month - 1
+            conditions.append(f"Year = {day.year} AND {__range_condition('Month', day.month, to_month)}")
+            day = __last_day_of_month(date(day.year, to_month, 1)) + timedelta(days=1)
+        else:
+            to_day = min(__last_day_of_month(day), last_day)
+            conditions.append(f"Year = {day.year} AND Month = {day.month} AND {__range_condition('Day', day.day, to_day.day)}")
+            day = to_day + timedelta(days=1)
+
+    return " OR ".join(f"({condition})" for condition in conditions)
+
+
+def __get_days_in_period(period: Period):
+    # Partitions are by UTC date and the end of the period is exclusive
+    from_date = __to_utc(period.from_date)
+    to_date = __to_utc(period.to_date)
+    return from_date.date(), (to_date - timedelta(microseconds=1)).date()
+
+
+def __to_utc(date_time: datetime) -> datetime:
+    if date_time.tzinfo is None:
+        return date_time
+    return date_time.astimezone(timezone.utc)
+
+
+def __last_day_of_month(day: date) -> date:
+    return date(day.year, day.month, calendar.monthrange(day.year, day.month)[1])
+
+
+def __range_condition(column: str, from_value: int, to_value: int) -> str:
+    if from_value == to_value:
+        return f"{column} = {from_value}"
+    return f"{column} >= {from_value} AND {column} <= {to_value}"
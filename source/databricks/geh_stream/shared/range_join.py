@@ -0,0 +1,66 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from typing import List
+from pyspark.sql import DataFrame
+from pyspark.sql.functions import broadcast, col, date_trunc, explode, expr, greatest, least, lit, sequence, when
+from geh_stream.codelists import Colname
+from geh_stream.shared.period import Period
+
+
+bucket_column = "range_join_bucket"
+bucket_intervals = {"hour": "interval 1 hour", "day": "interval 1 day"}
+
+
+def range_join(df: DataFrame, periods: DataFrame, keys: List[str], how: str = "inner", period: Period = None, bucket: str = "day", broadcast_periods: bool = False) -> DataFrame:
+    """
+    Joins the rows of df with the periods with the same keys that are valid at the time of the row,
+    i.e. from_date <= time < to_date. The result has the columns of both dataframes, like a join of the two.
+
+    Joined on the keys alone, all periods of a key end up in the same task and are compared with every row of the key,
+    which is slow for keys with many historic periods. The join can instead be done in one of these ways:
+    - broadcast_periods: The periods are sent to every executor, which is fast when the periods are few.
+    - period: The periods are split into hour or day buckets within the period, and rows are joined
+      with the periods of their own bucket only. The period must contain the times of all rows of df.
+    """
+    if bucket not in bucket_intervals:
+        raise ValueError(f"Unsupported bucket {bucket}, must be one of {list(bucket_intervals)}")
+    if broadcast_periods:
+        return df.join(broadcast(periods), __join_conditions(df, periods, keys), how)
+    if period is None:
+        return df.join(periods, __join_conditions(df, periods, keys), how)
+
+    bucketed_df = df.withColumn(bucket_column, date_trunc(bucket, col(Colname.time)))
+    bucketed_periods = __split_periods_in_buckets(periods, period, bucket)
+    conditions = __join_conditions(bucketed_df, bucketed_periods, keys) + [bucketed_df[bucket_column] == bucketed_periods[bucket_column]]
+    return bucketed_df \
+        .join(bucketed_periods, conditions, how) \
+        .drop(bucketed_df[bucket_column]) \
+        .drop(bucketed_periods[bucket_column])
+
+
+def __join_conditions(df: DataFrame, periods: DataFrame, keys: List[str]) -> list:
+    return [df[key] == periods[key] for key in keys] + [
+        df[Colname.time] >= periods[Colname.from_date],
+        df[Colname.time] < periods[Colname.to_date]
+    ]
+
+
+def __split_periods_in_buckets(periods: DataFrame, period: Period, bucket: str) -> DataFrame:
+    # Periods are clipped to the period, as open periods would otherwise be split into buckets until their far away end
+    first_time = greatest(col(Colname.from_date), lit(period.from_date))
+    last_time = least(col(Colname.to_date), lit(period.to_date)) - expr("interval 1 microsecond")
+    buckets = sequence(date_trunc(bucket, first_time), date_trunc(bucket, last_time), expr(bucket_intervals[bucket]))
+    # Periods without dates match no rows, as in the join without buckets, while greatest and least ignore null
+    is_in_period = col(Colname.from_date).isNotNull() & col(Colname.to_date).isNotNull() & (first_time <= last_time)
+    return periods.withColumn(bucket_column, explode(when(is_in_period, buckets)))
@@ -0,0 +1,53 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from pyspark import SparkContext
+from pyspark.sql import DataFrame
+from pyspark.sql.column import Column
+from pyspark.sql.functions import col, lit
+from pyspark.sql.types import StructType
+
+
+def conform_to_schema(df: DataFrame, schema: StructType) -> DataFrame:
+    """
+    Returns the columns of the schema in the order of the schema, cast to the types of the schema.
+
+    Missing nullable columns are added with null values. Non-nullable columns are declared non-nullable
+    and fail the query if they contain null, like creating a dataframe from rows with the schema does.
+    Everything happens in the query plan, so the result is not moved out of Spark.
+    """
+    return df.select([__conform_column(df, field).alias(field.name) for field in schema.fields])
+
+
+def __conform_column(df: DataFrame, field) -> Column:
+    if field.name not in df.columns:
+        if not field.nullable:
+            raise ValueError(f"Column {field.name} is missing and not nullable in schema")
+        return lit(None).cast(field.dataType)
+
+    current_field = df.schema[field.name]
+    is_same_type = current_field.dataType == field.dataType
+    column = col(field.name) if is_same_type else col(field.name).cast(field.dataType)
+
+    # A cast column can be null even if the original column is not, e.g. when a decimal overflows
+    if field.nullable or (is_same_type and not current_field.nullable):
+        return column
+    return __assert_not_null(column)
+
+
+def __assert_not_null(column: Column) -> Column:
+    # AssertNotNull is the expression Spark uses for non-nullable fields of typed datasets.
+    # It is not exposed in the Python API.
+    jvm = SparkContext._active_spark_context._jvm
+    expression = jvm.org.apache.spark.sql.catalyst.expressions.objects.AssertNotNull(column._jc.expr(), jvm.PythonUtils.toSeq([]))
+    return Column(jvm.org.apache.spark.sql.Column(expression))
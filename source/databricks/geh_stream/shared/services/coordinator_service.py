@@ -15,6 +15,7 @@
 import requests
 import gzip
 import datetime
+import time
 
 
 class CoordinatorService:
@@ -28,33 +29,51 @@ class CoordinatorService:
         if args_dict.get('process_type') is not None:
             self.process_type = args.process_type
 
+        # Notifications that did not reach the coordinator, or that the coordinator failed to handle, are retried with exponential backoff.
+        # Timed out notifications may have been handled by the coordinator, and are not retried, so results are not notified twice
+        self.max_attempts = 3
+        self.retry_delay_seconds = 2
+        self.timeout_seconds = 60
+
     def __endpoint(self, path, endpoint, snapshot_id: str):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.__post(path, endpoint, snapshot_id)
+                return
+            except (requests.ConnectionError, requests.HTTPError) as error:
+                print(f"Attempt {attempt} of {self.max_attempts} to notify coordinator failed: {error}")
+                if attempt == self.max_attempts or not self.__is_retriable(error):
+                    raise
+                time.sleep(self.retry_delay_seconds * 2 ** (attempt - 1))
+
+    def __is_retriable(self, error) -> bool:
+        if isinstance(error, requests.HTTPError):
+            return error.response.status_code >= 500
+        return True
+
+    def __post(self, path, endpoint, snapshot_id: str):
         TIMESTRING = "%Y-%m-%d %H:%M:%S"
 
-        try:
-            bytes = path.encode()
-            headers = {'job-id': self.job_id,
-                       'snapshot-id': snapshot_id,
-                       'process-type': self.process_type,
-                       'Content-Type': 'application/json',
-                       'Content-Encoding': 'gzip'}
+        bytes = path.encode()
+        headers = {'job-id': self.job_id,
+                   'snapshot-id': snapshot_id,
+                   'process-type': self.process_type,
+                   'Content-Type': 'application/json',
+                   'Content-Encoding': 'gzip'}
 
-            request_body = gzip.compress(bytes)
-            now = datetime.datetime.now()
-            print("Just about to post " + str(len(request_body)) + " bytes at time " + now.strftime(TIMESTRING))
-            response = requests.post(endpoint, data=request_body, headers=headers)
+        request_body = gzip.compress(bytes)
+        now = datetime.datetime.now()
+        print("Just about to post " + str(len(request_body)) + " bytes at time " + now.strftime(TIMESTRING))
+        response = requests.post(endpoint, data=request_body, headers=headers, timeout=self.timeout_seconds)
+        now = datetime.datetime.now()
+        print("We have posted the result and time is now " + now.strftime(TIMESTRING))
+        if response.status_code != requests.codes['ok']:
+            error = "Could not communicate with coordinator due to " + response.reason
+            print(error)
+            print(response.text)
             now = datetime.datetime.now()
-            print("We have posted the result and time is now " + now.strftime(TIMESTRING))
-            if response.status_code != requests.codes['ok']:
-                error = "Could not communicate with coordinator due to " + response.reason
-                print(error)
-                print(response.text)
-                now = datetime.datetime.now()
-                print(now.strftime(TIMESTRING))
-                raise Exception(error)
-        except Exception:
-            print(Exception)
-            raise Exception
+            print(now.strftime(TIMESTRING))
+            raise requests.HTTPError(error, response=response)
 
     def notify_snapshot_coordinator(self, snapshot_notify_url, path, snapshot_id):
         self.__endpoint(path, snapshot_notify_url, snapshot_id)
@@ -17,22 +17,61 @@ from geh_stream.codelists import Colname, DateFormat
 from geh_stream.shared.services import CoordinatorService, StorageAccountService
 from pyspark.sql.functions import col, date_format
 from pyspark.sql import DataFrame
+from delta.tables import DeltaTable
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Callable
+
+
+# Number of coordinator notifications sent at the same time
+max_parallel_notifications = 4
 
 
 class InputOutputProcessor:
 
     def __init__(self, args):
         self.coordinator_service = CoordinatorService(args)
+        self.snapshots_base_path = args.snapshots_base_path
         self.snapshot_base_path = f"{args.snapshots_base_path}/{args.snapshot_id}"
         self.snapshot_id = args.snapshot_id
         self.data_storage_base_path = args.shared_storage_aggregations_base_path
 
-    def do_post_processing(self, process_type, job_id, result_url, results):
+    def do_post_processing(self, process_type, job_id, result_url, results, on_result_written=None, max_parallel_results=4):
+        """
+        Writes the results and notifies the coordinator about each written result.
+
+        Up to max_parallel_results results are written at the same time, and the coordinator is notified
+        about written results while the remaining results are being written.
+        """
+        with self.result_publisher(result_url, on_result_written, max_parallel_results) as publisher:
+            for key, dataframe in results.items():
+                publisher.publish(key, dataframe)
+
+    def result_publisher(self, result_url, on_result_written=None, max_parallel_results=4) -> "ResultPublisher":
+        """
+        Returns a publisher that writes each result and notifies the coordinator as soon as the result is published,
+        so results can be published while other results are still being computed.
+        """
+        return ResultPublisher(self.__write_result, self.coordinator_service, result_url, on_result_written, max_parallel_results)
+
+    def __write_result(self, dataframe: DataFrame) -> str:
+        # Persist the result, so it is only computed once to both find its path and write it
+        is_persisted_here = not dataframe.is_cached
+        if is_persisted_here:
+            dataframe = dataframe.persist()
+
+        try:
+            first_row = dataframe.select(Colname.result_path).head(1)
+            if len(first_row) == 0:
+                return None
 
-        for key, dataframe, in results.items():
-            if len(dataframe.head(1)) > 0:
-                path = dataframe.first()[Colname.result_path]
-                dataframe = dataframe.select(
+            path = first_row[0][Colname.result_path]
+            result_path = StorageAccountService.get_storage_account_full_path(self.data_storage_base_path, path)
+
+            # The coordinator reads a single file per result. Repartitioning instead of coalescing
+            # keeps computing the result in parallel and only writes the file in a single task.
+            dataframe \
+                .select(
                     Colname.job_id,
                     Colname.snapshot_id,
                     Colname.result_id,
@@ -48,39 +87,106 @@ class InputOutputProcessor:
                     Colname.sum_quantity,
                     Colname.quality,
                     Colname.metering_point_type,
-                    Colname.settlement_method
-                )
-                result_path = StorageAccountService.get_storage_account_full_path(self.data_storage_base_path, path)
-
-                if dataframe is not None:
-                    dataframe \
-                        .coalesce(1) \
-                        .write \
-                        .option("compression", "gzip") \
-                        .format('json').save(result_path)
+                    Colname.settlement_method) \
+                .repartition(1) \
+                .write \
+                .option("compression", "gzip") \
+                .format('json').save(result_path)
 
-                    self.coordinator_service.notify_coordinator(result_url, path)
+            return path
+        finally:
+            if is_persisted_here:
+                dataframe.unpersist()
 
     def store_basis_data(self, snapshot_notify_url, snapshot_data):
 
         for key, dataframe in snapshot_data.items():
-            path = f"{self.snapshot_base_path}/{key}"
-            snapshot_path = StorageAccountService.get_storage_account_full_path(self.data_storage_base_path, path)
             if dataframe is not None:
-                dataframe \
-                    .write \
-                    .format("delta") \
-                    .option("compression", "snappy") \
-                    .save(snapshot_path)
+                self.write_basis_data(key, dataframe)
 
         self.coordinator_service.notify_snapshot_coordinator(snapshot_notify_url, self.snapshot_base_path, self.snapshot_id)
 
-    def load_basis_data(self, spark, key) -> DataFrame:
-        path = f"{self.snapshot_base_path}/{key}"
-        snapshot_path = StorageAccountService.get_storage_account_full_path(self.data_storage_base_path, path)
+    def write_basis_data(self, key, dataframe: DataFrame):
+        snapshot_path = self.__get_snapshot_path(self.snapshot_id, key)
+        dataframe \
+            .write \
+            .format("delta") \
+            .option("compression", "snappy") \
+            .save(snapshot_path)
+
+    def load_basis_data(self, spark, key, snapshot_id=None) -> DataFrame:
+        snapshot_path = self.__get_snapshot_path(snapshot_id or self.snapshot_id, key)
 
         df = spark \
             .read \
             .format("delta") \
             .load(snapshot_path)
         return df
+
+    def has_basis_data(self, spark, key, snapshot_id=None) -> bool:
+        # Snapshots created by earlier versions of the prepare job do not hold all basis data
+        return DeltaTable.isDeltaTable(spark, self.__get_snapshot_path(snapshot_id or self.snapshot_id, key))
+
+    def clone_basis_data(self, spark, key, previous_snapshot_id) -> DeltaTable:
+        # A shallow clone references the data files of the previous snapshot instead of copying them,
+        # so only files changed in the new snapshot are written
+        previous_snapshot_path = self.__get_snapshot_path(previous_snapshot_id, key)
+        snapshot_path = self.__get_snapshot_path(self.snapshot_id, key)
+
+        spark.sql(f"CREATE TABLE delta.`{snapshot_path}` SHALLOW CLONE delta.`{previous_snapshot_path}`")
+        return DeltaTable.forPath(spark, snapshot_path)
+
+    def __get_snapshot_path(self, snapshot_id, key):
+        path = f"{self.snapshots_base_path}/{snapshot_id}/{key}"
+        return StorageAccountService.get_storage_account_full_path(self.data_storage_base_path, path)
+
+
+class ResultPublisher:
+    """
+    Writes published results and notifies the coordinator about each written result in the background.
+
+    Use as a context manager. Leaving the context waits until all published results have been written and notified.
+    """
+
+    def __init__(self, write_result: Callable[[DataFrame], str], coordinator_service: CoordinatorService, result_url, on_result_written=None, max_parallel_results=4):
+        self.write_result = write_result
+        self.coordinator_service = coordinator_service
+        self.result_url = result_url
+        self.on_result_written = on_result_written
+        self.max_parallel_results = max_parallel_results
+        self.__lock = Lock()
+        self.__written = []
+
+    def __enter__(self):
+        self.__result_executor = ThreadPoolExecutor(max_workers=self.max_parallel_results)
+        self.__notification_executor = ThreadPoolExecutor(max_workers=max_parallel_notifications)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                for written in self.__written:
+                    notification = written.result()
+                    if notification is not None:
+                        notification.result()
+        finally:
+            self.__result_executor.shutdown(wait=True)
+            self.__notification_executor.shutdown(wait=True)
+        return False
+
+    def publish(self, key, dataframe: DataFrame):
+        # Results may be published from other threads, e.g. by steps completing at the same time
+        with self.__lock:
+            self.__written.append(self.__result_executor.submit(self.__write_and_notify, key, dataframe))
+
+    def __write_and_notify(self, key, dataframe: DataFrame):
+        path = self.write_result(dataframe)
+        notification = None
+        if path is not None:
+            notification = self.__notification_executor.submit(self.coordinator_service.notify_coordinator, self.result_url, path)
+
+        # Let the caller release resources held for the result, e.g. cached dataframes it was computed from
+        if self.on_result_written is not None:
+            self.on_result_written(key)
+
+        return notification
@@ -12,3 +12,4 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from .snapshot_creator import create_snapshot
+from .time_series_rollup import sum_time_series_per_hour, sum_time_series_per_day, load_hourly_time_series, load_daily_time_series
@@ -18,12 +18,19 @@ sys.path.append(r'/workspaces/geh-aggregations/source/databricks')
 sys.path.append(r'/opt/conda/lib/python3.8/site-packages')
 
 import json
-from pyspark.sql import SparkSession
+from datetime import timezone
+from pyspark.sql import SparkSession, DataFrame, Row
+from pyspark.sql.utils import AnalysisException
+from py4j.protocol import Py4JJavaError
+import pyspark.sql.functions as F
 
 from geh_stream.shared.services import InputOutputProcessor
 from geh_stream.shared.data_loader import \
     load_metering_points, \
     load_time_series_points, \
+    load_changed_time_series_points, \
+    get_time_series_points_version, \
+    is_change_data_feed_available, \
     load_market_roles, \
     load_es_brp_relations, \
     load_charges, \
@@ -32,8 +39,10 @@ from geh_stream.shared.data_loader import \
     load_grid_loss_sys_corr, \
     initialize_spark
 
-from geh_stream.codelists import BasisDataKeyName
+from geh_stream.codelists import BasisDataKeyName, Colname
+from geh_stream.shared.period import parse_period
 from geh_stream.aggregation_utils.trigger_base_arguments import trigger_base_arguments
+from .time_series_rollup import sum_time_series_per_hour, sum_time_series_per_day
 
 
 def create_snapshot(spark: SparkSession, areas, args: dict):
@@ -44,8 +53,24 @@ def create_snapshot(spark: SparkSession, areas, args: dict):
     metering_points = load_metering_points(args.beginning_date_time, args.end_date_time, args, spark, areas)
     snapshot_data[BasisDataKeyName.metering_points] = metering_points
 
-    # Fetch time series dataframe
-    snapshot_data[BasisDataKeyName.time_series] = load_time_series_points(args, spark, metering_points)
+    io_processor = InputOutputProcessor(args)
+
+    # The time series points are read as of the current version of their table. The version is stored with the period and grid areas of the snapshot,
+    # so a later snapshot can load only the points written since
+    snapshot_info = get_snapshot_info(args, areas, get_time_series_points_version(args, spark))
+    snapshot_data[BasisDataKeyName.snapshot_info] = spark.createDataFrame([snapshot_info])
+
+    # Fetch time series dataframe. When building on a previous snapshot of the same period and grid areas, only changed time series points are loaded and written.
+    # Otherwise all time series points are loaded
+    previous_snapshot_info = __load_previous_snapshot_info(spark, args, io_processor)
+    if not is_same_period_and_grid_areas(previous_snapshot_info, snapshot_info) \
+            or not update_time_series_from_previous_snapshot(spark, args, io_processor, metering_points, previous_snapshot_info, snapshot_info):
+        io_processor.write_basis_data(BasisDataKeyName.time_series, load_time_series_points(args, spark, metering_points, snapshot_info.time_series_points_version))
+
+    # Sum the time series per metering point and hour, and roll the hourly sums up per day, so the jobs do not read the points themselves.
+    # The sums are computed from the written snapshot tables, so the points are only loaded once.
+    io_processor.write_basis_data(BasisDataKeyName.hourly_time_series, sum_time_series_per_hour(io_processor.load_basis_data(spark, BasisDataKeyName.time_series)))
+    snapshot_data[BasisDataKeyName.daily_time_series] = sum_time_series_per_day(io_processor.load_basis_data(spark, BasisDataKeyName.hourly_time_series))
 
     # Fetch market roles df
     snapshot_data[BasisDataKeyName.market_roles] = load_market_roles(args, spark)
@@ -66,5 +91,81 @@ def create_snapshot(spark: SparkSession, areas, args: dict):
     snapshot_data[BasisDataKeyName.grid_loss_sys_corr] = load_grid_loss_sys_corr(args, spark, areas)
 
     # Store basis data
-    io_processor = InputOutputProcessor(args)
     io_processor.store_basis_data(args.snapshot_notify_url, snapshot_data)
+
+
+def get_snapshot_info(args: dict, areas, time_series_points_version: int) -> Row:
+    period = parse_period(args.beginning_date_time, args.end_date_time)
+    return Row(
+        from_date=period.from_date.astimezone(timezone.utc).isoformat(),
+        to_date=period.to_date.astimezone(timezone.utc).isoformat(),
+        grid_areas=",".join(sorted(areas)),
+        time_series_points_version=time_series_points_version)
+
+
+def is_same_period_and_grid_areas(previous_snapshot_info: Row, snapshot_info: Row) -> bool:
+    return previous_snapshot_info is not None \
+        and previous_snapshot_info.from_date == snapshot_info.from_date \
+        and previous_snapshot_info.to_date == snapshot_info.to_date \
+        and previous_snapshot_info.grid_areas == snapshot_info.grid_areas
+
+
+def __load_previous_snapshot_info(spark: SparkSession, args: dict, io_processor: InputOutputProcessor) -> Row:
+    # Snapshots created before the snapshot info was stored have no info, and cannot be built on
+    if args.previous_snapshot_id is None or not io_processor.has_basis_data(spark, BasisDataKeyName.snapshot_info, args.previous_snapshot_id):
+        return None
+
+    return io_processor.load_basis_data(spark, BasisDataKeyName.snapshot_info, args.previous_snapshot_id).first()
+
+
+def update_time_series_from_previous_snapshot(spark: SparkSession, args: dict, io_processor: InputOutputProcessor, metering_points: DataFrame, previous_snapshot_info: Row, snapshot_info: Row) -> bool:
+    """
+    Creates the time series of the snapshot from the time series of the previous snapshot, which must be for the same period and grid areas.
+    Unchanged points are referenced from the previous snapshot, and only points written to the time series points table since then are loaded and merged into it.
+    Returns False without writing anything if the changes of the time series points table since the previous snapshot are not available.
+    """
+    previous_metering_points = io_processor.load_basis_data(spark, BasisDataKeyName.metering_points, args.previous_snapshot_id)
+
+    metering_point_ids = metering_points.select(Colname.metering_point_id).distinct()
+    previous_metering_point_ids = previous_metering_points.select(Colname.metering_point_id).distinct()
+    new_metering_point_ids = metering_point_ids.join(previous_metering_point_ids, Colname.metering_point_id, "leftanti")
+    removed_metering_point_ids = previous_metering_point_ids.join(metering_point_ids, Colname.metering_point_id, "leftanti")
+
+    if not is_change_data_feed_available(args, spark, previous_snapshot_info.time_series_points_version, snapshot_info.time_series_points_version):
+        return False
+
+    changed_time_series = load_changed_time_series_points(
+        args,
+        spark,
+        metering_points,
+        previous_snapshot_info.time_series_points_version,
+        snapshot_info.time_series_points_version,
+        new_metering_point_ids) \
+        .persist()
+
+    # The change data feed is scanned before the snapshot is cloned, so the snapshot is left untouched if the changes cannot be read,
+    # e.g. if the change data of a version has been vacuumed
+    try:
+        changed_time_series.count()
+    except (AnalysisException, Py4JJavaError):
+        changed_time_series.unpersist()
+        return False
+
+    time_series = io_processor.clone_basis_data(spark, BasisDataKeyName.time_series, args.previous_snapshot_id)
+
+    # Remove points of metering points that are no longer part of the master data
+    time_series.alias("snapshot") \
+        .merge(removed_metering_point_ids.alias("removed"), f"snapshot.{Colname.metering_point_id} = removed.{Colname.metering_point_id}") \
+        .whenMatchedDelete() \
+        .execute()
+
+    time_series.alias("snapshot") \
+        .merge(
+            changed_time_series.alias("changed"),
+            f"snapshot.{Colname.metering_point_id} = changed.{Colname.metering_point_id} AND snapshot.{Colname.time} = changed.{Colname.time}") \
+        .whenMatchedUpdateAll(f"changed.{Colname.registration_date_time} > snapshot.{Colname.registration_date_time}") \
+        .whenNotMatchedInsertAll() \
+        .execute()
+
+    changed_time_series.unpersist()
+    return True
@@ -0,0 +1,71 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from pyspark.sql import DataFrame, SparkSession
+from pyspark.sql.functions import col, count, sum, when, window
+from geh_stream.codelists import BasisDataKeyName, Colname, Quality
+
+
+def sum_time_series_per_hour(time_series: DataFrame) -> DataFrame:
+    """
+    Sums the quantity of the time series points of each metering point per hour.
+    The time of a sum is the start of the hour.
+    """
+    return __sum_time_series(time_series, "1 hour")
+
+
+def sum_time_series_per_day(hourly_time_series: DataFrame) -> DataFrame:
+    """
+    Sums the hourly sums of each metering point per day.
+    Rolling up the hourly sums gives the same result as summing the points, as every hour is within a single day.
+    """
+    return __sum_time_series(hourly_time_series, "1 day")
+
+
+def load_hourly_time_series(spark: SparkSession, io_processor) -> DataFrame:
+    """
+    Loads the hourly sums of the time series of the snapshot.
+    Snapshots created before the sums were stored with the snapshot are summed from their time series points.
+    """
+    if io_processor.has_basis_data(spark, BasisDataKeyName.hourly_time_series):
+        return io_processor.load_basis_data(spark, BasisDataKeyName.hourly_time_series)
+    return sum_time_series_per_hour(io_processor.load_basis_data(spark, BasisDataKeyName.time_series))
+
+
+def load_daily_time_series(spark: SparkSession, io_processor) -> DataFrame:
+    """
+    Loads the daily sums of the time series of the snapshot.
+    Snapshots created before the sums were stored with the snapshot are summed from their time series points.
+    """
+    if io_processor.has_basis_data(spark, BasisDataKeyName.daily_time_series):
+        return io_processor.load_basis_data(spark, BasisDataKeyName.daily_time_series)
+    return sum_time_series_per_day(load_hourly_time_series(spark, io_processor))
+
+
+def __sum_time_series(time_series: DataFrame, window_duration: str) -> DataFrame:
+    return time_series \
+        .groupBy(Colname.metering_point_id, window(Colname.time, window_duration)) \
+        .agg(
+            sum(Colname.quantity).alias(Colname.quantity),
+            # Set quality to estimated (Quality=56) if any entry is estimated (Quality=56) or quantity missing (Quality=QM),
+            # otherwise set quality to as read (Quality=E01). Aggregating the quality of the sums gives the same quality as aggregating the points.
+            when(
+                count(when(col(Colname.quality).isin(Quality.estimated.value, Quality.quantity_missing.value), 1)) > 0,
+                Quality.estimated.value)
+            .otherwise(Quality.as_read.value)
+            .alias(Colname.quality)) \
+        .select(
+            Colname.metering_point_id,
+            col(f"window.{Colname.start}").alias(Colname.time),
+            Colname.quantity,
+            Colname.quality)
@@ -13,8 +13,10 @@
 # limitations under the License.
 from pyspark.sql import DataFrame, SparkSession
 from pyspark.sql.functions import col, count, sum
+from pyspark.sql.window import Window
 from geh_stream.codelists import Colname, MarketEvaluationPointType, SettlementMethod
 from geh_stream.schemas.output import calculate_fee_charge_price_schema
+from geh_stream.shared.schema_conformance import conform_to_schema
 
 
 def calculate_fee_charge_price(spark: SparkSession, fee_charges: DataFrame) -> DataFrame:
@@ -24,7 +26,7 @@ def calculate_fee_charge_price(spark: SparkSession, fee_charges: DataFrame) -> D
     # get count of charges and total daily charge price
     df = get_count_of_charges_and_total_daily_charge_price(charges_flex_settled_consumption)
 
-    return spark.createDataFrame(df.rdd, calculate_fee_charge_price_schema)
+    return conform_to_schema(df, calculate_fee_charge_price_schema)
 
 
 def filter_on_metering_point_type_and_settlement_method(fee_charges: DataFrame) -> DataFrame:
@@ -35,23 +37,14 @@ def filter_on_metering_point_type_and_settlement_method(fee_charges: DataFrame)
 
 
 def get_count_of_charges_and_total_daily_charge_price(charges_flex_settled_consumption: DataFrame) -> DataFrame:
-    grouped_charges = charges_flex_settled_consumption \
-        .groupBy(Colname.charge_owner, Colname.grid_area, Colname.energy_supplier_id, Colname.time) \
-        .agg(
-            count("*").alias(Colname.charge_count),
-            sum(Colname.charge_price).alias(Colname.total_daily_charge_price)
-            ) \
-        .select(
-            Colname.charge_owner,
-            Colname.grid_area,
-            Colname.energy_supplier_id,
-            Colname.time,
-            Colname.charge_count,
-            Colname.total_daily_charge_price
-        )
+    # The count and total are computed over a window instead of aggregating and joining back on the distinct charges.
+    # The distinct charges are taken after the window, which only needs the rows of a window in the same partition,
+    # so the window and the distinct share a single shuffle.
+    charges_window = Window.partitionBy(Colname.charge_owner, Colname.grid_area, Colname.energy_supplier_id, Colname.time)
 
     df = charges_flex_settled_consumption \
-        .select("*").distinct().join(grouped_charges, [Colname.charge_owner, Colname.grid_area, Colname.energy_supplier_id, Colname.time], "inner") \
+        .withColumn(Colname.charge_count, count("*").over(charges_window)) \
+        .withColumn(Colname.total_daily_charge_price, sum(Colname.charge_price).over(charges_window)) \
         .select(
             Colname.charge_key,
             Colname.charge_id,
@@ -66,5 +59,6 @@ def get_count_of_charges_and_total_daily_charge_price(charges_flex_settled_consu
             Colname.grid_area,
             Colname.connection_state,
             Colname.energy_supplier_id
-        )
+        ) \
+        .distinct()
     return df
@@ -14,8 +14,10 @@
 from pyspark.sql import DataFrame, SparkSession
 from pyspark.sql.functions import col, last_day, dayofmonth, count, sum
 from pyspark.sql.types import DecimalType
+from pyspark.sql.window import Window
 from geh_stream.codelists import Colname, MarketEvaluationPointType, SettlementMethod
 from geh_stream.schemas.output import calculate_daily_subscription_price_schema
+from geh_stream.shared.schema_conformance import conform_to_schema
 
 
 def calculate_daily_subscription_price(spark: SparkSession, subscription_charges: DataFrame) -> DataFrame:
@@ -28,7 +30,7 @@ def calculate_daily_subscription_price(spark: SparkSession, subscription_charges
     # get count of charges and total daily charge price
     df = get_count_of_charges_and_total_daily_charge_price(charges_per_day)
 
-    return spark.createDataFrame(df.rdd, calculate_daily_subscription_price_schema)
+    return conform_to_schema(df, calculate_daily_subscription_price_schema)
 
 
 def filter_on_metering_point_type_and_settlement_method(subscription_charges: DataFrame) -> DataFrame:
@@ -44,23 +46,14 @@ def calculate_price_per_day(charges_per_day_flex_settled_consumption: DataFrame)
 
 
 def get_count_of_charges_and_total_daily_charge_price(charges_per_day: DataFrame) -> DataFrame:
-    grouped_charges_per_day = charges_per_day \
-        .groupBy(Colname.charge_owner, Colname.grid_area, Colname.energy_supplier_id, Colname.time) \
-        .agg(
-            count("*").alias(Colname.charge_count),
-            sum(Colname.price_per_day).alias(Colname.total_daily_charge_price)
-            ) \
-        .select(
-            Colname.charge_owner,
-            Colname.grid_area,
-            Colname.energy_supplier_id,
-            Colname.time,
-            Colname.charge_count,
-            Colname.total_daily_charge_price
-        )
+    # The count and total are computed over a window instead of aggregating and joining back on the distinct charges.
+    # The distinct charges are taken after the window, which only needs the rows of a window in the same partition,
+    # so the window and the distinct share a single shuffle.
+    charges_window = Window.partitionBy(Colname.charge_owner, Colname.grid_area, Colname.energy_supplier_id, Colname.time)
 
     df = charges_per_day \
-        .select("*").distinct().join(grouped_charges_per_day, [Colname.charge_owner, Colname.grid_area, Colname.energy_supplier_id, Colname.time], "inner") \
+        .withColumn(Colname.charge_count, count("*").over(charges_window)) \
+        .withColumn(Colname.total_daily_charge_price, sum(Colname.price_per_day).over(charges_window)) \
         .select(
             Colname.charge_key,
             Colname.charge_id,
@@ -76,5 +69,6 @@ def get_count_of_charges_and_total_daily_charge_price(charges_per_day: DataFrame
             Colname.grid_area,
             Colname.connection_state,
             Colname.energy_supplier_id
-        )
+        ) \
+        .distinct()
     return df
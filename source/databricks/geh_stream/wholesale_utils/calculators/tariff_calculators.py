@@ -12,9 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from pyspark.sql import DataFrame, SparkSession
-from pyspark.sql.functions import col, sum, count
+from pyspark.sql.functions import col, sum, count, first
 from geh_stream.codelists import Colname, ChargeType
 from geh_stream.schemas.output import calculate_tariff_price_per_ga_co_es_schema
+from geh_stream.shared.schema_conformance import conform_to_schema
 from pyspark.sql.types import DecimalType
 
 total_quantity = "total_quantity"
@@ -23,18 +24,16 @@ charge_count = "charge_count"
 
 def calculate_tariff_price_per_ga_co_es(spark: SparkSession, tariffs: DataFrame) -> DataFrame:
     # sum quantity and count charges
-    agg_df = sum_quantity_and_count_charges(tariffs)
+    df = sum_quantity_and_count_charges(tariffs)
 
-    # select distinct tariffs
-    df = select_distinct_tariffs(tariffs)
+    df = df.withColumn(Colname.total_amount, col(Colname.charge_price) * col(total_quantity))
 
-    # join with agg_df
-    df = join_with_agg_df(df, agg_df)
-
-    return spark.createDataFrame(df.rdd, calculate_tariff_price_per_ga_co_es_schema)
+    return conform_to_schema(df, calculate_tariff_price_per_ga_co_es_schema)
 
 
 def sum_quantity_and_count_charges(tariffs: DataFrame) -> DataFrame:
+    # The charge and its price are the same for all rows of a charge key at a time, so they are carried along
+    # with first() instead of selecting the distinct tariffs and joining them with the sums
     agg_df = tariffs \
         .groupBy(
             Colname.grid_area,
@@ -46,38 +45,12 @@ def sum_quantity_and_count_charges(tariffs: DataFrame) -> DataFrame:
         ) \
         .agg(
              sum(Colname.quantity).alias(total_quantity),
-             count(Colname.metering_point_id).alias(charge_count)
-        ).select("*").distinct()
+             count(Colname.metering_point_id).alias(charge_count),
+             first(Colname.charge_id).alias(Colname.charge_id),
+             first(Colname.charge_type).alias(Colname.charge_type),
+             first(Colname.charge_owner).alias(Colname.charge_owner),
+             first(Colname.charge_tax).alias(Colname.charge_tax),
+             first(Colname.resolution).alias(Colname.resolution),
+             first(Colname.charge_price).alias(Colname.charge_price)
+        )
     return agg_df
-
-
-def select_distinct_tariffs(tariffs: DataFrame) -> DataFrame:
-    df = tariffs.select(
-            tariffs[Colname.charge_key],
-            tariffs[Colname.charge_id],
-            tariffs[Colname.charge_type],
-            tariffs[Colname.charge_owner],
-            tariffs[Colname.charge_tax],
-            tariffs[Colname.resolution],
-            tariffs[Colname.time],
-            tariffs[Colname.charge_price],
-            tariffs[Colname.energy_supplier_id],
-            tariffs[Colname.metering_point_type],
-            tariffs[Colname.settlement_method],
-            tariffs[Colname.grid_area]
-         ).distinct()
-    return df
-
-
-def join_with_agg_df(df: DataFrame, agg_df: DataFrame) -> DataFrame:
-    df = df.join(agg_df, [
-        Colname.energy_supplier_id,
-        Colname.grid_area,
-        Colname.time,
-        Colname.metering_point_type,
-        Colname.settlement_method,
-        Colname.charge_key
-    ], "inner") \
-    .withColumn("total_amount", col(Colname.charge_price) * col(total_quantity)) \
-    .orderBy([Colname.charge_key, Colname.grid_area, Colname.energy_supplier_id, Colname.time, Colname.metering_point_type, Colname.settlement_method])
-    return df
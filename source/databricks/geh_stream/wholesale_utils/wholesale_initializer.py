@@ -13,8 +13,10 @@
 # limitations under the License.
 
 from pyspark.sql.dataframe import DataFrame
-from pyspark.sql.functions import col, window, expr, explode, month, year
+from pyspark.sql.functions import array, ceil, col, date_trunc, expr, explode, least, sequence, when
 from geh_stream.codelists import Colname, ResolutionDuration, ConnectionState, ChargeType
+from geh_stream.shared.period import Period
+from geh_stream.shared.range_join import range_join
 
 
 charge_from_date = "charge_from_date"
@@ -25,6 +27,8 @@ market_roles_from_date = "market_roles_from_date"
 market_roles_to_date = "market_roles_to_date"
 metering_point_from_date = "metering_point_from_date"
 metering_point_to_date = "metering_point_to_date"
+days_before_month_column = "days_before_month"
+seconds_per_day = 24 * 60 * 60
 
 
 def get_tariff_charges(
@@ -34,29 +38,71 @@ def get_tariff_charges(
         charge_prices: DataFrame,
         metering_points: DataFrame,
         market_roles: DataFrame,
-        resolution_duration: ResolutionDuration
+        resolution_duration: ResolutionDuration,
+        period: Period = None
         ) -> DataFrame:
 
-    # filter on resolution
-    charges = get_charges_based_on_resolution(charges, resolution_duration)
+    # filter on charge type and resolution
+    charges = get_charges_based_on_resolution(get_charges_based_on_charge_type(charges, ChargeType.tariff), resolution_duration)
 
-    df = __join_properties_on_charges_with_given_charge_type(charges, charge_prices, charge_links, metering_points, market_roles, ChargeType.tariff)
+    df = get_charges_with_properties(charges, charge_prices, charge_links, metering_points, market_roles, period)
 
-    # group by time series on metering point id and resolution and sum quantity
-    grouped_time_series = group_by_time_series_on_metering_point_id_and_resolution_and_sum_quantity(time_series, resolution_duration)
+    return select_tariff_charges(df, time_series, resolution_duration)
 
-    # join with grouped time series
-    df = join_with_grouped_time_series(df, grouped_time_series)
 
-    return df
+def get_fee_charges(charges: DataFrame, charge_prices: DataFrame, charge_links: DataFrame, metering_points: DataFrame, market_roles: DataFrame,
+                    period: Period = None) -> DataFrame:
+    charges = get_charges_based_on_charge_type(charges, ChargeType.fee)
+    return select_fee_charges(get_charges_with_properties(charges, charge_prices, charge_links, metering_points, market_roles, period))
+
 
+def get_subscription_charges(charges: DataFrame, charge_prices: DataFrame, charge_links: DataFrame, metering_points: DataFrame, market_roles: DataFrame) -> DataFrame:
+    # Subscriptions are not joined in buckets, as the days of a subscription can be outside the period of the job
+    charges = get_charges_based_on_charge_type(charges, ChargeType.subscription)
+    return select_subscription_charges(get_charges_with_properties(charges, charge_prices, charge_links, metering_points, market_roles))
 
-def get_fee_charges(charges: DataFrame, charge_prices: DataFrame, charge_links: DataFrame, metering_points: DataFrame, market_roles: DataFrame) -> DataFrame:
-    return __join_properties_on_charges_with_given_charge_type(charges, charge_prices, charge_links, metering_points, market_roles, ChargeType.fee)
 
+def get_charges_with_properties(charges: DataFrame, charge_prices: DataFrame, charge_links: DataFrame, metering_points: DataFrame, market_roles: DataFrame,
+                                period: Period = None) -> DataFrame:
+    """
+    Joins charge prices, charge links, market roles and connected metering points on charges of all charge types.
 
-def get_subscription_charges(charges: DataFrame, charge_prices: DataFrame, charge_links: DataFrame, metering_points: DataFrame, market_roles: DataFrame) -> DataFrame:
-    return __join_properties_on_charges_with_given_charge_type(charges, charge_prices, charge_links, metering_points, market_roles, ChargeType.subscription)
+    The joins are the same for every charge type, so the charges of all charge types can be joined in a single pass
+    and split afterwards with select_tariff_charges, select_fee_charges and select_subscription_charges.
+    """
+    # join charge prices with charges
+    charges_with_prices = join_with_charge_prices(charges, charge_prices)
+
+    # Explode dataframe: create row for each day the time period from and to date of subscriptions
+    charges_with_prices = explode_subscription(charges_with_prices)
+
+    # The days of a subscription are within the month of its price, so the buckets must cover the months of the period
+    if period is not None:
+        period = __get_months_of_period(period)
+
+    # join charge links with charges_with_prices
+    charges_with_price_and_links = join_with_charge_links(charges_with_prices, charge_links, period)
+
+    df = join_with_martket_roles(charges_with_price_and_links, market_roles, period)
+
+    metering_points = get_connected_metering_points(metering_points)
+
+    return join_with_metering_points(df, metering_points, period)
+
+
+def select_tariff_charges(charges_with_properties: DataFrame, time_series: DataFrame, resolution_duration: ResolutionDuration) -> DataFrame:
+    df = get_charges_based_on_resolution(get_charges_based_on_charge_type(charges_with_properties, ChargeType.tariff), resolution_duration)
+
+    # join with time series summed per metering point and resolution, see the hourly and daily time series of the snapshot
+    return join_with_grouped_time_series(df, time_series)
+
+
+def select_fee_charges(charges_with_properties: DataFrame) -> DataFrame:
+    return __select_charge_properties(get_charges_based_on_charge_type(charges_with_properties, ChargeType.fee))
+
+
+def select_subscription_charges(charges_with_properties: DataFrame) -> DataFrame:
+    return __select_charge_properties(get_charges_based_on_charge_type(charges_with_properties, ChargeType.subscription))
 
 
 def get_charges_based_on_resolution(charges: DataFrame, resolution_duration: ResolutionDuration) -> DataFrame:
@@ -88,9 +134,23 @@ def join_with_charge_prices(df: DataFrame, charge_prices: DataFrame) -> DataFram
 
 
 def explode_subscription(charges_with_prices: DataFrame) -> DataFrame:
-    charges_with_prices = charges_with_prices.withColumn(Colname.date, explode(expr(f"sequence({Colname.from_date}, {Colname.to_date}, interval 1 day)"))) \
-        .filter((year(Colname.date) == year(Colname.time))) \
-        .filter((month(Colname.date) == month(Colname.time))) \
+    # Only subscriptions are exploded, prices of other charge types keep their own time
+    is_subscription = col(Colname.charge_type) == ChargeType.subscription
+    # The days of a subscription are the days from its from date within the month of the price. Generating only the days
+    # within the month, instead of all days of the charge and filtering afterwards, bounds the days to 31 for charges without an end.
+    month_start = date_trunc("month", col(Colname.time))
+    days_before_month = ceil((month_start.cast("double") - col(Colname.from_date).cast("double")) / seconds_per_day).cast("int")
+    first_day = when(col(Colname.from_date) < month_start, col(Colname.from_date) + expr(f"make_interval(0, 0, 0, {days_before_month_column}, 0, 0, 0)")) \
+        .otherwise(col(Colname.from_date))
+    last_day = least(col(Colname.to_date), month_start + expr("interval 1 month") - expr("interval 1 microsecond"))
+    charges_with_prices = charges_with_prices \
+        .withColumn(days_before_month_column, days_before_month) \
+        .withColumn(
+            Colname.date,
+            explode(
+                # Subscriptions without days within the month get no rows, as explode skips null
+                when(is_subscription & (first_day <= last_day), sequence(first_day, last_day, expr("interval 1 day")))
+                .when(~is_subscription, array(Colname.time)))) \
         .select(
             Colname.charge_key,
             Colname.charge_id,
@@ -104,15 +164,8 @@ def explode_subscription(charges_with_prices: DataFrame) -> DataFrame:
     return charges_with_prices
 
 
-def join_with_charge_links(df: DataFrame, charge_links: DataFrame) -> DataFrame:
-    df = df \
-        .join(
-        charge_links,
-        [
-            df[Colname.charge_key] == charge_links[Colname.charge_key],
-            df[Colname.time] >= charge_links[Colname.from_date],
-            df[Colname.time] < charge_links[Colname.to_date]
-        ], "inner") \
+def join_with_charge_links(df: DataFrame, charge_links: DataFrame, period: Period = None) -> DataFrame:
+    df = range_join(df, charge_links, [Colname.charge_key], "inner", period) \
         .select(
             df[Colname.charge_key],
             df[Colname.charge_id],
@@ -127,14 +180,8 @@ def join_with_charge_links(df: DataFrame, charge_links: DataFrame) -> DataFrame:
     return df
 
 
-def join_with_martket_roles(df: DataFrame, market_roles: DataFrame) -> DataFrame:
-    df = df.join(
-        market_roles,
-        [
-            df[Colname.metering_point_id] == market_roles[Colname.metering_point_id],
-            df[Colname.time] >= market_roles[Colname.from_date],
-            df[Colname.time] < market_roles[Colname.to_date]
-        ], "inner") \
+def join_with_martket_roles(df: DataFrame, market_roles: DataFrame, period: Period = None) -> DataFrame:
+    df = range_join(df, market_roles, [Colname.metering_point_id], "inner", period) \
         .select(
             df[Colname.charge_key],
             df[Colname.charge_id],
@@ -155,14 +202,8 @@ def get_connected_metering_points(metering_points: DataFrame) -> DataFrame:
     return metering_points
 
 
-def join_with_metering_points(df: DataFrame, metering_points: DataFrame) -> DataFrame:
-    df = df.join(
-        metering_points,
-        [
-            df[Colname.metering_point_id] == metering_points[Colname.metering_point_id],
-            df[Colname.time] >= metering_points[Colname.from_date],
-            df[Colname.time] < metering_points[Colname.to_date]
-        ], "inner") \
+def join_with_metering_points(df: DataFrame, metering_points: DataFrame, period: Period = None) -> DataFrame:
+    df = range_join(df, metering_points, [Colname.metering_point_id], "inner", period) \
         .select(
             df[Colname.charge_key],
             df[Colname.charge_id],
@@ -182,22 +223,6 @@ def join_with_metering_points(df: DataFrame, metering_points: DataFrame) -> Data
     return df
 
 
-def group_by_time_series_on_metering_point_id_and_resolution_and_sum_quantity(time_series: DataFrame, resolution_duration: ResolutionDuration) -> DataFrame:
-    grouped_time_series = time_series \
-        .groupBy(
-            Colname.metering_point_id,
-            window(Colname.time, __get_window_duration_string_based_on_resolution(resolution_duration))
-        ) \
-        .sum(Colname.quantity) \
-        .withColumnRenamed(f'sum({Colname.quantity})', Colname.quantity) \
-        .selectExpr(
-            Colname.quantity,
-            Colname.metering_point_id,
-            f'window.{Colname.start} as {Colname.time}'
-        )
-    return grouped_time_series
-
-
 def join_with_grouped_time_series(df: DataFrame, grouped_time_series: DataFrame) -> DataFrame:
     df = df.join(
         grouped_time_series,
@@ -225,51 +250,25 @@ def join_with_grouped_time_series(df: DataFrame, grouped_time_series: DataFrame)
     return df
 
 
-def __get_window_duration_string_based_on_resolution(resolution_duration: ResolutionDuration) -> str:
-    window_duration_string = '1 hour'
-
-    if(resolution_duration == ResolutionDuration.day):
-        window_duration_string = '1 day'
-
-    return window_duration_string
-
-
-# Join charges, charge prices, charge links, metering points and market roles together. On given charge type
-def __join_properties_on_charges_with_given_charge_type(charges: DataFrame, charge_prices: DataFrame, charge_links: DataFrame,
-                                                        metering_points: DataFrame, market_roles: DataFrame,
-                                                        charge_type: ChargeType) -> DataFrame:
-    # filter on charge_type
-    charges = get_charges_based_on_charge_type(charges, charge_type)
-
-    # join charge prices with charges
-    charges_with_prices = join_with_charge_prices(charges, charge_prices)
-
-    if charge_type == ChargeType.subscription:
-        # Explode dataframe: create row for each day the time period from and to date
-        charges_with_prices = explode_subscription(charges_with_prices)
-
-    # join charge links with charges_with_prices
-    charges_with_price_and_links = join_with_charge_links(charges_with_prices, charge_links)
-
-    df = join_with_martket_roles(charges_with_price_and_links, market_roles)
-
-    metering_points = get_connected_metering_points(metering_points)
-
-    df = join_with_metering_points(df, metering_points)
-
-    if charge_type != ChargeType.tariff:
-        df = df.select(
-            Colname.charge_key,
-            Colname.charge_id,
-            Colname.charge_type,
-            Colname.charge_owner,
-            Colname.time,
-            Colname.charge_price,
-            Colname.metering_point_type,
-            Colname.settlement_method,
-            Colname.grid_area,
-            Colname.connection_state,
-            Colname.energy_supplier_id
-        )
-
-    return df
+def __select_charge_properties(df: DataFrame) -> DataFrame:
+    return df.select(
+        Colname.charge_key,
+        Colname.charge_id,
+        Colname.charge_type,
+        Colname.charge_owner,
+        Colname.time,
+        Colname.charge_price,
+        Colname.metering_point_type,
+        Colname.settlement_method,
+        Colname.grid_area,
+        Colname.connection_state,
+        Colname.energy_supplier_id
+    )
+
+
+def __get_months_of_period(period: Period) -> Period:
+    from_date = period.from_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    to_date = period.to_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if to_date < period.to_date:
+        to_date = to_date.replace(year=to_date.year + 1, month=1) if to_date.month == 12 else to_date.replace(month=to_date.month + 1)
+    return Period(from_date, to_date)
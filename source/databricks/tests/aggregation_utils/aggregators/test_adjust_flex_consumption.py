@@ -22,6 +22,7 @@ from pyspark.sql.functions import col
 from pyspark.sql.types import StructType, StringType, DecimalType, TimestampType, BooleanType
 import pytest
 import pandas as pd
+from tests.helpers import physical_plan
 
 # Default values
 default_domain = "D1"
@@ -303,3 +304,18 @@ def test_correct_grid_loss_entry_is_used_to_determine_energy_responsible_for_the
     #         sup = "F"
     #     fc_row = flex_consumption_result_row_factory(supplier=sup, time_window=time_windows[i])
     #     fc_df.union(fc_row)
+
+
+def test_grid_loss_responsible_is_found_with_equi_join_on_grid_area(
+        flex_consumption_result_row_factory,
+        added_grid_loss_result_row_factory,
+        grid_loss_sys_cor_row_factory):
+    results = {}
+    results[ResultKeyName.flex_consumption] = create_dataframe_from_aggregation_result_schema(metadata, flex_consumption_result_row_factory(supplier="A"))
+    results[ResultKeyName.added_grid_loss] = create_dataframe_from_aggregation_result_schema(metadata, added_grid_loss_result_row_factory())
+    results[ResultKeyName.grid_loss_sys_cor_master_data] = grid_loss_sys_cor_row_factory(supplier="A")
+
+    plan = physical_plan(adjust_flex_consumption(results, metadata))
+
+    assert "NestedLoopJoin" not in plan
+    assert "CartesianProduct" not in plan
@@ -22,6 +22,7 @@ from pyspark.sql.functions import col
 from pyspark.sql.types import StructType, StringType, DecimalType, TimestampType, BooleanType
 import pytest
 import pandas as pd
+from tests.helpers import physical_plan
 
 # Default values
 default_domain = "D1"
@@ -286,3 +287,18 @@ def test_correct_system_correction_entry_is_used_to_determine_energy_responsible
     assert result_df.filter(col(Colname.energy_supplier_id) == "B"). \
         filter(col(f"{Colname.time_window_start}") == time_window_3["start"]). \
         collect()[0][Colname.sum_quantity] == default_sum_quantity + gasc_result_3
+
+
+def test_system_correction_responsible_is_found_with_equi_join_on_grid_area(
+        hourly_production_result_row_factory,
+        added_system_correction_result_row_factory,
+        sys_cor_row_factory):
+    results = {}
+    results[ResultKeyName.hourly_production] = create_dataframe_from_aggregation_result_schema(metadata, hourly_production_result_row_factory(supplier="A"))
+    results[ResultKeyName.added_system_correction] = create_dataframe_from_aggregation_result_schema(metadata, added_system_correction_result_row_factory())
+    results[ResultKeyName.grid_loss_sys_cor_master_data] = sys_cor_row_factory(supplier="A")
+
+    plan = physical_plan(adjust_production(results, metadata))
+
+    assert "NestedLoopJoin" not in plan
+    assert "CartesianProduct" not in plan
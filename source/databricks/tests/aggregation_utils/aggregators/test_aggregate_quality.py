@@ -16,6 +16,7 @@ from geh_stream.codelists import Colname
 from pyspark.sql.types import StructType, StringType, TimestampType
 from geh_stream.codelists import Quality, MarketEvaluationPointType
 from geh_stream.aggregation_utils.aggregators import aggregate_quality
+from tests.helpers import physical_plan
 import pytest
 import pandas as pd
 
@@ -165,3 +166,33 @@ def test_input_and_output_dataframe_should_return_same_row_count(test_data_facto
     result_df = aggregate_quality(df)
 
     assert df.count() == result_df.count()
+
+
+def test_aggregated_quality_is_only_shared_by_entries_within_same_grid_area_type_and_hour(spark, schema):
+    pandas_df = pd.DataFrame({
+        Colname.grid_area: ["1", "1", "1", "2"],
+        Colname.metering_point_type: [mp[0], mp[0], mp[1], mp[0]],
+        Colname.time: [default_obs_time, default_obs_time + timedelta(minutes=45), default_obs_time, default_obs_time],
+        Colname.quality: [Quality.estimated.value, Quality.as_read.value, Quality.as_read.value, Quality.as_read.value],
+    })
+    df = spark.createDataFrame(pandas_df, schema=schema)
+    # Same grid area and type as the estimated entry, but in the next hour
+    df = df.union(spark.createDataFrame([("1", mp[0], default_obs_time + timedelta(hours=1), Quality.as_read.value)], schema=schema))
+
+    result_df = aggregate_quality(df).sort(Colname.grid_area, Colname.metering_point_type, Colname.time).toPandas()
+
+    assert list(result_df[Colname.aggregated_quality]) == [
+        Quality.estimated.value,
+        Quality.estimated.value,
+        Quality.as_read.value,
+        Quality.as_read.value,
+        Quality.as_read.value]
+
+
+def test_aggregated_quality_is_computed_without_joining_entries(test_data_factory):
+    df = test_data_factory(Quality.estimated.value, Quality.as_read.value, Quality.as_read.value)
+
+    plan = physical_plan(aggregate_quality(df))
+
+    assert "Join" not in plan
+    assert plan.count("Exchange") == 1
@@ -21,6 +21,7 @@ from pyspark.sql.types import StructType, StringType, DecimalType, TimestampType
 from unittest.mock import Mock
 import pytest
 import pandas as pd
+from tests.helpers import physical_plan
 
 
 @pytest.fixture(scope="module")
@@ -173,3 +174,15 @@ def test_combine_added_grid_loss_with_master_data(grid_loss_sys_cor_master_data_
 
     # expected data for combine_added_grid_loss_with_master_data is at index 0 in expected_combined_data_factory
     assert result.collect()[0] == expected_combined_data_factory.collect()[0]
+
+
+def test_combine_master_data_uses_equi_join_on_grid_area(grid_loss_sys_cor_master_data_result_factory, aggregation_result_factory):
+    metadata = Metadata("1", "1", "1", "1", "1")
+    results = {}
+    results[ResultKeyName.grid_loss_sys_cor_master_data] = grid_loss_sys_cor_master_data_result_factory()
+    results[ResultKeyName.added_grid_loss] = aggregation_result_factory(grid_area="500", added_grid_loss=Decimal(6.0))
+
+    plan = physical_plan(combine_added_grid_loss_with_master_data(results, metadata))
+
+    assert "NestedLoopJoin" not in plan
+    assert "CartesianProduct" not in plan
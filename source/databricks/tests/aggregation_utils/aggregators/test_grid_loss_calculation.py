@@ -19,6 +19,7 @@ from geh_stream.aggregation_utils.aggregators import calculate_grid_loss, calcul
 from geh_stream.codelists import Quality
 from geh_stream.shared.data_classes import Metadata
 from geh_stream.aggregation_utils.aggregation_result_formatter import create_dataframe_from_aggregation_result_schema
+from tests.helpers import physical_plan
 from pyspark.sql.types import StructType, StringType, DecimalType, TimestampType
 from pyspark.sql.functions import col
 import pytest
@@ -301,10 +302,23 @@ def test_grid_loss_calculation_calculates_correctly_on_grid_area(agg_net_exchang
 
     result = calculate_residual_ga(results, metadata)
 
-    result_collect = result.collect()
+    result_collect = result.orderBy(Colname.grid_area, Colname.time_window).collect()
     assert result_collect[0][Colname.sum_quantity] == Decimal("6")
     assert result_collect[1][Colname.sum_quantity] == Decimal("0")
     assert result_collect[2][Colname.sum_quantity] == Decimal("0")
     assert result_collect[3][Colname.sum_quantity] == Decimal("-6")
     assert result_collect[4][Colname.sum_quantity] == Decimal("-2")
     assert result_collect[5][Colname.sum_quantity] == Decimal("0")
+
+
+def test_residual_ga_is_calculated_in_a_single_aggregation(agg_net_exchange_factory, agg_hourly_consumption_factory, agg_flex_consumption_factory, agg_hourly_production_factory):
+    results = {}
+    results[ResultKeyName.net_exchange_per_ga] = create_dataframe_from_aggregation_result_schema(metadata, agg_net_exchange_factory())
+    results[ResultKeyName.hourly_settled_consumption_ga] = create_dataframe_from_aggregation_result_schema(metadata, agg_hourly_consumption_factory())
+    results[ResultKeyName.flex_settled_consumption_ga] = create_dataframe_from_aggregation_result_schema(metadata, agg_flex_consumption_factory())
+    results[ResultKeyName.hourly_production_ga] = create_dataframe_from_aggregation_result_schema(metadata, agg_hourly_production_factory())
+
+    plan = physical_plan(calculate_residual_ga(results, metadata))
+
+    assert "Join" not in plan
+    assert plan.count("Exchange") == 1
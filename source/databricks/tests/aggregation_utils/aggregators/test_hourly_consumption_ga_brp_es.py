@@ -14,7 +14,8 @@
 from decimal import Decimal
 from datetime import datetime
 from geh_stream.codelists import Colname, ResultKeyName
-from geh_stream.aggregation_utils.aggregators import aggregate_hourly_consumption, aggregate_per_ga_and_brp_and_es
+from geh_stream.aggregation_utils.aggregators import aggregate_hourly_consumption, aggregate_per_ga_and_brp_and_es, \
+    aggregate_consumption_and_production_per_ga_and_brp_and_es
 from geh_stream.codelists import MarketEvaluationPointType, SettlementMethod, ConnectionState, Quality
 from geh_stream.shared.data_classes import Metadata
 from geh_stream.schemas.output import aggregation_result_schema
@@ -207,3 +208,23 @@ def test_expected_schema(time_series_row_factory):
     results[ResultKeyName.aggregation_base_dataframe] = time_series_row_factory()
     aggregated_df = aggregate_hourly_consumption(results, metadata)
     assert aggregated_df.schema == aggregation_result_schema
+
+
+def test_hourly_consumption_supplier_aggregator_uses_shared_consumption_and_production_result(time_series_row_factory):
+    """
+    Aggregator should select its rows from the consumption and production aggregated in a single pass,
+    when that result is available
+    """
+    results = {}
+    results[ResultKeyName.aggregation_base_dataframe] = time_series_row_factory(quantity=Decimal(1)) \
+        .union(time_series_row_factory(quantity=Decimal(2))) \
+        .union(time_series_row_factory(settlement_method=e_01)) \
+        .union(time_series_row_factory(point_type=e_18))
+    results[ResultKeyName.consumption_and_production_per_ga_brp_es] = aggregate_consumption_and_production_per_ga_and_brp_and_es(results, None)
+    # Remove the base dataframe to make sure the shared result is used
+    del results[ResultKeyName.aggregation_base_dataframe]
+
+    aggregated_df = aggregate_hourly_consumption(results, metadata)
+
+    assert aggregated_df.count() == 1
+    check_aggregation_row(aggregated_df, 0, default_domain, default_responsible, default_supplier, Decimal(3), datetime(2020, 1, 1, 0, 0, 0), datetime(2020, 1, 1, 1, 0, 0))
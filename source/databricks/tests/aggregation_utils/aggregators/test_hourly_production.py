@@ -17,12 +17,14 @@ from geh_stream.codelists import Colname, ResultKeyName, ResolutionDuration, Mar
 from geh_stream.aggregation_utils.aggregators import \
     aggregate_hourly_production_ga_es, \
     aggregate_hourly_production_ga_brp, \
-    aggregate_hourly_production_ga
+    aggregate_hourly_production_ga, \
+    aggregate_hourly_production_rollup
 from geh_stream.shared.data_classes import Metadata
 from geh_stream.aggregation_utils.aggregation_result_formatter import create_dataframe_from_aggregation_result_schema
 from pyspark.sql.types import StructType, StringType, DecimalType, TimestampType
 import pytest
 import pandas as pd
+from tests.helpers import physical_plan
 from geh_stream.codelists import Quality
 
 date_time_formatting_string = "%Y-%m-%dT%H:%M:%S%z"
@@ -120,3 +122,15 @@ def test_production_calculation_per_ga(test_data_factory):
     assert result_collect[1][Colname.sum_quantity] == Decimal("375")
     assert result_collect[2][Colname.grid_area] == "2"
     assert result_collect[2][Colname.sum_quantity] == Decimal("425")
+
+
+def test_production_rollup_computes_all_grid_area_results_in_one_aggregation(test_data_factory):
+    results = {}
+    results[ResultKeyName.hourly_production_with_system_correction_and_grid_loss] = create_dataframe_from_aggregation_result_schema(metadata, test_data_factory())
+    rollup = aggregate_hourly_production_rollup(results, metadata)
+    results_with_rollup = dict(results)
+    results_with_rollup[ResultKeyName.hourly_production_rollup] = rollup
+
+    for step in [aggregate_hourly_production_ga_es, aggregate_hourly_production_ga_brp, aggregate_hourly_production_ga]:
+        assert sorted(step(results_with_rollup, metadata).collect()) == sorted(step(results, metadata).collect())
+    assert physical_plan(rollup).count("Exchange") == 1
@@ -16,8 +16,9 @@ from decimal import Decimal
 import pandas as pd
 from datetime import datetime, timedelta
 from geh_stream.codelists import Colname, ResultKeyName
-from geh_stream.aggregation_utils.aggregators import aggregate_net_exchange_per_ga
-from geh_stream.codelists import MarketEvaluationPointType, ConnectionState, Quality
+from geh_stream.aggregation_utils.aggregators import aggregate_net_exchange_per_ga, aggregate_exchange_per_in_and_out_ga, aggregate_net_exchange_per_neighbour_ga
+from geh_stream.aggregation_utils.aggregation_result_formatter import create_dataframe_from_aggregation_result_schema
+from geh_stream.codelists import MarketEvaluationPointType, ConnectionState, Quality, ResolutionDuration
 from geh_stream.shared.data_classes import Metadata
 from geh_stream.schemas.output import aggregation_result_schema
 from pyspark.sql import DataFrame
@@ -149,3 +150,94 @@ def check_aggregation_row(df: DataFrame, MeteringGridArea_Domain_mRID: str, sum:
         Colname.sum_quantity), F.col(f"{Colname.time_window_start}").alias("start"), F.col(f"{Colname.time_window_end}").alias("end"))
     res = gridfiltered.filter(gridfiltered["start"] == time).toPandas()
     assert res[Colname.sum_quantity][0] == sum
+
+
+def aggregate_net_exchange_per_ga_from_time_series(df: DataFrame) -> DataFrame:
+    """
+    Reference that aggregates the net exchange per grid area directly from the time series,
+    which the rollup from the exchange per in and out grid area must be equivalent to
+    """
+    df = df \
+        .filter(F.col(Colname.metering_point_type) == MarketEvaluationPointType.exchange.value) \
+        .filter(F.col(Colname.connection_state).isin(ConnectionState.connected.value, ConnectionState.disconnected.value))
+    exchange_in = df \
+        .groupBy(F.col(Colname.in_grid_area).alias(Colname.grid_area), F.window(F.col(Colname.time), "1 hour").alias(Colname.time_window), Colname.aggregated_quality) \
+        .agg(F.sum(Colname.quantity).alias("in_sum"))
+    exchange_out = df \
+        .groupBy(F.col(Colname.out_grid_area).alias(Colname.grid_area), F.window(F.col(Colname.time), "1 hour").alias(Colname.time_window)) \
+        .agg(F.sum(Colname.quantity).alias("out_sum"))
+    result = exchange_in \
+        .join(exchange_out,
+              (exchange_in[Colname.grid_area] == exchange_out[Colname.grid_area]) & (exchange_in[Colname.time_window] == exchange_out[Colname.time_window]),
+              how="outer") \
+        .select(
+            exchange_in[Colname.grid_area],
+            exchange_in[Colname.time_window],
+            (exchange_in["in_sum"] - exchange_out["out_sum"]).alias(Colname.sum_quantity),
+            exchange_in[Colname.aggregated_quality].alias(Colname.quality),
+            F.lit(ResolutionDuration.hour).alias(Colname.resolution),
+            F.lit(MarketEvaluationPointType.exchange.value).alias(Colname.metering_point_type))
+    return create_dataframe_from_aggregation_result_schema(metadata, result)
+
+
+@pytest.fixture(scope="module")
+def exchange_with_edge_cases_data_frame(spark, time_series_schema):
+    pandas_df = pd.DataFrame({
+        Colname.metering_point_type: [],
+        Colname.in_grid_area: [],
+        Colname.out_grid_area: [],
+        Colname.quantity: [],
+        Colname.time: [],
+        Colname.connection_state: [],
+        Colname.aggregated_quality: []
+    })
+    pandas_df = add_row_of_data(pandas_df, e_20, "A", "B", Decimal("10"), default_obs_time, ConnectionState.connected.value)
+    # Disconnected meters are part of the exchange, new meters are not
+    pandas_df = add_row_of_data(pandas_df, e_20, "B", "A", Decimal("4"), default_obs_time, ConnectionState.disconnected.value)
+    pandas_df = add_row_of_data(pandas_df, e_20, "A", "B", Decimal("100"), default_obs_time, ConnectionState.new.value)
+    # Exchange without counter-flow, both in the same hour and in an hour without other exchange
+    pandas_df = add_row_of_data(pandas_df, e_20, "D", "E", Decimal("6"), default_obs_time, ConnectionState.connected.value)
+    pandas_df = add_row_of_data(pandas_df, e_20, "A", "C", Decimal("3"), default_obs_time + timedelta(hours=1), ConnectionState.connected.value)
+    # Exchange with another quality
+    pandas_df = pandas_df.append({
+        Colname.metering_point_type: e_20,
+        Colname.in_grid_area: "A",
+        Colname.out_grid_area: "B",
+        Colname.quantity: Decimal("2"),
+        Colname.time: default_obs_time + timedelta(minutes=15),
+        Colname.connection_state: ConnectionState.connected.value,
+        Colname.aggregated_quality: Quality.as_read.value
+    }, ignore_index=True)
+    return spark.createDataFrame(pandas_df, schema=time_series_schema)
+
+
+def test_exchange_aggregator_is_equivalent_to_aggregating_time_series(exchange_with_edge_cases_data_frame, time_series_data_frame):
+    for df in [exchange_with_edge_cases_data_frame, time_series_data_frame]:
+        results = {ResultKeyName.aggregation_base_dataframe: df}
+        results[ResultKeyName.exchange_per_in_and_out_ga] = aggregate_exchange_per_in_and_out_ga(results, metadata)
+
+        actual = aggregate_net_exchange_per_ga(results, metadata)
+
+        expected = aggregate_net_exchange_per_ga_from_time_series(df)
+        assert sorted(actual.collect(), key=str) == sorted(expected.collect(), key=str)
+
+
+def test_exchange_aggregator_rolls_up_exchange_per_in_and_out_grid_area(exchange_with_edge_cases_data_frame):
+    results = {ResultKeyName.aggregation_base_dataframe: exchange_with_edge_cases_data_frame}
+
+    actual = aggregate_net_exchange_per_ga(results, metadata) \
+        .filter(F.col(Colname.grid_area) == "B") \
+        .collect()
+
+    assert len(actual) == 1
+    assert actual[0][Colname.sum_quantity] == Decimal("-8")
+
+
+def test_exchange_aggregators_share_exchange_per_in_and_out_grid_area(exchange_with_edge_cases_data_frame):
+    results = {ResultKeyName.aggregation_base_dataframe: exchange_with_edge_cases_data_frame}
+    exchange = aggregate_exchange_per_in_and_out_ga(results, metadata)
+    results_with_exchange = {ResultKeyName.exchange_per_in_and_out_ga: exchange}
+
+    # The steps do not need the time series when the exchange per in and out grid area is part of the results
+    assert aggregate_net_exchange_per_ga(results_with_exchange, metadata).count() > 0
+    assert aggregate_net_exchange_per_neighbour_ga(results_with_exchange, metadata).count() > 0
@@ -22,6 +22,7 @@ from geh_stream.codelists import MarketEvaluationPointType, ConnectionState, Qua
 from geh_stream.shared.data_classes import Metadata
 from geh_stream.schemas.output import aggregation_result_schema
 from pyspark.sql.types import StructType, StringType, DecimalType, TimestampType
+from tests.helpers import physical_plan
 
 
 e_20 = MarketEvaluationPointType.exchange.value
@@ -144,3 +145,24 @@ def test_expected_schema(single_hour_test_data):
         Colname.out_grid_area,
         Colname.time_window)
     assert df.schema == aggregation_result_schema
+
+
+def test_aggregate_net_exchange_per_neighbour_ga_without_exchange_in_opposite_direction(spark, time_series_schema):
+    pandas_df = pd.DataFrame(df_template)
+    pandas_df = add_row_of_data(pandas_df, "A", "A", "B", default_obs_time, Decimal("10"))
+    pandas_df = add_row_of_data(pandas_df, "B", "B", "C", default_obs_time, Decimal("10"))
+    pandas_df = add_row_of_data(pandas_df, "C", "C", "B", default_obs_time + timedelta(hours=1), Decimal("10"))
+    results = {ResultKeyName.aggregation_base_dataframe: spark.createDataFrame(pandas_df, schema=time_series_schema)}
+
+    df = aggregate_net_exchange_per_neighbour_ga(results, metadata)
+
+    assert df.count() == 0
+
+
+def test_aggregate_net_exchange_per_neighbour_ga_does_not_join_exchange_of_all_grid_areas(multi_hour_test_data):
+    results = {ResultKeyName.aggregation_base_dataframe: multi_hour_test_data}
+
+    plan = physical_plan(aggregate_net_exchange_per_neighbour_ga(results, metadata))
+
+    assert "Join" not in plan
+    assert "CartesianProduct" not in plan
@@ -19,6 +19,7 @@ from geh_stream.codelists import Colname, Quality, ResultKeyName, ResolutionDura
 from geh_stream.aggregation_utils.aggregators import calculate_total_consumption
 from geh_stream.shared.data_classes import Metadata
 from geh_stream.aggregation_utils.aggregation_result_formatter import create_dataframe_from_aggregation_result_schema
+from tests.helpers import physical_plan
 from pyspark.sql.types import StructType, StringType, DecimalType, TimestampType
 import pytest
 import pandas as pd
@@ -177,7 +178,7 @@ def test_grid_area_total_consumption(agg_net_exchange_factory, agg_production_fa
     results[ResultKeyName.net_exchange_per_ga] = create_dataframe_from_aggregation_result_schema(metadata, agg_net_exchange_factory())
     results[ResultKeyName.hourly_production_ga] = create_dataframe_from_aggregation_result_schema(metadata, agg_production_factory())
     aggregated_df = calculate_total_consumption(results, metadata)
-    aggregated_df_collect = aggregated_df.collect()
+    aggregated_df_collect = aggregated_df.orderBy(Colname.grid_area, Colname.time_window).collect()
     assert aggregated_df_collect[0][Colname.sum_quantity] == Decimal("14.0") and \
         aggregated_df_collect[1][Colname.sum_quantity] == Decimal("6.0") and \
         aggregated_df_collect[2][Colname.sum_quantity] == Decimal("7.0")
@@ -205,3 +206,14 @@ def test_aggregated_quality(
     result_df = calculate_total_consumption(results, metadata)
 
     assert result_df.collect()[0][Colname.quality] == expected_quality
+
+
+def test_grid_area_total_consumption_is_calculated_in_a_single_aggregation(agg_net_exchange_factory, agg_production_factory):
+    results = {}
+    results[ResultKeyName.net_exchange_per_ga] = create_dataframe_from_aggregation_result_schema(metadata, agg_net_exchange_factory())
+    results[ResultKeyName.hourly_production_ga] = create_dataframe_from_aggregation_result_schema(metadata, agg_production_factory())
+
+    plan = physical_plan(calculate_total_consumption(results, metadata))
+
+    assert "Join" not in plan
+    assert plan.count("Exchange") == 1
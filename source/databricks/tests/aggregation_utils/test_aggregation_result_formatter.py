@@ -21,6 +21,7 @@ from geh_stream.shared.data_classes import Metadata
 from geh_stream.schemas.output import aggregation_result_schema
 import pytest
 import pandas as pd
+from pyspark.sql import Row
 
 
 @pytest.fixture(scope="module")
@@ -36,9 +37,10 @@ def agg_result_factory(spark):
     ):
         return spark.createDataFrame(pd.DataFrame().append([{
             Colname.grid_area: grid_area,
-            Colname.time_window: {
+            # A struct, like the time window of the aggregations, as a dictionary would become a map
+            Colname.time_window: Row(**{
                 Colname.start: start,
-                Colname.end: end},
+                Colname.end: end}),
             Colname.resolution: resolution,
             Colname.sum_quantity: sum_quantity,
             Colname.quality: quality,
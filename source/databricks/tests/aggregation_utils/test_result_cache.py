@@ -0,0 +1,127 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import itertools
+import pytest
+from pyspark import StorageLevel
+from geh_stream.aggregation_utils.result_cache import ResultCache
+
+dependencies = {
+    10: [0],
+    20: [0],
+    30: [0],
+    60: [20, 30],
+    70: [60],
+    80: [60]
+}
+storage_levels = {
+    0: StorageLevel.MEMORY_AND_DISK,
+    20: StorageLevel.MEMORY_ONLY,
+    30: StorageLevel.MEMORY_ONLY,
+    60: StorageLevel.MEMORY_AND_DISK
+}
+
+
+@pytest.fixture(scope="module")
+def df_factory(spark):
+    # Spark shares the cache between dataframes with the same plan, so every dataframe gets its own plan
+    sizes = itertools.count(1)
+
+    def factory():
+        return spark.range(next(sizes))
+    return factory
+
+
+def test__persist__persists_result_with_storage_level_of_result_key(df_factory):
+    # Arrange
+    sut = ResultCache(dependencies, [10, 20], storage_levels)
+
+    # Act
+    df = sut.persist(0, df_factory())
+
+    # Assert
+    assert df.is_cached
+    assert df.storageLevel.useDisk
+    assert df.storageLevel.useMemory
+
+
+def test__persist__does_not_persist_result_without_storage_level(df_factory):
+    sut = ResultCache(dependencies, [10], storage_levels)
+
+    df = sut.persist(10, df_factory())
+
+    assert not df.is_cached
+
+
+def test__persist__does_not_persist_result_without_consumers_in_job(df_factory):
+    # Step 60 is the only consumer of step 30, and it is not part of the job
+    sut = ResultCache(dependencies, [10, 20, 30], storage_levels)
+
+    df = sut.persist(30, df_factory())
+
+    assert not df.is_cached
+
+
+def test__release__unpersists_result_when_last_consumer_is_released(df_factory):
+    # Arrange
+    sut = ResultCache(dependencies, [10, 20, 30], storage_levels)
+    df = sut.persist(0, df_factory())
+
+    # Act
+    sut.release(10)
+    sut.release(20)
+    is_cached_before_last_release = df.is_cached
+    sut.release(30)
+
+    # Assert
+    assert is_cached_before_last_release
+    assert not df.is_cached
+
+
+def test__release__releases_result_that_is_never_written_when_its_consumers_are_released(df_factory):
+    # Arrange
+    # Step 60 is never written itself, but releasing 70 and 80 means that 60 has been consumed
+    sut = ResultCache(dependencies, [20, 30, 60, 70, 80], storage_levels)
+    df_0 = sut.persist(0, df_factory())
+    df_60 = sut.persist(60, df_factory())
+
+    # Act
+    sut.release(20)
+    sut.release(30)
+    sut.release(70)
+    sut.release(80)
+
+    # Assert
+    assert not df_60.is_cached
+    assert not df_0.is_cached
+
+
+def test__release__same_step_released_twice_only_counts_once(df_factory):
+    sut = ResultCache(dependencies, [10, 20], storage_levels)
+    df = sut.persist(0, df_factory())
+
+    sut.release(10)
+    sut.release(10)
+
+    assert df.is_cached
+
+
+def test__unpersist_all__unpersists_all_persisted_results(df_factory):
+    sut = ResultCache(dependencies, [10, 20, 30, 60, 70], storage_levels)
+    df_0 = sut.persist(0, df_factory())
+    df_60 = sut.persist(60, df_factory())
+
+    sut.unpersist_all()
+
+    assert not df_0.is_cached
+    assert not df_60.is_cached
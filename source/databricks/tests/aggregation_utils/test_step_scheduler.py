@@ -0,0 +1,194 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import pytest
+from geh_stream.aggregation_utils.step_scheduler import StepScheduler, add_required_steps, prune_unpublished_steps
+from geh_stream.aggregation_utils.step_dependencies import step_dependencies
+
+
+def sum_of_dependencies(dependencies):
+    def step(results, metadata):
+        return sum(results[dependency] for dependency in dependencies) + metadata
+    return step
+
+
+def test__run__adds_result_of_each_step_to_results():
+    # Arrange
+    dependencies = {10: [0], 20: [10], 30: [0, 20]}
+    functions = {key: sum_of_dependencies(value) for key, value in dependencies.items()}
+    sut = StepScheduler(functions, dependencies)
+
+    # Act
+    results = sut.run({0: 1}, {10: 1, 20: 1, 30: 1})
+
+    # Assert
+    assert results[10] == 2
+    assert results[20] == 3
+    assert results[30] == 5
+
+
+def test__run__runs_independent_steps_at_the_same_time():
+    # Arrange
+    # Both steps wait for each other, which only succeeds if they are running at the same time
+    barrier = threading.Barrier(2, timeout=10)
+
+    def step(results, metadata):
+        barrier.wait()
+        return metadata
+
+    sut = StepScheduler({10: step, 20: step}, {10: [0], 20: [0]}, max_workers=2)
+
+    # Act
+    results = sut.run({0: 0}, {10: 1, 20: 2})
+
+    # Assert
+    assert results[10] == 1
+    assert results[20] == 2
+
+
+def test__run__does_not_start_step_before_its_dependencies_are_done():
+    # Arrange
+    completed = []
+
+    def step(key):
+        def run(results, metadata):
+            assert all(dependency in results for dependency in dependencies[key])
+            completed.append(key)
+            return key
+        return run
+
+    dependencies = {10: [0], 20: [0], 60: [10, 20], 70: [60], 80: [60]}
+    sut = StepScheduler({key: step(key) for key in dependencies}, dependencies)
+
+    # Act
+    sut.run({0: 0}, {key: None for key in dependencies})
+
+    # Assert
+    assert completed.index(60) > completed.index(10)
+    assert completed.index(60) > completed.index(20)
+    assert completed.index(70) > completed.index(60)
+    assert completed.index(80) > completed.index(60)
+
+
+def test__run__raises_when_dependency_is_not_part_of_job():
+    sut = StepScheduler({20: sum_of_dependencies([10])}, {20: [10]})
+
+    with pytest.raises(ValueError):
+        sut.run({0: 1}, {20: 1})
+
+
+def test__run__raises_when_steps_depend_on_each_other():
+    sut = StepScheduler({10: sum_of_dependencies([20]), 20: sum_of_dependencies([10])}, {10: [20], 20: [10]})
+
+    with pytest.raises(ValueError):
+        sut.run({}, {10: 1, 20: 1})
+
+
+def test__run__raises_exception_from_failing_step():
+    def failing_step(results, metadata):
+        raise RuntimeError("step failed")
+
+    sut = StepScheduler({10: failing_step}, {10: [0]})
+
+    with pytest.raises(RuntimeError):
+        sut.run({0: 1}, {10: 1})
+
+
+def test__run__hands_each_result_to_cache_before_it_is_used():
+    # Arrange
+    class TaggingCache:
+        def persist(self, key, result):
+            return f"cached {result}"
+
+    dependencies = {10: [0], 20: [10]}
+    functions = {10: lambda results, metadata: "10", 20: lambda results, metadata: results[10]}
+    sut = StepScheduler(functions, dependencies, cache=TaggingCache())
+
+    # Act
+    results = sut.run({0: 0}, {10: None, 20: None})
+
+    # Assert
+    assert results[10] == "cached 10"
+    assert results[20] == "cached cached 10"
+
+
+def test__run__calls_on_step_completed_with_each_result_before_dependent_steps_start():
+    # Arrange
+    completed = []
+
+    def step(key):
+        def run(results, metadata):
+            completed.append(("started", key))
+            return key
+        return run
+
+    dependencies = {10: [0], 20: [10]}
+    sut = StepScheduler({key: step(key) for key in dependencies}, dependencies,
+                        on_step_completed=lambda key, result: completed.append(("completed", key, result)))
+
+    # Act
+    sut.run({0: 0}, {10: None, 20: None})
+
+    # Assert
+    assert completed == [("started", 10), ("completed", 10, 10), ("started", 20), ("completed", 20, 20)]
+
+
+def test__step_dependencies__only_depend_on_steps_with_lower_key():
+    # Keys are ordered by the order the steps used to run in, which must still be a valid order
+    for key, dependencies in step_dependencies.items():
+        assert all(dependency < key for dependency in dependencies)
+
+
+def test__add_required_steps__adds_intermediate_dependencies_without_metadata():
+    # Arrange
+    dependencies = {2: [0], 3: [2], 20: [3], 30: [0]}
+    functions = {key: sum_of_dependencies(value) for key, value in dependencies.items()}
+
+    # Act
+    steps = add_required_steps({20: 1, 30: 1}, functions, dependencies)
+
+    # Assert
+    assert steps == {20: 1, 30: 1, 3: None, 2: None}
+
+
+@pytest.mark.parametrize("steps,missing_step", [({60: 1}, 20), ({190: 1}, 180)])
+def test__add_required_steps__raises_when_published_dependency_is_not_part_of_job(steps, missing_step):
+    dependencies = {2: [0], 20: [2], 60: [20], 180: [2], 190: [180]}
+    functions = {key: sum_of_dependencies(value) for key, value in dependencies.items()}
+
+    with pytest.raises(ValueError, match=f"depends on step {missing_step}"):
+        add_required_steps(steps, functions, dependencies)
+
+
+def test__prune_unpublished_steps__skips_unpublished_steps_and_their_dependencies():
+    # Arrange
+    dependencies = {2: [0], 3: [0], 10: [2], 20: [10], 30: [3]}
+    functions = {key: sum_of_dependencies(value) for key, value in dependencies.items()}
+
+    # Act
+    steps, skipped = prune_unpublished_steps({10: 1, 20: 1, 30: 1}, [20, 30], functions, dependencies)
+
+    # Assert
+    assert steps == {10: 1, 2: None}
+    assert skipped == [20, 30]
+
+
+def test__prune_unpublished_steps__runs_unpublished_step_that_published_step_depends_on():
+    dependencies = {10: [0], 20: [10]}
+    functions = {key: sum_of_dependencies(value) for key, value in dependencies.items()}
+
+    steps, skipped = prune_unpublished_steps({10: 1, 20: 2}, [10], functions, dependencies)
+
+    assert steps == {20: 2, 10: 1}
+    assert skipped == []
@@ -0,0 +1,51 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from datetime import datetime
+from dateutil import tz
+import pytest
+from geh_stream.aggregation_utils.trigger_base_arguments import trigger_base_arguments
+from geh_stream.shared.period import parse_period, Period
+
+# The arguments passed to the aggregation and wholesale jobs by the coordinator
+coordinator_arguments = [
+    "--data-storage-account-name", "DATA_STORAGE_ACCOUNT_NAME",
+    "--data-storage-account-key", "DATA_STORAGE_ACCOUNT_KEY",
+    "--data-storage-container-name", "DATA_STORAGE_CONTAINER_NAME",
+    "--result-url", "https://ResultUrl.com",
+    "--snapshot-notify-url", "https://SnapshotNotifyUrl.com",
+    "--snapshots-base-path", "SNAPSHOTS_BASE_PATH",
+    "--snapshot-path", "SNAPSHOT_PATH",
+    "--job-id", "JOB_ID",
+    "--snapshot-id", "SNAPSHOT_ID"]
+
+
+def test__trigger_base_arguments__builds_period_from_coordinator_arguments():
+    args, unknown_args = trigger_base_arguments().parse_known_args(coordinator_arguments + [
+        "--beginning-date-time", "2020-01-01T00:00:00Z",
+        "--end-date-time", "2020-02-01T00:00:00Z"])
+
+    period = parse_period(args.beginning_date_time, args.end_date_time)
+
+    assert isinstance(period, Period)
+    assert period.from_date == datetime(2020, 1, 1, tzinfo=tz.tzutc())
+    assert period.to_date == datetime(2020, 2, 1, tzinfo=tz.tzutc())
+
+
+@pytest.mark.parametrize("missing_argument", ["--beginning-date-time", "--end-date-time"])
+def test__trigger_base_arguments__requires_period(missing_argument):
+    period_arguments = {"--beginning-date-time": "2020-01-01T00:00:00Z", "--end-date-time": "2020-02-01T00:00:00Z"}
+    del period_arguments[missing_argument]
+
+    with pytest.raises(SystemExit):
+        trigger_base_arguments().parse_known_args(coordinator_arguments + [value for item in period_arguments.items() for value in item])
@@ -0,0 +1,146 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+from datetime import datetime
+from geh_stream.codelists import Colname
+from geh_stream.event_dispatch.meteringpoint_batch_dispatcher import dispatch_batch, get_mutation_events
+from geh_stream.event_dispatch.meteringpoint_dispatcher import meteringpoint_dispatcher, meteringpoint_master_data_path, dispatch_integration_events
+from geh_stream.schemas import metering_point_schema
+from geh_stream.schemas.integration_event_schema import integration_event_schema
+
+existing_metering_points = [
+    ("1", "E17", "D01", "ga", "E22", "res", None, None, "mm", None, "unit", "prod", datetime(2021, 1, 1, 0, 0), datetime(9999, 1, 1, 0, 0)),
+    ("2", "E17", "D01", "ga", "E22", "res", None, None, "mm", None, "unit", "prod", datetime(2021, 1, 1, 0, 0), datetime(9999, 1, 1, 0, 0))]
+
+
+def integration_event(event_name, body):
+    return ("event-id", "2021-01-01T00:00:00Z", event_name, "MeteringPoints", json.dumps(body))
+
+
+def write_master_data(spark, master_data_path):
+    spark.createDataFrame(existing_metering_points, schema=metering_point_schema) \
+        .write \
+        .format("delta") \
+        .partitionBy(Colname.metering_point_id) \
+        .save(master_data_path)
+
+
+def read_master_data(spark, master_data_path):
+    result = spark.read.format("delta").load(master_data_path) \
+        .select(Colname.metering_point_id, Colname.settlement_method, Colname.connection_state, Colname.from_date, Colname.to_date) \
+        .orderBy(Colname.metering_point_id, Colname.from_date) \
+        .collect()
+    return [tuple(row) for row in result]
+
+
+created_metering_point_3 = {
+    "metering_point_id": "3", "metering_point_type": "E18", "grid_area": "ga", "settlement_method": None, "metering_method": "mm",
+    "resolution": "res", "product": "prod", "connection_state": "E22", "unit": "unit", "effective_date": "2021-01-02T00:00:00Z"}
+
+
+def test__get_mutation_events__returns_a_column_for_each_mutated_column(spark):
+
+    # Arrange
+    events_df = spark.createDataFrame([
+        integration_event("SettlementMethodUpdated", {"metering_point_id": "1", "settlement_method": "D03", "effective_date": "2021-01-05T00:00:00Z"}),
+        integration_event("MeteringPointConnected", {"metering_point_id": "1", "connection_state": "E23", "effective_date": "2021-01-06T00:00:00Z"}),
+        integration_event("UnknownEvent", {"metering_point_id": "1"})],
+        schema=integration_event_schema)
+
+    # Act
+    sut = get_mutation_events(events_df)
+
+    # Assert
+    assert [tuple(row) for row in sut.orderBy(Colname.effective_date).collect()] == [
+        ("1", datetime(2021, 1, 5, 0, 0), "D03", None),
+        ("1", datetime(2021, 1, 6, 0, 0), None, "E23")]
+
+
+def test__dispatch_batch__merges_all_events_of_batch_into_master_data(spark, tmp_path):
+
+    # Arrange
+    master_data_path = str(tmp_path / "metering-points")
+    write_master_data(spark, master_data_path)
+
+    events_df = spark.createDataFrame([
+        integration_event("SettlementMethodUpdated", {"metering_point_id": "1", "settlement_method": "D03", "effective_date": "2021-01-05T00:00:00Z"}),
+        integration_event("MeteringPointConnected", {"metering_point_id": "1", "connection_state": "E23", "effective_date": "2021-01-10T00:00:00Z"}),
+        integration_event("MeteringPointCreated", created_metering_point_3),
+        integration_event("MeteringPointConnected", {"metering_point_id": "3", "connection_state": "E23", "effective_date": "2021-01-03T00:00:00Z"})],
+        schema=integration_event_schema)
+
+    # Act
+    dispatch_batch(events_df, master_data_path)
+
+    # Assert
+    assert read_master_data(spark, master_data_path) == [
+        ("1", "D01", "E22", datetime(2021, 1, 1, 0, 0), datetime(2021, 1, 5, 0, 0)),
+        ("1", "D03", "E22", datetime(2021, 1, 5, 0, 0), datetime(2021, 1, 10, 0, 0)),
+        ("1", "D03", "E23", datetime(2021, 1, 10, 0, 0), datetime(9999, 1, 1, 0, 0)),
+        ("2", "D01", "E22", datetime(2021, 1, 1, 0, 0), datetime(9999, 1, 1, 0, 0)),
+        ("3", None, "E22", datetime(2021, 1, 2, 0, 0), datetime(2021, 1, 3, 0, 0)),
+        ("3", None, "E23", datetime(2021, 1, 3, 0, 0), datetime(9999, 1, 1, 0, 0))]
+
+
+def test__dispatch_batch__merges_each_period_once_when_events_are_redelivered(spark, tmp_path):
+
+    # Arrange
+    master_data_path = str(tmp_path / "metering-points")
+    write_master_data(spark, master_data_path)
+
+    settlement_method_updated = integration_event("SettlementMethodUpdated", {"metering_point_id": "1", "settlement_method": "D03", "effective_date": "2021-01-05T00:00:00Z"})
+    metering_point_created = integration_event("MeteringPointCreated", created_metering_point_3)
+    dispatch_batch(spark.createDataFrame([metering_point_created], schema=integration_event_schema), master_data_path)
+
+    events_df = spark.createDataFrame(
+        [settlement_method_updated, settlement_method_updated, metering_point_created, metering_point_created],
+        schema=integration_event_schema)
+
+    # Act
+    dispatch_batch(events_df, master_data_path)
+
+    # Assert
+    assert read_master_data(spark, master_data_path) == [
+        ("1", "D01", "E22", datetime(2021, 1, 1, 0, 0), datetime(2021, 1, 5, 0, 0)),
+        ("1", "D03", "E22", datetime(2021, 1, 5, 0, 0), datetime(9999, 1, 1, 0, 0)),
+        ("2", "D01", "E22", datetime(2021, 1, 1, 0, 0), datetime(9999, 1, 1, 0, 0)),
+        ("3", None, "E22", datetime(2021, 1, 2, 0, 0), datetime(9999, 1, 1, 0, 0))]
+
+
+def test__dispatch_integration_events__merges_micro_batches_into_master_data(spark, tmp_path):
+
+    # Arrange
+    meteringpoint_dispatcher.set_master_data_root_path(str(tmp_path / "master-data"))
+    write_master_data(spark, meteringpoint_master_data_path())
+
+    events_path = str(tmp_path / "integration-events")
+    spark.createDataFrame([
+        integration_event("SettlementMethodUpdated", {"metering_point_id": "1", "settlement_method": "D03", "effective_date": "2021-01-05T00:00:00Z"}),
+        integration_event("MeteringPointCreated", created_metering_point_3)],
+        schema=integration_event_schema) \
+        .write \
+        .format("delta") \
+        .save(events_path)
+
+    # Act
+    query = dispatch_integration_events(spark.readStream.format("delta").load(events_path), str(tmp_path / "checkpoint"))
+    query.processAllAvailable()
+    query.stop()
+
+    # Assert
+    assert read_master_data(spark, meteringpoint_master_data_path()) == [
+        ("1", "D01", "E22", datetime(2021, 1, 1, 0, 0), datetime(2021, 1, 5, 0, 0)),
+        ("1", "D03", "E22", datetime(2021, 1, 5, 0, 0), datetime(9999, 1, 1, 0, 0)),
+        ("2", "D01", "E22", datetime(2021, 1, 1, 0, 0), datetime(9999, 1, 1, 0, 0)),
+        ("3", None, "E22", datetime(2021, 1, 2, 0, 0), datetime(9999, 1, 1, 0, 0))]
@@ -12,3 +12,4 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from .dataframe_defaults import DataframeDefaults
+from .query_plan import physical_plan, number_of_files_read
@@ -0,0 +1,31 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from pyspark.sql import DataFrame
+
+
+def physical_plan(df: DataFrame) -> str:
+    """
+    Returns the physical plan Spark selects for the dataframe, which is used to assert how a transformation is executed.
+    """
+    return df._jdf.queryExecution().executedPlan().toString()
+
+
+def number_of_files_read(df: DataFrame) -> int:
+    """
+    Collects the dataframe and returns the number of files its file scans read after partition pruning.
+    """
+    df.collect()
+    leaves = df._jdf.queryExecution().executedPlan().collectLeaves()
+    metrics = [leaves.apply(i).metrics() for i in range(leaves.size())]
+    return sum(metric.apply("numFiles").value() for metric in metrics if metric.contains("numFiles"))
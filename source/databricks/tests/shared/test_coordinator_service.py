@@ -0,0 +1,64 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from argparse import Namespace
+from unittest.mock import Mock, patch
+from geh_stream.shared.services import CoordinatorService
+import pytest
+import requests
+
+
+@pytest.fixture
+def coordinator_service():
+    service = CoordinatorService(Namespace(job_id="job-id", process_type="D03"))
+    service.retry_delay_seconds = 0
+    return service
+
+
+def test__notify_coordinator__retries_failed_notification(coordinator_service):
+    # Arrange
+    failed_response = Mock(status_code=500, reason="Internal Server Error", text="")
+    ok_response = Mock(status_code=200)
+
+    # Act
+    with patch("geh_stream.shared.services.coordinator_service.requests.post", side_effect=[failed_response, ok_response]) as post:
+        coordinator_service.notify_coordinator("result-url", "result-path")
+
+    # Assert
+    assert post.call_count == 2
+
+
+def test__notify_coordinator__raises_when_all_attempts_fail(coordinator_service):
+    with patch("geh_stream.shared.services.coordinator_service.requests.post", side_effect=requests.ConnectionError("unreachable")) as post:
+        with pytest.raises(requests.ConnectionError):
+            coordinator_service.notify_coordinator("result-url", "result-path")
+
+    assert post.call_count == coordinator_service.max_attempts
+
+
+def test__notify_coordinator__does_not_retry_timed_out_notification(coordinator_service):
+    with patch("geh_stream.shared.services.coordinator_service.requests.post", side_effect=requests.ReadTimeout("timed out")) as post:
+        with pytest.raises(requests.ReadTimeout):
+            coordinator_service.notify_coordinator("result-url", "result-path")
+
+    assert post.call_count == 1
+
+
+def test__notify_coordinator__does_not_retry_rejected_notification(coordinator_service):
+    rejected_response = Mock(status_code=400, reason="Bad Request", text="")
+
+    with patch("geh_stream.shared.services.coordinator_service.requests.post", return_value=rejected_response) as post:
+        with pytest.raises(requests.HTTPError):
+            coordinator_service.notify_coordinator("result-url", "result-path")
+
+    assert post.call_count == 1
@@ -12,9 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from datetime import datetime
-from geh_stream.shared.data_loader import select_latest_point_data, filter_time_series_by_metering_points
+from geh_stream.shared.data_loader import select_latest_point_data, filter_time_series_by_metering_points, select_changed_point_data, change_type_column, \
+    sql_table_query, sql_period_condition, sql_date_condition, sql_grid_area_condition, sql_date_partitioning
+from geh_stream.shared.period import parse_period
 from tests.helpers.dataframe_creators.time_series_creator import time_series_factory
 from tests.helpers.dataframe_creators.metering_point_creator import metering_point_factory
+from pyspark.sql.functions import lit
 from pyspark.sql.types import StructType, TimestampType
 from typing import List
 import pytest
@@ -48,3 +51,65 @@ def test_filter_time_series_by_metering_points(time_series_factory, metering_poi
 
     # Assert
     assert df.collect() == time_series_df_2.collect()
+
+
+def test_select_changed_point_data(time_series_factory, metering_point_factory):
+    # Arrange
+    unchanged = time_series_factory(datetime(2020, 1, 1, 0, 0), metering_point_id="D01", registration_date_time=datetime(2020, 1, 1, 0, 0))
+    inserted = time_series_factory(datetime(2020, 1, 1, 1, 0), metering_point_id="D01", registration_date_time=datetime(2020, 1, 3, 0, 0))
+    late = time_series_factory(datetime(2020, 1, 1, 2, 0), metering_point_id="D01", registration_date_time=datetime(2019, 12, 31, 0, 0))
+    new_metering_point = time_series_factory(datetime(2020, 1, 1, 0, 0), metering_point_id="D02", registration_date_time=datetime(2020, 1, 1, 0, 0))
+    time_series_df = unchanged.union(inserted).union(late).union(new_metering_point)
+    changes_df = inserted.withColumn(change_type_column, lit("insert")) \
+        .union(late.withColumn(change_type_column, lit("update_postimage"))) \
+        .union(unchanged.withColumn(change_type_column, lit("update_preimage")))
+    new_metering_point_df = metering_point_factory(datetime(2020, 1, 1, 0, 0), datetime(2020, 1, 2, 0, 0), metering_point_id="D02")
+
+    # Act
+    df = select_changed_point_data(changes_df, time_series_df, new_metering_point_df)
+
+    # Assert
+    assert df.collect() == inserted.union(late).union(new_metering_point).collect()
+
+
+def test_sql_table_query_without_conditions_reads_table():
+    assert sql_table_query("Charge", []) == "Charge"
+
+
+def test_sql_table_query_filters_table_with_all_conditions():
+    query = sql_table_query("MeteringPoint", ["FromDate < '2021-01-02T00:00:00'", None, "GridArea IN ('805')"])
+
+    assert query == "(SELECT * FROM MeteringPoint WHERE FromDate < '2021-01-02T00:00:00' AND GridArea IN ('805')) AS MeteringPoint"
+
+
+def test_sql_period_condition_uses_utc_datetimes():
+    period = parse_period("2021-01-01T00:00:00+0100", "2021-01-02T00:00:00+0000")
+
+    assert sql_period_condition(period) == "FromDate < '2021-01-02T00:00:00' AND ToDate > '2020-12-31T23:00:00'"
+
+
+def test_sql_date_condition_excludes_end_of_period():
+    period = parse_period("2021-01-01T00:00:00+0000", "2021-01-02T00:00:00+0000")
+
+    assert sql_date_condition(period, "Time") == "Time >= '2021-01-01T00:00:00' AND Time < '2021-01-02T00:00:00'"
+
+
+@pytest.mark.parametrize("grid_areas,expected", [
+    (None, None),
+    ([], None),
+    (["805", "806"], "GridArea IN ('805', '806')"),
+    (["8'05"], "GridArea IN ('8''05')"),
+])
+def test_sql_grid_area_condition(grid_areas, expected):
+    assert sql_grid_area_condition(grid_areas) == expected
+
+
+def test_sql_date_partitioning_splits_period_into_ranges():
+    period = parse_period("2021-01-01T00:00:00+0000", "2021-02-01T00:00:00+0000")
+
+    assert sql_date_partitioning(period, "Time", 8) == {
+        "partitionColumn": "Time",
+        "lowerBound": "2021-01-01 00:00:00",
+        "upperBound": "2021-02-01 00:00:00",
+        "numPartitions": 8
+    }
@@ -11,11 +11,12 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from datetime import datetime
-from geh_stream.shared.filters import filter_on_date, filter_on_period
+from datetime import datetime, timedelta
+from geh_stream.shared.filters import filter_on_date, filter_on_period, time_series_points_where_date_condition
 from geh_stream.shared.period import Period
 from geh_stream.codelists import Colname
 from pyspark.sql.types import StructType, TimestampType
+from tests.helpers import number_of_files_read
 from typing import List
 import pytest
 import pandas as pd
@@ -134,3 +135,47 @@ def test_filter_on_date(timestamps_factory):
     timestamps_df = timestamps_factory(timestamps)
     df = filter_on_date(timestamps_df, Period(datetime(2021, 1, 1, 12, 32), datetime(2021, 1, 1, 12, 38)))
     assert df.count() == 6
+
+
+@pytest.mark.parametrize("period,expected", [
+    (Period(datetime(2021, 1, 5), datetime(2021, 1, 6)), "(Year = 2021 AND Month = 1 AND Day = 5)"),
+    (Period(datetime(2021, 1, 28), datetime(2021, 2, 4)), "(Year = 2021 AND Month = 1 AND Day >= 28 AND Day <= 31) OR (Year = 2021 AND Month = 2 AND Day >= 1 AND Day <= 3)"),
+    (Period(datetime(2021, 1, 1), datetime(2021, 3, 1)), "(Year = 2021 AND Month >= 1 AND Month <= 2)"),
+    (Period(datetime(2020, 12, 31, 12), datetime(2022, 1, 1, 12)), "(Year = 2020 AND Month = 12 AND Day = 31) OR (Year = 2021) OR (Year = 2022 AND Month = 1 AND Day = 1)"),
+    (Period(datetime(2021, 1, 5), datetime(2021, 1, 5)), "false"),
+])
+def test_time_series_points_where_date_condition(period, expected):
+    assert time_series_points_where_date_condition(period) == expected
+
+
+@pytest.fixture(scope="module")
+def daily_partitioned_delta_table(spark, tmp_path_factory):
+    """
+    Delta table partitioned like the time series points with one file for each day from 2020-12-01 to 2021-03-31.
+    """
+    path = str(tmp_path_factory.mktemp("time_series_points"))
+    days = [datetime(2020, 12, 1) + timedelta(days=i) for i in range(121)]
+    pandas_df = pd.DataFrame({
+        Colname.time: days,
+        Colname.year: [day.year for day in days],
+        Colname.month: [day.month for day in days],
+        Colname.day: [day.day for day in days]})
+    spark.createDataFrame(pandas_df) \
+        .repartition(Colname.year, Colname.month, Colname.day) \
+        .write \
+        .format("delta") \
+        .partitionBy(Colname.year, Colname.month, Colname.day) \
+        .save(path)
+    return spark.read.format("delta").load(path)
+
+
+@pytest.mark.parametrize("period,expected_number_of_days", [
+    (Period(datetime(2021, 1, 28), datetime(2021, 2, 4)), 7),
+    (Period(datetime(2020, 12, 31), datetime(2021, 3, 1)), 60),
+    (Period(datetime(2021, 2, 10, 6), datetime(2021, 2, 10, 18)), 1),
+])
+def test_time_series_points_where_date_condition_only_reads_days_of_period(daily_partitioned_delta_table, period, expected_number_of_days):
+    df = daily_partitioned_delta_table.where(time_series_points_where_date_condition(period))
+
+    assert number_of_files_read(df) == expected_number_of_days
+    assert df.count() == expected_number_of_days
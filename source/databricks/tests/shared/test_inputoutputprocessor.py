@@ -0,0 +1,95 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from argparse import Namespace
+from threading import Barrier, Lock
+from unittest.mock import Mock, patch
+from geh_stream.shared.services import InputOutputProcessor
+import pytest
+
+max_parallel_results = 3
+
+
+@pytest.fixture
+def io_processor():
+    io_processor = InputOutputProcessor(Namespace(
+        job_id="job-id",
+        snapshot_id="snapshot-id",
+        snapshots_base_path="snapshots",
+        shared_storage_aggregations_base_path="aggregations"))
+    io_processor.coordinator_service = Mock()
+    return io_processor
+
+
+class FakeResultWriter:
+    """
+    Records the order in which results are written and notified, and fails unless max_parallel_results results are written at the same time.
+    """
+
+    def __init__(self, io_processor):
+        self.io_processor = io_processor
+        self.events = []
+        self.__lock = Lock()
+        self.__barrier = Barrier(max_parallel_results, timeout=10)
+        io_processor.coordinator_service.notify_coordinator.side_effect = lambda result_url, path: self.record("notified", path)
+
+    def write_result(self, dataframe):
+        self.__barrier.wait()
+        self.record("written", dataframe)
+        return dataframe
+
+    def on_result_written(self, key):
+        self.record("callback", key)
+
+    def record(self, event, key):
+        with self.__lock:
+            self.events.append((event, key))
+
+
+def test__do_post_processing__writes_results_in_parallel_and_notifies_each_written_result(io_processor):
+    # Arrange
+    writer = FakeResultWriter(io_processor)
+    results = {key: key for key in range(max_parallel_results)}
+
+    # Act
+    with patch.object(InputOutputProcessor, "_InputOutputProcessor__write_result", side_effect=writer.write_result):
+        io_processor.do_post_processing("D03", "job-id", "result-url", results, writer.on_result_written, max_parallel_results)
+
+    # Assert
+    for key in results:
+        assert writer.events.count(("written", key)) == 1
+        assert writer.events.count(("notified", key)) == 1
+        assert writer.events.count(("callback", key)) == 1
+        assert writer.events.index(("written", key)) < writer.events.index(("callback", key))
+        assert writer.events.index(("written", key)) < writer.events.index(("notified", key))
+
+
+def test__do_post_processing__calls_back_for_results_without_path(io_processor):
+    # Arrange
+    written_keys = []
+
+    # Act
+    with patch.object(InputOutputProcessor, "_InputOutputProcessor__write_result", return_value=None):
+        io_processor.do_post_processing("D03", "job-id", "result-url", {10: None, 20: None}, written_keys.append)
+
+    # Assert
+    assert sorted(written_keys) == [10, 20]
+    io_processor.coordinator_service.notify_coordinator.assert_not_called()
+
+
+def test__do_post_processing__raises_when_notification_fails(io_processor):
+    io_processor.coordinator_service.notify_coordinator.side_effect = Exception("coordinator unavailable")
+
+    with patch.object(InputOutputProcessor, "_InputOutputProcessor__write_result", return_value="result-path"):
+        with pytest.raises(Exception, match="coordinator unavailable"):
+            io_processor.do_post_processing("D03", "job-id", "result-url", {10: None})
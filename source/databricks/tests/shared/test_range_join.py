@@ -0,0 +1,83 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from datetime import datetime, timedelta
+import pytest
+from geh_stream.codelists import Colname
+from geh_stream.shared.period import Period
+from geh_stream.shared.range_join import range_join
+from tests.helpers import physical_plan
+
+period = Period(datetime(2020, 1, 1), datetime(2020, 1, 3))
+
+
+@pytest.fixture(scope="module")
+def points(spark):
+    # A point every 15 minutes for two metering points
+    times = [period.from_date + timedelta(minutes=15 * i) for i in range(2 * 24 * 4)]
+    return spark.createDataFrame([(id, time, i) for id in ["1", "2"] for i, time in enumerate(times)], "metering_point_id string, time timestamp, quantity int")
+
+
+@pytest.fixture(scope="module")
+def periods(spark):
+    # Metering point 1 has many historic periods of 5 hours, which cross both hour and day boundaries.
+    # Metering point 2 has an open period and a period without end, which matches nothing.
+    historic = [("1", datetime(2019, 12, 31, 22) + timedelta(hours=5 * i), datetime(2019, 12, 31, 22) + timedelta(hours=5 * (i + 1)), f"1-{i}") for i in range(11)]
+    return spark.createDataFrame(historic + [
+        ("2", datetime(2020, 1, 1, 12, 20), datetime(9999, 12, 31), "2-open"),
+        ("2", datetime(2019, 1, 1), None, "2-without-end")
+    ], "metering_point_id string, from_date timestamp, to_date timestamp, version string")
+
+
+def __collect(df):
+    return sorted(tuple(row) for row in df.collect())
+
+
+def __expected(points, periods, how):
+    return __collect(points.join(periods, [
+        points[Colname.metering_point_id] == periods[Colname.metering_point_id],
+        points[Colname.time] >= periods[Colname.from_date],
+        points[Colname.time] < periods[Colname.to_date]
+    ], how))
+
+
+@pytest.mark.parametrize("how", ["inner", "left"])
+@pytest.mark.parametrize("bucket", ["hour", "day"])
+def test__range_join__in_buckets_returns_same_rows_as_join(points, periods, how, bucket):
+    actual = range_join(points, periods, [Colname.metering_point_id], how, period, bucket)
+
+    assert __collect(actual) == __expected(points, periods, how)
+
+
+@pytest.mark.parametrize("how", ["inner", "left"])
+def test__range_join__with_broadcast_returns_same_rows_as_join(points, periods, how):
+    actual = range_join(points, periods, [Colname.metering_point_id], how, broadcast_periods=True)
+
+    assert __collect(actual) == __expected(points, periods, how)
+
+
+def test__range_join__returns_columns_of_both_dataframes(points, periods):
+    actual = range_join(points, periods, [Colname.metering_point_id], "inner", period)
+
+    assert actual.columns == points.columns + periods.columns
+
+
+def test__range_join__with_broadcast_broadcasts_periods(points, periods):
+    actual = range_join(points, periods, [Colname.metering_point_id], "inner", broadcast_periods=True)
+
+    assert "BroadcastHashJoin" in physical_plan(actual)
+
+
+def test__range_join__raises_on_unsupported_bucket(points, periods):
+    with pytest.raises(ValueError):
+        range_join(points, periods, [Colname.metering_point_id], "inner", period, "month")
@@ -0,0 +1,66 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from decimal import Decimal
+import pytest
+from pyspark.sql.types import StructType, StructField, StringType, IntegerType, DecimalType
+from geh_stream.shared.schema_conformance import conform_to_schema
+
+schema = StructType([
+    StructField("id", StringType(), False),
+    StructField("count", IntegerType(), False),
+    StructField("amount", DecimalType(18, 6), True),
+    StructField("comment", StringType(), True)
+])
+
+
+def test__conform_to_schema__returns_dataframe_with_schema(spark):
+    df = spark.createDataFrame([(2, "A", "1.5")], ["count", "id", "amount"])
+
+    actual = conform_to_schema(df, schema)
+
+    assert actual.schema == schema
+
+
+def test__conform_to_schema__casts_values_and_adds_missing_nullable_columns_as_null(spark):
+    df = spark.createDataFrame([("A", 2, "1.5")], ["id", "count", "amount"])
+
+    actual = conform_to_schema(df, schema).collect()
+
+    assert actual[0]["id"] == "A"
+    assert actual[0]["count"] == 2
+    assert actual[0]["amount"] == Decimal("1.5")
+    assert actual[0]["comment"] is None
+
+
+def test__conform_to_schema__raises_when_non_nullable_column_is_missing(spark):
+    df = spark.createDataFrame([("A", "1.5")], ["id", "amount"])
+
+    with pytest.raises(ValueError):
+        conform_to_schema(df, schema)
+
+
+def test__conform_to_schema__fails_when_non_nullable_column_contains_null(spark):
+    df = spark.createDataFrame([(None, 2)], "id string, count int")
+
+    with pytest.raises(Exception):
+        conform_to_schema(df, schema).collect()
+
+
+def test__conform_to_schema__does_not_convert_to_rdd(spark):
+    df = spark.createDataFrame([("A", 2)], ["id", "count"])
+
+    actual = conform_to_schema(df, schema)
+
+    # Dataframes created from an RDD are scanned as an existing RDD
+    assert "ExistingRDD" not in actual._jdf.queryExecution().optimizedPlan().toString()
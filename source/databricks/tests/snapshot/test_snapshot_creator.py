@@ -0,0 +1,125 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from argparse import Namespace
+from unittest.mock import DEFAULT, Mock, patch
+import pytest
+from pyspark.sql.utils import AnalysisException
+from geh_stream.codelists import BasisDataKeyName
+from geh_stream.snapshot.snapshot_creator import create_snapshot, get_snapshot_info, is_same_period_and_grid_areas
+
+args = Namespace(beginning_date_time="2020-01-01T00:00:00Z", end_date_time="2020-02-01T00:00:00Z")
+
+
+def test__get_snapshot_info__normalizes_period_and_grid_areas():
+    other_args = Namespace(beginning_date_time="2020-01-01T01:00:00+0100", end_date_time="2020-02-01T00:00:00+0000")
+
+    snapshot_info = get_snapshot_info(args, ["806", "805"], 1)
+    other_snapshot_info = get_snapshot_info(other_args, ["805", "806"], 2)
+
+    assert is_same_period_and_grid_areas(other_snapshot_info, snapshot_info)
+    assert snapshot_info.time_series_points_version == 1
+
+
+@pytest.mark.parametrize("beginning_date_time,end_date_time,areas", [
+    ("2020-01-01T00:00:00Z", "2020-03-01T00:00:00Z", ["805"]),
+    ("2019-12-01T00:00:00Z", "2020-02-01T00:00:00Z", ["805"]),
+    ("2020-01-01T00:00:00Z", "2020-02-01T00:00:00Z", ["805", "806"]),
+    ("2020-01-01T00:00:00Z", "2020-02-01T00:00:00Z", []),
+])
+def test__is_same_period_and_grid_areas__is_false_when_period_or_grid_areas_differ(beginning_date_time, end_date_time, areas):
+    previous_snapshot_info = get_snapshot_info(Namespace(beginning_date_time=beginning_date_time, end_date_time=end_date_time), areas, 1)
+
+    assert not is_same_period_and_grid_areas(previous_snapshot_info, get_snapshot_info(args, ["805"], 2))
+
+
+def test__is_same_period_and_grid_areas__is_false_without_previous_snapshot_info():
+    assert not is_same_period_and_grid_areas(None, get_snapshot_info(args, ["805"], 1))
+
+
+loaders = [
+    "load_metering_points",
+    "load_time_series_points",
+    "load_changed_time_series_points",
+    "load_market_roles",
+    "load_es_brp_relations",
+    "load_charges",
+    "load_charge_links",
+    "load_charge_prices",
+    "load_grid_loss_sys_corr",
+    "sum_time_series_per_hour",
+    "sum_time_series_per_day"]
+
+
+@pytest.fixture
+def snapshot_creator():
+    """
+    Patches the loaders and the InputOutputProcessor of the snapshot creator, and lets the previous snapshot be of the same period and grid areas.
+    """
+    with patch.multiple("geh_stream.snapshot.snapshot_creator", **{loader: DEFAULT for loader in loaders}) as patched, \
+            patch("geh_stream.snapshot.snapshot_creator.InputOutputProcessor") as io_processor_class, \
+            patch("geh_stream.snapshot.snapshot_creator.get_time_series_points_version", return_value=2), \
+            patch("geh_stream.snapshot.snapshot_creator.is_change_data_feed_available", return_value=True) as is_change_data_feed_available:
+        io_processor = io_processor_class.return_value
+        io_processor.has_basis_data.return_value = True
+        previous_snapshot_info = get_snapshot_info(args, ["805"], 1)
+        io_processor.load_basis_data.side_effect = lambda spark, key, snapshot_id=None: \
+            Mock(first=Mock(return_value=previous_snapshot_info)) if key == BasisDataKeyName.snapshot_info else Mock()
+        patched["io_processor"] = io_processor
+        patched["is_change_data_feed_available"] = is_change_data_feed_available
+        yield patched
+
+
+def create_snapshot_from_previous_snapshot():
+    create_snapshot(Mock(), ["805"], Namespace(
+        beginning_date_time=args.beginning_date_time,
+        end_date_time=args.end_date_time,
+        previous_snapshot_id="previous-snapshot-id",
+        snapshot_notify_url="snapshot-notify-url"))
+
+
+def test__create_snapshot__writes_all_points_when_change_data_feed_is_not_available(snapshot_creator):
+    # Arrange
+    snapshot_creator["is_change_data_feed_available"].return_value = False
+
+    # Act
+    create_snapshot_from_previous_snapshot()
+
+    # Assert
+    io_processor = snapshot_creator["io_processor"]
+    io_processor.clone_basis_data.assert_not_called()
+    io_processor.write_basis_data.assert_any_call(BasisDataKeyName.time_series, snapshot_creator["load_time_series_points"].return_value)
+
+
+def test__create_snapshot__writes_all_points_when_change_data_feed_cannot_be_read(snapshot_creator):
+    # Arrange
+    changed_time_series = snapshot_creator["load_changed_time_series_points"].return_value.persist.return_value
+    changed_time_series.count.side_effect = AnalysisException("change data was not recorded", None)
+
+    # Act
+    create_snapshot_from_previous_snapshot()
+
+    # Assert
+    io_processor = snapshot_creator["io_processor"]
+    io_processor.clone_basis_data.assert_not_called()
+    changed_time_series.unpersist.assert_called_once()
+    io_processor.write_basis_data.assert_any_call(BasisDataKeyName.time_series, snapshot_creator["load_time_series_points"].return_value)
+
+
+def test__create_snapshot__merges_changed_points_when_change_data_feed_is_available(snapshot_creator):
+    create_snapshot_from_previous_snapshot()
+
+    io_processor = snapshot_creator["io_processor"]
+    io_processor.clone_basis_data.assert_called_once()
+    assert io_processor.clone_basis_data.call_args[0][1:] == (BasisDataKeyName.time_series, "previous-snapshot-id")
+    assert BasisDataKeyName.time_series not in [call[0][0] for call in io_processor.write_basis_data.call_args_list]
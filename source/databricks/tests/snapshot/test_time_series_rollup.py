@@ -0,0 +1,116 @@
+# Copyright 2020 Energinet DataHub A/S
+#
+# Licensed under the Apache License, Version 2.0 (the "License2");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import Mock
+import pytest
+from pyspark.sql.functions import col, sum, window
+from geh_stream.codelists import BasisDataKeyName, Colname, Quality
+from geh_stream.schemas import time_series_points_schema
+from geh_stream.snapshot import sum_time_series_per_hour, sum_time_series_per_day, load_hourly_time_series, load_daily_time_series
+
+
+time_series_dataset_1 = [
+    ("D01", Decimal("10"), Quality.as_read.value, datetime(2020, 1, 15, 5, 0), 2020, 1, 15, datetime(2020, 1, 15, 0, 0)),
+    ("D01", Decimal("10"), Quality.as_read.value, datetime(2020, 1, 15, 1, 0), 2020, 1, 15, datetime(2020, 1, 15, 0, 0)),
+    ("D01", Decimal("10"), Quality.estimated.value, datetime(2020, 1, 15, 1, 30), 2020, 1, 15, datetime(2020, 1, 15, 0, 0)),
+    ("D01", Decimal("10"), Quality.as_read.value, datetime(2020, 1, 16, 1, 0), 2020, 1, 15, datetime(2020, 1, 15, 0, 0))
+]
+
+
+def test__sum_time_series_per_hour__sums_quantity_of_each_metering_point_per_hour(spark):
+    time_series = spark.createDataFrame(time_series_dataset_1, schema=time_series_points_schema)
+
+    result = sum_time_series_per_hour(time_series).orderBy(col(Colname.quantity).desc()).collect()
+
+    assert len(result) == 3
+    assert result[0][Colname.quantity] == Decimal("20")
+    assert result[0][Colname.time] == datetime(2020, 1, 15, 1, 0)
+
+
+def test__sum_time_series_per_day__sums_hourly_sums_of_each_metering_point_per_day(spark):
+    time_series = spark.createDataFrame(time_series_dataset_1, schema=time_series_points_schema)
+
+    result = sum_time_series_per_day(sum_time_series_per_hour(time_series)).orderBy(col(Colname.quantity).desc()).collect()
+
+    assert len(result) == 2
+    assert result[0][Colname.quantity] == Decimal("30")
+    assert result[0][Colname.time] == datetime(2020, 1, 15, 0, 0)
+
+
+@pytest.mark.parametrize("qualities, expected_quality", [
+    ([Quality.as_read.value, Quality.as_read.value], Quality.as_read.value),
+    ([Quality.as_read.value, Quality.estimated.value], Quality.estimated.value),
+    ([Quality.quantity_missing.value, Quality.as_read.value], Quality.estimated.value)
+])
+def test__sum_time_series_per_hour__is_estimated_when_any_point_is_estimated_or_missing(spark, qualities, expected_quality):
+    time_series = spark.createDataFrame(
+        [("D01", Decimal("1"), quality, datetime(2020, 1, 15, 1, 15 * i), 2020, 1, 15, datetime(2020, 1, 15, 0, 0)) for i, quality in enumerate(qualities)],
+        schema=time_series_points_schema)
+
+    hourly = sum_time_series_per_hour(time_series)
+
+    assert hourly.collect()[0][Colname.quality] == expected_quality
+    assert sum_time_series_per_day(hourly).collect()[0][Colname.quality] == expected_quality
+
+
+def test__sum_time_series_per_day__equals_summing_the_points_per_day(spark):
+    # Arrange
+    # Quarterly points over two days, so every day has several hours with several points
+    points = [
+        ("D01", Decimal(i % 7), Quality.as_read.value, datetime(2020, 1, 15 + i // 96, (i // 4) % 24, 15 * (i % 4)), 2020, 1, 15, datetime(2020, 1, 15, 0, 0))
+        for i in range(2 * 96)]
+    time_series = spark.createDataFrame(points, schema=time_series_points_schema)
+    expected = time_series \
+        .groupBy(Colname.metering_point_id, window(Colname.time, "1 day")) \
+        .agg(sum(Colname.quantity).alias(Colname.quantity)) \
+        .select(Colname.metering_point_id, col(f"window.{Colname.start}").alias(Colname.time), Colname.quantity)
+
+    # Act
+    result = sum_time_series_per_day(sum_time_series_per_hour(time_series)) \
+        .select(Colname.metering_point_id, Colname.time, Colname.quantity)
+
+    # Assert
+    assert sorted(result.collect()) == sorted(expected.collect())
+
+
+def snapshot_io_processor(basis_data):
+    io_processor = Mock()
+    io_processor.has_basis_data.side_effect = lambda spark, key: key in basis_data
+    io_processor.load_basis_data.side_effect = lambda spark, key: basis_data[key]
+    return io_processor
+
+
+def test__load_time_series__loads_sums_stored_with_snapshot(spark):
+    time_series = spark.createDataFrame(time_series_dataset_1, schema=time_series_points_schema)
+    hourly_time_series = sum_time_series_per_hour(time_series)
+    daily_time_series = sum_time_series_per_day(hourly_time_series)
+    io_processor = snapshot_io_processor({
+        BasisDataKeyName.time_series: time_series,
+        BasisDataKeyName.hourly_time_series: hourly_time_series,
+        BasisDataKeyName.daily_time_series: daily_time_series})
+
+    assert load_hourly_time_series(spark, io_processor) is hourly_time_series
+    assert load_daily_time_series(spark, io_processor) is daily_time_series
+
+
+def test__load_time_series__sums_points_of_snapshot_without_sums(spark):
+    time_series = spark.createDataFrame(time_series_dataset_1, schema=time_series_points_schema)
+    io_processor = snapshot_io_processor({BasisDataKeyName.time_series: time_series})
+
+    hourly_result = load_hourly_time_series(spark, io_processor)
+    daily_result = load_daily_time_series(spark, io_processor)
+
+    assert sorted(hourly_result.collect()) == sorted(sum_time_series_per_hour(time_series).collect())
+    assert sorted(daily_result.collect()) == sorted(sum_time_series_per_day(sum_time_series_per_hour(time_series)).collect())
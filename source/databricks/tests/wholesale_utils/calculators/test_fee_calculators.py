@@ -22,6 +22,7 @@ from tests.helpers.test_schemas import charges_flex_settled_consumption_schema
 from geh_stream.codelists import Colname
 from geh_stream.wholesale_utils.calculators.fee_calculators import calculate_fee_charge_price, filter_on_metering_point_type_and_settlement_method, get_count_of_charges_and_total_daily_charge_price
 from geh_stream.wholesale_utils.wholesale_initializer import get_fee_charges
+from tests.helpers import physical_plan
 import pytest
 import pandas as pd
 
@@ -163,3 +164,17 @@ def test__get_count_of_charges_and_total_daily_charge_price__counts_and_sums_up_
     # Assert
     assert result.collect()[0][Colname.charge_count] == expected_charge_count
     assert result.collect()[0][Colname.total_daily_charge_price] == expected_total_daily_charge_price
+
+
+def test__get_count_of_charges_and_total_daily_charge_price__returns_distinct_charges_in_a_single_shuffle(spark):
+    # Arrange
+    charges_flex_settled_consumption = spark.createDataFrame(charges_flex_settled_consumption_dataset_2, schema=charges_flex_settled_consumption_schema)
+
+    # Act
+    result = get_count_of_charges_and_total_daily_charge_price(charges_flex_settled_consumption)
+
+    # Assert
+    assert result.count() == 1
+    plan = physical_plan(result)
+    assert "Join" not in plan
+    assert plan.count("Exchange") == 1
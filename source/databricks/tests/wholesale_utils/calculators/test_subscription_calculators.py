@@ -24,6 +24,7 @@ from geh_stream.wholesale_utils.calculators.subscription_calculators import calc
     calculate_price_per_day, filter_on_metering_point_type_and_settlement_method, get_count_of_charges_and_total_daily_charge_price
 from geh_stream.wholesale_utils.wholesale_initializer import get_subscription_charges
 from calendar import monthrange
+from tests.helpers import physical_plan
 import pytest
 import pandas as pd
 
@@ -273,3 +274,17 @@ def test__get_count_of_charges_and_total_daily_charge_price__counts_and_sums_up_
     result_collect = result.collect()
     assert result_collect[0][Colname.charge_count] == expected_charge_count
     assert result_collect[0][Colname.total_daily_charge_price] == expected_total_daily_charge_price
+
+
+def test__get_count_of_charges_and_total_daily_charge_price__returns_distinct_charges_in_a_single_shuffle(spark):
+    # Arrange
+    charges_per_day = spark.createDataFrame(charges_per_day_dataset_2, schema=charges_per_day_schema)
+
+    # Act
+    result = get_count_of_charges_and_total_daily_charge_price(charges_per_day)
+
+    # Assert
+    assert result.count() == 1
+    plan = physical_plan(result)
+    assert "Join" not in plan
+    assert plan.count("Exchange") == 1
@@ -13,12 +13,12 @@
 # limitations under the License.
 from decimal import Decimal
 from datetime import datetime
-from tests.helpers.test_schemas import tariff_schema, tariff_sum_and_count_schema, tariff_distinct_schema
+from tests.helpers import physical_plan
+from tests.helpers.test_schemas import tariff_schema
 from geh_stream.codelists import Colname, ChargeType
 from geh_stream.wholesale_utils.calculators.tariff_calculators import \
-    sum_quantity_and_count_charges, \
-    select_distinct_tariffs, \
-    join_with_agg_df
+    calculate_tariff_price_per_ga_co_es, \
+    sum_quantity_and_count_charges
 import pytest
 import pandas as pd
 
@@ -54,51 +54,19 @@ def test__sum_quantity_and_count_charges__counts_quantity_and_sums_up_amount_of_
     assert result_collect[0][Colname.total_quantity] == expected_quantity
 
 
-@pytest.mark.parametrize("tariffs,expected_count", [
-    (tariffs_dataset, 2)
-])
-def test__select_distinct_tariffs__selects_distinct_tariffs(
-    spark,
-    tariffs,
-    expected_count
-):
-    # Arrange
-    tariffs = spark.createDataFrame(tariffs, schema=tariff_schema)
-
-    # Act
-    result = select_distinct_tariffs(tariffs)
-
-    # Assert
-    assert result.count() == expected_count
-
-
-tariffs_distinct_dataset = [
-    ("001-D01-001", "001", ChargeType.tariff, "001", "P1D", "No",
-     datetime(2020, 1, 1, 0, 0), Decimal("200.50"), "1", "E17", "D01", "1"),
-    ("001-D01-002", "001", ChargeType.tariff, "001", "P1D", "No",
-     datetime(2020, 1, 15, 0, 0), Decimal("200.50"), "1", "E17", "D01", "1")
-]
-agg_dataset = [
-    ("1", "1", datetime(2020, 1, 1, 0, 0), "E17", "D01", "001-D01-001", Decimal("2.002"), 2),
-    ("1", "1", datetime(2020, 1, 15, 0, 0), "E17", "D01", "001-D01-002", Decimal("1.000"), 1),
-]
-
-
-@pytest.mark.parametrize("tariffs,agg_df,expected_total_amount", [
-    (tariffs_distinct_dataset, agg_dataset, Decimal("401.401"))
-])
-def test__join_with_agg_df__gets_the_expected_total_amount(
-    spark,
-    tariffs,
-    agg_df,
-    expected_total_amount
-):
+def test__calculate_tariff_price_per_ga_co_es__gets_the_expected_total_amount_in_a_single_aggregation(spark):
     # Arrange
-    tariffs = spark.createDataFrame(tariffs, schema=tariff_distinct_schema)
-    agg_df = spark.createDataFrame(agg_df, schema=tariff_sum_and_count_schema)
+    tariffs = spark.createDataFrame(tariffs_dataset, schema=tariff_schema)
 
     # Act
-    result = join_with_agg_df(tariffs, agg_df)
+    result = calculate_tariff_price_per_ga_co_es(spark, tariffs)
 
     # Assert
-    assert result.collect()[0][Colname.total_amount] == expected_total_amount
+    result_collect = result.orderBy(Colname.charge_key).collect()
+    assert len(result_collect) == 2
+    assert result_collect[0][Colname.charge_count] == 2
+    assert result_collect[0][Colname.total_amount] == Decimal("401.401")
+    assert result_collect[1][Colname.charge_id] == "001"
+    plan = physical_plan(result)
+    assert "Join" not in plan
+    assert plan.count("Exchange") == 1
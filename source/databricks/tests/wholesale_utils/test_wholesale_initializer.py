@@ -21,10 +21,14 @@ from geh_stream.wholesale_utils.wholesale_initializer import \
     join_with_metering_points, \
     explode_subscription, \
     get_charges_based_on_resolution, \
-    group_by_time_series_on_metering_point_id_and_resolution_and_sum_quantity, \
     join_with_grouped_time_series, \
     get_charges_based_on_charge_type, \
-    get_connected_metering_points
+    get_connected_metering_points, \
+    get_charges_with_properties, \
+    get_fee_charges, \
+    get_subscription_charges, \
+    select_fee_charges, \
+    select_subscription_charges
 from geh_stream.codelists import Colname, ChargeType, ResolutionDuration, ConnectionState
 from geh_stream.schemas import \
     charges_schema, \
@@ -33,6 +37,9 @@ from geh_stream.schemas import \
     metering_point_schema, \
     market_roles_schema
 from geh_stream.schemas import time_series_points_schema
+from tests.helpers.dataframe_creators.charges_creator import charges_factory, charge_links_factory, charge_prices_factory
+from tests.helpers.dataframe_creators.metering_point_creator import metering_point_factory
+from tests.helpers.dataframe_creators.market_roles_creator import market_roles_factory
 from tests.helpers.test_schemas import \
     charges_with_prices_schema, \
     charges_with_price_and_links_schema, \
@@ -120,6 +127,12 @@ subscription_charges_with_prices_dataset_1 = [("001-D01-001", "001", "D01", "001
 subscription_charges_with_prices_dataset_2 = [("001-D01-001", "001", "D01", "001", "P1D", "No", datetime(2020, 1, 1, 0, 0), datetime(2020, 2, 1, 0, 0), datetime(2021, 1, 2, 0, 0), Decimal("200.50"))]
 subscription_charges_with_prices_dataset_3 = [("001-D01-001", "001", "D01", "001", "P1D", "No", datetime(2020, 1, 1, 0, 0), datetime(2020, 2, 2, 0, 0), datetime(2020, 2, 15, 0, 0), Decimal("200.50"))]
 subscription_charges_with_prices_dataset_4 = [("001-D01-001", "001", "D01", "001", "P1D", "No", datetime(2020, 1, 1, 0, 0), datetime(2020, 2, 1, 0, 0), datetime(2020, 3, 1, 0, 0), Decimal("200.50"))]
+# Charge without an end, which must not be exploded into all of its days
+subscription_charges_with_prices_dataset_5 = [("001-D01-001", "001", "D01", "001", "P1D", "No", datetime(2000, 1, 1, 0, 0), datetime(9999, 1, 1, 0, 0), datetime(2020, 1, 2, 0, 0), Decimal("200.50"))]
+# Charge starting before the month at another time of day than midnight, whose days keep that time of day
+subscription_charges_with_prices_dataset_6 = [
+    ("001-D01-001", "001", "D01", "001", "P1D", "No", datetime(2019, 12, 31, 23, 0), datetime(2020, 2, 29, 23, 0), datetime(2020, 1, 15, 0, 0), Decimal("200.50"))
+]
 
 
 # Subscription only
@@ -127,7 +140,9 @@ subscription_charges_with_prices_dataset_4 = [("001-D01-001", "001", "D01", "001
     (subscription_charges_with_prices_dataset_1, 31),
     (subscription_charges_with_prices_dataset_2, 0),
     (subscription_charges_with_prices_dataset_3, 2),
-    (subscription_charges_with_prices_dataset_4, 0)
+    (subscription_charges_with_prices_dataset_4, 0),
+    (subscription_charges_with_prices_dataset_5, 31),
+    (subscription_charges_with_prices_dataset_6, 31)
 ])
 def test__explode_subscription__explodes_into_rows_based_on_number_of_days_between_from_and_to_date(spark, subscription_charges_with_prices, expected):
     # Arrange
@@ -140,6 +155,15 @@ def test__explode_subscription__explodes_into_rows_based_on_number_of_days_betwe
     assert result.count() == expected
 
 
+def test__explode_subscription__keeps_time_of_day_of_charge_from_date(spark):
+    subscription_charges_with_prices = spark.createDataFrame(subscription_charges_with_prices_dataset_6, schema=charges_with_prices_schema)
+
+    result = explode_subscription(subscription_charges_with_prices).orderBy(Colname.time).collect()
+
+    assert result[0][Colname.time] == datetime(2020, 1, 1, 23, 0)
+    assert result[-1][Colname.time] == datetime(2020, 1, 31, 23, 0)
+
+
 charges_with_prices_dataset_1 = [("001-D01-001", "001", "D01", "001", "P1D", "No", datetime(2020, 1, 1, 0, 0), datetime(2020, 2, 1, 0, 0), datetime(2020, 1, 15, 0, 0), Decimal("200.50"))]
 charges_with_prices_dataset_2 = [("001-D01-001", "001", "D01", "001", "P1D", "No", datetime(2020, 1, 1, 0, 0), datetime(2020, 2, 1, 0, 0), datetime(2021, 2, 1, 0, 0), Decimal("200.50"))]
 charges_with_prices_dataset_3 = [("001-D01-001", "001", "D01", "001", "P1D", "No", datetime(2020, 1, 1, 0, 0), datetime(2020, 2, 1, 0, 0), datetime(2020, 1, 1, 0, 0), Decimal("200.50"))]
@@ -238,32 +262,6 @@ def test__join_with_metering_points__joins_on_metering_point_id_and_time_is_betw
     assert result.count() == expected
 
 
-time_series_dataset_1 = [
-    ("D01", Decimal("10"), "D01", datetime(2020, 1, 15, 5, 0), 2020, 1, 15, datetime(2020, 1, 15, 0, 0)),
-    ("D01", Decimal("10"), "D01", datetime(2020, 1, 15, 1, 0), 2020, 1, 15, datetime(2020, 1, 15, 0, 0)),
-    ("D01", Decimal("10"), "D01", datetime(2020, 1, 15, 1, 30), 2020, 1, 15, datetime(2020, 1, 15, 0, 0)),
-    ("D01", Decimal("10"), "D01", datetime(2020, 1, 16, 1, 0), 2020, 1, 15, datetime(2020, 1, 15, 0, 0))
-]
-
-
-# Tariff only
-@pytest.mark.parametrize("time_series,resolution_duration,expected_count,expected_quantity", [
-    (time_series_dataset_1, ResolutionDuration.day, 2, 30),
-    (time_series_dataset_1, ResolutionDuration.hour, 3, 20)
-])
-def test__group_by_time_series_on_metering_point_id_and_resolution_and_sum_quantity(spark, time_series, resolution_duration, expected_count, expected_quantity):
-    # Arrange
-    time_series = spark.createDataFrame(time_series, schema=time_series_points_schema)
-
-    # Act
-    result = group_by_time_series_on_metering_point_id_and_resolution_and_sum_quantity(time_series, resolution_duration)
-    result = result.orderBy(col(Colname.quantity).desc())  # orderby quantity desc to get highest quantity first
-
-    # Assert
-    assert result.count() == expected_count
-    assert result.collect()[0][Colname.quantity] == expected_quantity  # expected highest quantity
-
-
 grouped_time_series_dataset_1 = [("D01", Decimal("10"), "D01", datetime(2020, 1, 15, 0, 0), 2020, 1, 15, datetime(2020, 1, 15, 0, 0))]
 charges_complete_dataset_1 = [("001-D01-001", "001", "D01", "001", "P1D", "No", datetime(2020, 1, 15, 0, 0), Decimal("200.50"), "D01", "1", "E17", "E22", "D01", "1")]
 
@@ -282,3 +280,32 @@ def test__join_with_grouped_time_series__joins_on_metering_point_and_time(spark,
 
     # Assert
     assert result.count() == expected
+
+
+def test__get_charges_with_properties__can_be_split_into_charges_of_each_charge_type(
+    charges_factory,
+    charge_links_factory,
+    charge_prices_factory,
+    metering_point_factory,
+    market_roles_factory
+):
+    # Arrange
+    from_date = datetime(2020, 1, 1, 0, 0)
+    to_date = datetime(2020, 1, 3, 0, 0)
+    time = datetime(2020, 1, 1, 0, 0)
+    charges = charges_factory(from_date, to_date, charge_key="fee", charge_type=ChargeType.fee) \
+        .union(charges_factory(from_date, to_date, charge_key="subscription", charge_type=ChargeType.subscription))
+    charge_links = charge_links_factory(from_date, to_date, charge_key="fee").union(charge_links_factory(from_date, to_date, charge_key="subscription"))
+    charge_prices = charge_prices_factory(time, charge_key="fee").union(charge_prices_factory(time, charge_key="subscription"))
+    metering_points = metering_point_factory(from_date, to_date)
+    market_roles = market_roles_factory(from_date, to_date)
+
+    # Act
+    charges_with_properties = get_charges_with_properties(charges, charge_prices, charge_links, metering_points, market_roles)
+
+    # Assert
+    fee_charges = get_fee_charges(charges, charge_prices, charge_links, metering_points, market_roles)
+    subscription_charges = get_subscription_charges(charges, charge_prices, charge_links, metering_points, market_roles)
+    assert sorted(select_fee_charges(charges_with_properties).collect()) == sorted(fee_charges.collect())
+    assert sorted(select_subscription_charges(charges_with_properties).collect()) == sorted(subscription_charges.collect())
+    assert subscription_charges.count() == 2